@@ -0,0 +1,47 @@
+"""index hot lookups
+
+Indexes every column the app filters or sorts on per request. They are built
+with CREATE INDEX CONCURRENTLY outside a transaction, so writes keep flowing
+while this runs against the live database. A failed concurrent build leaves an
+INVALID index behind; each one is dropped first so the migration can simply be
+re-run (e.g. after fixing duplicate emails/usernames).
+
+Revision ID: 0a6d3e9c4b57
+Revises: f3a5c81d7e42
+Create Date: 2026-10-19 11:40:21.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d3e9c4b57'
+down_revision = 'f3a5c81d7e42'
+branch_labels = None
+depends_on = None
+
+# (index, table, column, unique)
+indexes = [
+    ('ix_user_uuid', 'user', 'uuid', True),  # get_curr_user, every request
+    ('ix_user_email', 'user', 'email', True),  # login, signup, settings checks
+    ('ix_user_username', 'user', 'username', True),  # settings checks
+    ('ix_user_reset_token', 'user', 'reset_token', False),  # password reset
+    ('ix_match_user_id_2', 'match', 'user_id_2', False),  # incoming matches
+    ('ix_feedmessage_created_at', 'feedmessage', 'created_at', False),  # feed order
+    ('ix_feedmessage_user_id', 'feedmessage', 'user_id', False),  # account deletion
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, column, unique in indexes:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+            op.create_index(name, table, [column], unique=unique, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(indexes):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
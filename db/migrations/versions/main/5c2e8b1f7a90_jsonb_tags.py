@@ -0,0 +1,57 @@
+"""jsonb tags
+
+Stores user.interests and user.personality_traits as JSONB and adds a GIN
+index on each, so "shares interest X" style containment (@>) and overlap (?|)
+queries are answered from the index instead of a full scan plus Python-side
+parsing. The type change rewrites the user table under an ACCESS EXCLUSIVE
+lock; the indexes are then built concurrently outside a transaction.
+
+Revision ID: 5c2e8b1f7a90
+Revises: 0a6d3e9c4b57
+Create Date: 2026-10-19 14:02:37.518240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8b1f7a90'
+down_revision = '0a6d3e9c4b57'
+branch_labels = None
+depends_on = None
+
+columns = ['interests', 'personality_traits']
+
+
+def upgrade():
+    for column in columns:
+        op.alter_column(
+            'user',
+            column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            existing_type=sa.JSON(),
+            postgresql_using=f'{column}::jsonb',
+        )
+    with op.get_context().autocommit_block():
+        for column in columns:
+            op.drop_index(f'ix_user_{column}', table_name='user', if_exists=True, postgresql_concurrently=True)
+            op.create_index(
+                f'ix_user_{column}', 'user', [column], postgresql_using='gin', postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for column in reversed(columns):
+            op.drop_index(f'ix_user_{column}', table_name='user', if_exists=True, postgresql_concurrently=True)
+    for column in reversed(columns):
+        op.alter_column(
+            'user',
+            column,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f'{column}::json',
+        )
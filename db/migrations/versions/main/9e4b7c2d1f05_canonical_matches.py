@@ -0,0 +1,55 @@
+"""canonical matches
+
+Stores each match once, lower user id first, with one ranking score per side.
+Where both A->B and B->A exist the rows are merged (earliest created_at wins),
+the remaining reversed rows are swapped into canonical order, and a check
+constraint keeps it that way. Scores of existing matches are unknown (NULL)
+until either side ranks again.
+
+Revision ID: 9e4b7c2d1f05
+Revises: 5c2e8b1f7a90
+Create Date: 2026-10-19 15:12:44.207391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b7c2d1f05'
+down_revision = '5c2e8b1f7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('match', sa.Column('score_1', sa.Float(), nullable=True))
+    op.add_column('match', sa.Column('score_2', sa.Float(), nullable=True))
+    op.execute('DELETE FROM match WHERE user_id_1 = user_id_2')
+    op.execute("""
+        UPDATE match AS m
+        SET created_at = LEAST(m.created_at, r.created_at)
+        FROM match AS r
+        WHERE m.user_id_1 < m.user_id_2
+          AND r.user_id_1 = m.user_id_2 AND r.user_id_2 = m.user_id_1
+    """)
+    op.execute("""
+        DELETE FROM match AS r
+        USING match AS m
+        WHERE r.user_id_1 > r.user_id_2
+          AND m.user_id_1 = r.user_id_2 AND m.user_id_2 = r.user_id_1
+    """)
+    op.execute("""
+        UPDATE match
+        SET user_id_1 = user_id_2, user_id_2 = user_id_1
+        WHERE user_id_1 > user_id_2
+    """)
+    op.create_check_constraint('ck_match_canonical', 'match', 'user_id_1 < user_id_2')
+
+
+def downgrade():
+    # canonical rows are valid directed rows, only the constraint and scores go
+    op.drop_constraint('ck_match_canonical', 'match', type_='check')
+    op.drop_column('match', 'score_2')
+    op.drop_column('match', 'score_1')
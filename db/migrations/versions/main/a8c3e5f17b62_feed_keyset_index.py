@@ -0,0 +1,36 @@
+"""feed keyset index
+
+The feed is now served in keyset pages over (created_at, id), newest first,
+so the single-column created_at index is replaced by a composite one that
+answers both the order and the row comparison. Built concurrently, like the
+other hot-lookup indexes.
+
+Revision ID: a8c3e5f17b62
+Revises: d2a6f4c8e913
+Create Date: 2026-10-19 18:34:50.112873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c3e5f17b62'
+down_revision = 'd2a6f4c8e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedmessage_created_at_id', table_name='feedmessage', if_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_feedmessage_created_at_id', 'feedmessage', ['created_at', 'id'], postgresql_concurrently=True)
+        op.drop_index('ix_feedmessage_created_at', table_name='feedmessage', if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedmessage_created_at', table_name='feedmessage', if_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_feedmessage_created_at', 'feedmessage', ['created_at'], postgresql_concurrently=True)
+        op.drop_index('ix_feedmessage_created_at_id', table_name='feedmessage', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,65 @@
+"""soft delete cascades
+
+Account deletion becomes a soft delete (user.deleted_at) followed by a batched
+purge (src/jobs.py), and the purge relies on ON DELETE CASCADE instead of the
+ORM loading every message and match first. The foreign keys are re-added NOT
+VALID and, once that is committed, validated in their own transactions, so the
+tables are not locked while existing rows are checked.
+
+Revision ID: b3f81d6a7c24
+Revises: 9e4b7c2d1f05
+Create Date: 2026-10-19 16:05:12.630418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f81d6a7c24'
+down_revision = '9e4b7c2d1f05'
+branch_labels = None
+depends_on = None
+
+# (constraint, table, column)
+foreign_keys = [
+    ('match_user_id_1_fkey', 'match', 'user_id_1'),
+    ('match_user_id_2_fkey', 'match', 'user_id_2'),
+    ('feedmessage_user_id_fkey', 'feedmessage', 'user_id'),
+]
+
+
+def _replace_foreign_keys(on_delete):
+    for name, table, column in foreign_keys:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) '
+            f'REFERENCES "user" (id){on_delete} NOT VALID'
+        )
+    # commit the swap first: VALIDATE only needs SHARE UPDATE EXCLUSIVE, but in
+    # the migration's transaction the ACCESS EXCLUSIVE locks above are still held
+    with op.get_context().autocommit_block():
+        for name, table, _ in foreign_keys:
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+
+def upgrade():
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    _replace_foreign_keys(' ON DELETE CASCADE')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_deleted_at', table_name='user', if_exists=True, postgresql_concurrently=True)
+        op.create_index(
+            'ix_user_deleted_at',
+            'user',
+            ['deleted_at'],
+            postgresql_where=sa.text('deleted_at IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_deleted_at', table_name='user', if_exists=True, postgresql_concurrently=True)
+    _replace_foreign_keys('')
+    op.drop_column('user', 'deleted_at')
@@ -0,0 +1,35 @@
+"""post budgets
+
+Feed posting token buckets move from each container's memory into one row
+per user, so every container draws on the same budget. Buckets start full,
+so the table starts empty.
+
+Revision ID: c5e7a1b94d28
+Revises: a8c3e5f17b62
+Create Date: 2026-10-19 21:06:17.540219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e7a1b94d28'
+down_revision = 'a8c3e5f17b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('postbudget',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('refilled_at', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('postbudget')
@@ -0,0 +1,105 @@
+"""backfill image blob hashes
+
+Moves base64 data URLs out of `user.profile_img` / `schedule.img` into the
+blob store. Rows are visited in id order, one image at a time, and every
+UPDATE commits on its own so only the row being rewritten is ever locked.
+Run it with the same BLOB_STORE settings as the app. Re-running resumes where
+it stopped (rows that already have a hash are skipped).
+
+Revision ID: c7d2a9e51f36
+Revises: b41e8f0a2c19
+Create Date: 2026-10-19 09:14:02.504917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from src.blobs import from_data_url, get_blob_store, to_data_url
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2a9e51f36'
+down_revision = 'b41e8f0a2c19'
+branch_labels = None
+depends_on = None
+
+batch_size = 500  # ids fetched per round trip, images are still read one by one
+
+
+def _table(name, img_column, hash_column):
+    return sa.table(
+        name,
+        sa.column('id', sa.Integer),
+        sa.column(img_column, sa.String),
+        sa.column(hash_column, sa.String),
+    )
+
+
+def _batched_ids(bind, table, *where):
+    last_id = 0
+    while True:
+        ids = bind.execute(
+            sa.select(table.c.id)
+            .where(table.c.id > last_id, *where)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return
+        yield from ids
+        last_id = ids[-1]
+
+
+def _to_blobs(bind, blob_store, name, img_column, hash_column):
+    table = _table(name, img_column, hash_column)
+    moved = 0
+    for row_id in _batched_ids(
+        bind, table, table.c[img_column].is_not(None), table.c[hash_column].is_(None)
+    ):
+        data_url = bind.execute(
+            sa.select(table.c[img_column]).where(table.c.id == row_id)
+        ).scalar()
+        if not data_url:
+            continue
+        bind.execute(
+            sa.update(table)
+            .where(table.c.id == row_id)
+            .values({hash_column: blob_store.put(from_data_url(data_url))})
+        )
+        moved += 1
+    print(f"Moved {moved} {name}.{img_column} images to the blob store")
+
+
+def _from_blobs(bind, blob_store, name, img_column, hash_column):
+    table = _table(name, img_column, hash_column)
+    for row_id in _batched_ids(
+        bind, table, table.c[hash_column].is_not(None), table.c[img_column].is_(None)
+    ):
+        key = bind.execute(
+            sa.select(table.c[hash_column]).where(table.c.id == row_id)
+        ).scalar()
+        data = blob_store.get(key)
+        if data is None:
+            continue
+        bind.execute(
+            sa.update(table)
+            .where(table.c.id == row_id)
+            .values({img_column: to_data_url(data)})
+        )
+
+
+def upgrade():
+    blob_store = get_blob_store()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _to_blobs(bind, blob_store, 'user', 'profile_img', 'profile_img_hash')
+        _to_blobs(bind, blob_store, 'schedule', 'img', 'img_hash')
+
+
+def downgrade():
+    blob_store = get_blob_store()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _from_blobs(bind, blob_store, 'user', 'profile_img', 'profile_img_hash')
+        _from_blobs(bind, blob_store, 'schedule', 'img', 'img_hash')
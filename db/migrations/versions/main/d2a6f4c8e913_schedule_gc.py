@@ -0,0 +1,40 @@
+"""schedule gc
+
+Adds schedule.created_at so the GC job (src/jobs.py) can leave recent uploads
+alone while their owner is still signing up. Existing rows get the migration
+time, so their grace period starts now. user.schedule_id is indexed (built
+concurrently) for the GC's anti-join and for the FK check on every schedule
+delete.
+
+Revision ID: d2a6f4c8e913
+Revises: b3f81d6a7c24
+Create Date: 2026-10-19 17:21:03.845102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f4c8e913'
+down_revision = 'b3f81d6a7c24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'schedule',
+        sa.Column('created_at', sa.DateTime(), nullable=True, server_default=sa.text("timezone('utc', now())")),
+    )
+    op.alter_column('schedule', 'created_at', server_default=None)
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_schedule_id', table_name='user', if_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_user_schedule_id', 'user', ['schedule_id'], postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_schedule_id', table_name='user', if_exists=True, postgresql_concurrently=True)
+    op.drop_column('schedule', 'created_at')
@@ -0,0 +1,76 @@
+"""drop generated avatars
+
+Users without an uploaded photo used to get an initial-avatar SVG stored in
+the blob store. Those are now rendered on demand from /avatar/<initial>/<color>,
+so `user.profile_img_hash` is cleared wherever it points at one of them. The
+generated SVGs only vary by initial, so the keys to clear are computed up front
+and removed in a single UPDATE; the blobs themselves are left in the store.
+
+Revision ID: f3a5c81d7e42
+Revises: e19f4b6d0a83
+Create Date: 2026-10-19 11:02:48.117305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from src.blobs import blob_hash, get_blob_store
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a5c81d7e42'
+down_revision = 'e19f4b6d0a83'
+branch_labels = None
+depends_on = None
+
+user = sa.table(
+    'user',
+    sa.column('id', sa.Integer),
+    sa.column('email', sa.String),
+    sa.column('username', sa.String),
+    sa.column('profile_img_hash', sa.String),
+)
+
+
+def _avatar_svg(initial):
+    # byte-for-byte what the signup handlers used to store
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100"><circle cx="50" cy="50" r="50" fill="#60A5FA"/><text x="50" y="60" font-size="40" text-anchor="middle" fill="#57534E" font-family="Consolas">{initial}</text></svg>'.encode()
+
+
+def _initial(email, username):
+    return (email or username or 'U')[0].upper()
+
+
+def upgrade():
+    bind = op.get_bind()
+    initials = {'U'}
+    for column in (user.c.email, user.c.username):
+        initials.update(
+            first.upper()
+            for first in bind.execute(
+                sa.select(sa.func.substr(column, 1, 1)).distinct()
+            ).scalars()
+            if first
+        )
+    keys = [blob_hash(_avatar_svg(initial)) for initial in initials]
+    result = bind.execute(
+        sa.update(user).where(user.c.profile_img_hash.in_(keys)).values(profile_img_hash=None)
+    )
+    print(f"Cleared {result.rowcount} generated avatars")
+
+
+def downgrade():
+    blob_store = get_blob_store()
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(user.c.id, user.c.email, user.c.username).where(
+            user.c.profile_img_hash.is_(None)
+        )
+    ).all()
+    for row_id, email, username in rows:
+        bind.execute(
+            sa.update(user)
+            .where(user.c.id == row_id)
+            .values(profile_img_hash=blob_store.put(_avatar_svg(_initial(email, username))))
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import modal
+
+from src.metrics import Counter, Gauge, Histogram
+from src.utils import PARENT_PATH
+
+# signature lists are plain text, one hex digest per line (optionally `digest:name`)
+DIGEST_ALGORITHMS = {32: "md5", 40: "sha1", 64: "sha256"}
+
+if modal.is_local():
+    SIGNATURES_PATH = PARENT_PATH / "Python-Antivirus"
+else:
+    SIGNATURES_PATH = Path("/root/Python-Antivirus")
+
+scan_seconds = Histogram("antivirus_scan_seconds", "Time to scan one upload.")
+scans_total = Counter("antivirus_scans_total", "Uploads scanned.")
+cache_hits_total = Counter(
+    "antivirus_cache_hits_total", "Scans answered from the content-hash cache."
+)
+infected_total = Counter(
+    "antivirus_infected_total", "Uploads that matched a signature."
+)
+signatures_loaded = Gauge("antivirus_signatures", "Signatures held in memory.")
+
+# -----------------------------------------------------------------------------
+
+
+def load_signatures(path: str | Path) -> dict[str, set[str]]:
+    signatures = {algorithm: set() for algorithm in DIGEST_ALGORITHMS.values()}
+    files = sorted(Path(path).rglob("*.txt"))
+    if not files:
+        raise FileNotFoundError(f"No signature lists found in {path}")
+    for file in files:
+        with open(file, encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                digest = line.strip().split(":")[0].split(";")[0].strip().lower()
+                algorithm = DIGEST_ALGORITHMS.get(len(digest))
+                if algorithm and all(c in "0123456789abcdef" for c in digest):
+                    signatures[algorithm].add(digest)
+    return {algorithm: digests for algorithm, digests in signatures.items() if digests}
+
+
+class Scanner:
+    """Hash-signature scanner that loads its lists once and scans buffers in a small pool."""
+
+    def __init__(
+        self, signatures_path: str | Path, workers: int = 2, cache_size: int = 4096
+    ):
+        self.signatures_path = signatures_path
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="antivirus"
+        )
+        self.cache_size = cache_size
+        self._signatures: dict[str, set[str]] | None = None
+        self._load_lock = threading.Lock()
+        self._cache: OrderedDict[str, bool] = OrderedDict()  # sha256 -> infected
+
+    @property
+    def signatures(self) -> dict[str, set[str]]:
+        if self._signatures is None:
+            with self._load_lock:
+                if self._signatures is None:
+                    self._signatures = load_signatures(self.signatures_path)
+                    signatures_loaded.set(sum(map(len, self._signatures.values())))
+        return self._signatures
+
+    def warm(self):
+        self.pool.submit(lambda: self.signatures)
+
+    def scan(self, data: bytes) -> bool:
+        with scan_seconds.time():
+            scans_total.inc()
+            infected = any(
+                hashlib.new(algorithm, data).hexdigest() in digests
+                for algorithm, digests in self.signatures.items()
+            )
+        if infected:
+            infected_total.inc()
+        return infected
+
+    async def scan_async(self, data: bytes) -> bool:
+        key = hashlib.sha256(data).hexdigest()
+        if key in self._cache:
+            cache_hits_total.inc()
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        infected = await asyncio.get_running_loop().run_in_executor(
+            self.pool, self.scan, data
+        )
+        self._cache[key] = infected
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return infected
+
+
+def get_scanner() -> Scanner:
+    return Scanner(
+        os.getenv("ANTIVIRUS_SIGNATURES_PATH") or SIGNATURES_PATH,
+        workers=int(os.getenv("ANTIVIRUS_WORKERS", 2)),
+    )
@@ -1,28 +1,77 @@
-import base64
-import io
+import argparse
+import asyncio
+import functools
+import hmac
 import json
 import os
+import re
 import smtplib
 import ssl
-import subprocess
-import tempfile
+import time
 import uuid
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from pathlib import Path
+from urllib.parse import quote
 
 import modal
 
+from src.antivirus import get_scanner
+from src.blobs import (
+    VOLUME_CONFIG,
+    get_blob_store,
+    is_blob_key,
+    sniff_mime,
+    to_data_url,
+)
+from src.cache import get_user_cache, invalidate_on_commit
+from src.db import (
+    RequestScope,
+    RoutingSession,
+    begin_request,
+    create_async_db_engine,
+    create_replica_engine,
+    current_uow,
+    unit_of_work,
+)
+from src.feed import (
+    get_broadcaster,
+    get_rate_limiter,
+    get_shared_rate_limiter,
+    get_write_behind,
+)
 from src.helpers import app as helpers_app
 from src.helpers import get_schedule_text, rank_users
+from src.images import (
+    MAX_UPLOAD_MB,
+    THUMBNAIL_SIZES,
+    VALID_EXTENSIONS,
+    ThumbnailCache,
+    UploadSizeLimit,
+    in_upload_pool,
+    read_upload,
+    validate_image_bytes,
+)
+from src.metrics import render_metrics
 from src.models import (
     FeedMessage,
-    Match,
     Schedule,
     User,
 )
+from src.pubsub import MemoryPubSub, get_pubsub
+from src.queries import (
+    MATCH_CARD,
+    RANK_CANDIDATE,
+    USER_AUTH,
+    feed_cursor,
+    feed_message,
+    feed_page,
+    lock_feed_writes,
+    matches_of,
+    upsert_matches,
+)
 from src.utils import (
     APP_NAME,
     GRADUATION_YEARS,
@@ -44,6 +93,8 @@ FE_IMAGE = (
     .apt_install("git", "libpq-dev")  # add system dependencies
     .pip_install(
         "alembic>=1.15.2",
+        "asyncpg>=0.30.0",
+        "boto3>=1.38.0",  # BLOB_STORE=s3
         "passlib>=1.7.4",
         "pillow>=11.2.1",
         "psycopg2>=2.9.10",
@@ -72,11 +123,9 @@ with FE_IMAGE.imports():
     from fasthtml import common as fh
     from fasthtml.oauth import GitHubAppClient, GoogleAppClient, redir_url
     from passlib.hash import pbkdf2_sha256
-    from PIL import Image
     from simpleicons.icons import si_github
-    from sqlalchemy import func
-    from sqlmodel import Session as DBSession
-    from sqlmodel import create_engine, select
+    from sqlalchemy import func, insert
+    from sqlmodel import select
     from starlette.middleware.cors import CORSMiddleware
 
 
@@ -166,13 +215,15 @@ def get_app():  # noqa: C901
             req.scope["waiting_for_match"] = session.setdefault(
                 "waiting_for_match", False
             )
+        # one db session + current user load shared by every component of this request
+        req.scope["uow"] = begin_request(engine, user_cache, replica, session)
 
-    def _not_found(session):
+    async def _not_found(req, exc):
         return (
             fh.Title(APP_NAME + " | 404"),
             fh.Div(
                 toast_container(),
-                nav(session, "404"),
+                await run_in_db(nav, req.session, "404"),
                 fh.Main(
                     fh.P(
                         "Page not found!",
@@ -184,13 +235,24 @@ def get_app():  # noqa: C901
             ),
         )
 
+    # signs the session cookie, so every container must share it
+    session_secret = os.getenv("SESSION_SECRET")
+    if not session_secret and not modal.is_local():
+        raise RuntimeError(
+            "SESSION_SECRET must be set: containers share session cookies"
+        )
+
     f_app, _ = fh.fast_app(
+        secret_key=session_secret,  # None locally: kept in .sesskey
         exts="ws",
         before=fh.Beforeware(
             before,
             skip=[
                 r"/favicon\.ico",
                 r"/static/.*",
+                r"/img/.*",
+                r"/avatar/.*",
+                r"/metrics",
                 r".*\.css",
             ],
         ),
@@ -219,6 +281,8 @@ def get_app():  # noqa: C901
         boost=True,
     )
     f_app.devtools_json()
+    f_app.add_middleware(UploadSizeLimit)
+    f_app.add_middleware(RequestScope)
     f_app.add_middleware(
         CORSMiddleware,
         allow_origins=["/"],
@@ -227,24 +291,113 @@ def get_app():  # noqa: C901
         allow_headers=["*"],
     )
 
-    # feed
-    feed_users = {}
+    # feed: posts go out over pub/sub, each container fans them out to its own
+    # sockets through one bounded outbound queue per socket
+    feed_pubsub = get_pubsub()  # also carries user cache invalidations
+    feed_broadcaster = get_broadcaster()
+    feed_limiter = get_rate_limiter()  # per user, floods never reach the db
+    feed_budget = get_shared_rate_limiter()  # the same, shared by all containers
+    feed_page_size = 50  # messages per page, older ones load on scroll
 
     # db
-    engine = create_engine(url=os.getenv("DATABASE_URL"), echo=False)
+    engine = create_async_db_engine("web")
+    replica = create_replica_engine()  # None unless DATABASE_REPLICA_URL is set
+
+    # current-user snapshots, dropped whenever a commit writes that user, in
+    # this container at once and in the others over pub/sub
+    user_cache = get_user_cache()
+    user_cache_channel = "user_cache"
+    container_id = uuid.uuid4().hex
+
+    def share_invalidation(user_uuid: str, deleted: bool):
+        try:
+            feed_pubsub.publish_soon(
+                user_cache_channel,
+                json.dumps(
+                    {"from": container_id, "uuid": user_uuid, "deleted": deleted}
+                ),
+            )
+        except RuntimeError:  # no event loop: not a request's session
+            pass
+
+    async def on_user_invalidated(payload: str):
+        invalidation = json.loads(payload)
+        if invalidation["from"] != container_id:
+            user_cache.invalidate(invalidation["uuid"], deleted=invalidation["deleted"])
+
+    async def subscribe_to_invalidations():
+        await feed_pubsub.subscribe(user_cache_channel, on_user_invalidated)
+
+    invalidate_on_commit(user_cache, RoutingSession, share_invalidation)
+    f_app.add_event_handler("startup", subscribe_to_invalidations)
 
     @contextmanager
     def get_db_session():
-        with DBSession(engine) as session:
-            yield session
+        # the request's session, closed by RequestScope once the response is sent;
+        # only usable from code running under `run_in_db`
+        yield current_uow().session
+
+    async def run_in_db(fn, *args, **kwargs):
+        # sync ORM code (lazy loads included) awaits asyncpg in a greenlet
+        if (uow := current_uow()) is not None:
+            return await uow.run(fn, *args, **kwargs)
+        async with unit_of_work(engine, user_cache, replica) as uow:  # websockets
+            return await uow.run(fn, *args, **kwargs)
+
+    def in_db(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            return await run_in_db(handler, *args, **kwargs)
+
+        return wrapper
+
+    # images
+    blob_store = get_blob_store()
+
+    thumbnails = ThumbnailCache(blob_store)
+
+    # antivirus: signatures are loaded once per container, not per upload
+    scanner = get_scanner()
+    scanner.warm()
+
+    def img_src(key: str | None, size: str) -> str:
+        return f"/img/{key}/{size}" if key else ""
+
+    # avatars: users without a photo get an initial rendered on demand, nothing is stored
+    avatar_color = tailwind_to_hex[click_color].lstrip("#")
+
+    def avatar_initial(user: User) -> str:
+        initial = (user.email or user.username or "U")[0].upper()
+        return initial if len(initial) == 1 and initial.isalnum() else "U"
+
+    def profile_img_src(user: User, size: str) -> str:
+        if user.profile_img_hash:
+            return img_src(user.profile_img_hash, size)
+        return f"/avatar/{quote(avatar_initial(user))}/{avatar_color}"
+
+    @functools.lru_cache(maxsize=512)
+    def render_avatar(initial: str, color: str) -> bytes:
+        return f'<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100"><circle cx="50" cy="50" r="50" fill="#{color}"/><text x="50" y="60" font-size="40" text-anchor="middle" fill="{tailwind_to_hex[text_color]}" font-family="{font_hex}">{initial}</text></svg>'.encode()
+
+    def not_modified(req, etag: str) -> bool:
+        if_none_match = req.headers.get("if-none-match", "")
+        return if_none_match.strip() == "*" or etag in [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
 
     def get_curr_user(session):
-        if session["user_uuid"]:
-            with get_db_session() as db_session:
-                query = select(User).where(User.uuid == session["user_uuid"])
-                return db_session.exec(query).first()
+        if session.get("user_uuid"):
+            return current_uow().user(session["user_uuid"])  # loaded once per request
         return None
 
+    # remote inference
+    async def call_remote(fn, *args):
+        if (uow := current_uow()) is not None:
+            await uow.release()  # don't hold a pooled connection for the whole GPU call
+        if modal.is_local():
+            return await asyncio.to_thread(fn.local, *args)
+        return await fn.remote.aio(*args)
+
     # OAuth
     google_client = GoogleAppClient(
         os.getenv("GOOGLE_CLIENT_ID"), os.getenv("GOOGLE_CLIENT_SECRET")
@@ -359,50 +512,78 @@ def get_app():  # noqa: C901
             ),
         )
 
+    def feed_msg(m: FeedMessage):
+        return fh.Div(
+            fh.Div(
+                fh.Div(
+                    fh.P(
+                        f"{m.user.username}: ",
+                        cls=f"{small_text} font-semibold text-{text_color} break-all",
+                    ),
+                    fh.P(
+                        to_local(m.created_at).strftime("%b %d, %I:%M %p"),
+                        cls=f"{small_text} text-{text_color} opacity-75",
+                    ),
+                    cls="flex justify-between items-center gap-4",
+                ),
+                fh.P(
+                    m.message,
+                    cls=f"{small_text} text-{text_color} break-all",
+                ),
+                cls="flex flex-col gap-1 wrap-break-word",
+            ),
+            id=f"msg-{m.id}",
+            data_cursor=feed_cursor(m),
+            cls=f"max-w-full {input_cls} p-4 flex grow justify-between items-start gap-4",
+        )
+
+    def feed_older(messages: list[FeedMessage]):
+        # at the top of the list: scrolled into view, swaps itself for the page before
+        if len(messages) < feed_page_size:
+            return ()
+        return fh.Div(
+            spinner(cls=f"size-6 text-{text_color}"),
+            hx_get=f"/feed/older?before={quote(feed_cursor(messages[0]))}",
+            hx_trigger="intersect once",
+            hx_swap="outerHTML",
+            cls="w-full flex justify-center",
+        )
+
+    def feed_newer(messages: list[FeedMessage]):
+        # at the bottom of a catch-up page: fetches the next one straight away
+        if len(messages) < feed_page_size:
+            return ()
+        return fh.Div(
+            hx_get=f"/feed/newer?after={quote(feed_cursor(messages[-1]))}",
+            hx_trigger="load",
+            hx_swap="outerHTML",
+        )
+
     def feed_msgs():
         with get_db_session() as db_session:
-            messages = db_session.exec(
-                select(FeedMessage).order_by(FeedMessage.created_at.asc())
-            ).all()
+            messages = feed_page(db_session, feed_page_size)
             return fh.Div(
-                *[
-                    fh.Div(
-                        fh.Div(
-                            fh.Div(
-                                fh.P(
-                                    f"{m.user.username}: ",
-                                    cls=f"{small_text} font-semibold text-{text_color} break-all",
-                                ),
-                                fh.P(
-                                    to_local(m.created_at).strftime("%b %d, %I:%M %p"),
-                                    cls=f"{small_text} text-{text_color} opacity-75",
-                                ),
-                                cls="flex justify-between items-center gap-4",
-                            ),
-                            fh.P(
-                                m.message,
-                                cls=f"{small_text} text-{text_color} break-all",
-                            ),
-                            cls="flex flex-col gap-1 wrap-break-word",
-                        ),
-                        cls=f"max-w-full {input_cls} p-4 flex grow justify-between items-start gap-4",
-                    )
-                    for m in messages
-                ]
+                feed_older(messages),
+                *[feed_msg(m) for m in messages]
                 if messages
                 else [
+                    # hidden once a broadcast message is appended next to it
                     fh.Div(
                         fh.P(
                             "No messages yet. Be the first to say something!",
                             cls=f"{medium_text} text-{text_color} text-center",
                         ),
-                        cls=f"w-full {input_cls} p-4 flex justify-center items-center",
+                        cls=f"w-full {input_cls} p-4 hidden only:flex justify-center items-center",
                     )
                 ],
                 id="msg-list",
-                cls="w-full flex flex-col justify-center items-start gap-4",
+                cls="w-full max-h-[60vh] overflow-y-auto flex flex-col justify-start items-start gap-4",
             )
 
+    def feed_append(m: FeedMessage):
+        # appended to every open feed's #msg-list, leaving the rest untouched
+        return fh.Div(feed_msg(m), id="msg-list", hx_swap_oob="beforeend")
+
     def feed_input():
         return fh.Textarea(
             id="msg",
@@ -633,85 +814,106 @@ def get_app():  # noqa: C901
             cls=page_ctnt,
         )
 
-    def matches_content(session):
+    async def matches_content(session):
         max_matches_show = 50  # how many matches to display
         num_rank_candidates = 500  # how many users to send to the ranking service
 
-        with get_db_session() as db_session:
-            curr_user = get_curr_user(session)
-            if curr_user is None:
-                return fh.Main(
-                    fh.P(
-                        "You must be logged in to view your matches.",
-                        cls=f"{large_text} text-{text_color} text-center",
-                    ),
-                    cls=page_ctnt,
-                )
-
-            curr_user = db_session.merge(curr_user)  # make relationships accessible
-            ranked_users = []
-            if curr_user.waiting_for_match:
-                fn = rank_users.local if modal.is_local() else rank_users.remote
+        def candidates():
+            with get_db_session() as db_session:
+                curr_user = get_curr_user(session)
+                if curr_user is None or not curr_user.waiting_for_match:
+                    return curr_user, "", {}, set()
 
-                existing_matches = list(
-                    curr_user.incoming_matches + curr_user.outgoing_matches
-                )
                 existing_match_ids: set[int] = {
-                    m.user1.id if m.user1.id != curr_user.id else m.user2.id
-                    for m in existing_matches
+                    m.partner_id(curr_user.id)
+                    for m in db_session.exec(matches_of(curr_user.id))
                 }
-                if existing_matches:
-                    users_to_rank = [
-                        m.user1 if m.user1.id != curr_user.id else m.user2
-                        for m in existing_matches
-                    ]
+                query = (
+                    select(User)
+                    .where(User.deleted_at.is_(None))
+                    .options(*RANK_CANDIDATE)
+                )
+                if existing_match_ids:
+                    query = query.where(User.id.in_(existing_match_ids))
                 else:
-                    users_to_rank = db_session.exec(
-                        select(User)
-                        .where(User.uuid != curr_user.uuid)
+                    query = (
+                        query.where(User.uuid != curr_user.uuid)
                         .order_by(func.random())
                         .limit(num_rank_candidates)
-                    ).all()
-
-                ranked_users: list[User] = []
-                if users_to_rank:
-                    str_map = {str(u): u for u in users_to_rank}
-                    ranked_user_strs = fn(str(curr_user), list(str_map.keys()))
-                    ranked_users = []
-                    seen_ids: set[int] = set()
-                    for s in ranked_user_strs:
-                        u = str_map[s]
-                        if u.id not in seen_ids:
-                            ranked_users.append(u)
-                            seen_ids.add(u.id)
-                    new_matches = [
-                        u for u in ranked_users if u.id not in existing_match_ids
-                    ]
-                    db_session.add_all(
-                        Match(user1=curr_user, user2=u) for u in new_matches
                     )
+                users_to_rank = db_session.exec(query).all()
+                # str() reads each user's schedule, so build them while the session is live
+                str_map = {str(u): u for u in users_to_rank}
+                return curr_user, str(curr_user), str_map, existing_match_ids
+
+        curr_user, curr_user_str, str_map, existing_match_ids = await run_in_db(
+            candidates
+        )
+        if curr_user is None:
+            return fh.Main(
+                fh.P(
+                    "You must be logged in to view your matches.",
+                    cls=f"{large_text} text-{text_color} text-center",
+                ),
+                cls=page_ctnt,
+            )
+
+        ranked_user_strs = []
+        if str_map:
+            ranked_user_strs = await call_remote(
+                rank_users, curr_user_str, list(str_map.keys())
+            )
+
+        return await run_in_db(
+            save_and_render_matches,
+            curr_user,
+            ranked_user_strs,
+            str_map,
+            max_matches_show,
+        )
+
+    def save_and_render_matches(curr_user, ranked_user_strs, str_map, max_matches_show):
+        with get_db_session() as db_session:
+            ranked_users: list[User] = []
+            if curr_user.waiting_for_match:
+                ranked_users = [str_map[s] for s in ranked_user_strs]
+                # re-ranked pairs update this side's score instead of adding a row
+                upsert_matches(
+                    db_session,
+                    curr_user.id,
+                    {
+                        u.id: 1 - i / len(ranked_users)
+                        for i, u in enumerate(ranked_users)
+                    },
+                )
 
                 curr_user.waiting_for_match = False
                 db_session.commit()
-                db_session.refresh(curr_user)
 
-            display_users: list[User] = []
             if ranked_users:
-                display_users = ranked_users[:max_matches_show]
+                display_ids = [u.id for u in ranked_users]
             else:
+                # best-ranked first, pairs only the other side ranked last
                 existing_matches = sorted(
-                    curr_user.incoming_matches + curr_user.outgoing_matches,
-                    key=lambda m: m.created_at,
+                    db_session.exec(matches_of(curr_user.id)),
+                    key=lambda m: (
+                        m.score_of(curr_user.id) is None,
+                        -(m.score_of(curr_user.id) or 0),
+                        m.created_at,
+                    ),
                 )
-                seen_ids: set[int] = set()
-                for m in existing_matches:
-                    if len(display_users) >= max_matches_show:
-                        break
-                    other = m.user1 if m.user1.id != curr_user.id else m.user2
-                    if other.id not in seen_ids:
-                        display_users.append(other)
-                        seen_ids.add(other.id)
-            matches = display_users
+                display_ids = [m.partner_id(curr_user.id) for m in existing_matches]
+            display_ids = display_ids[:max_matches_show]
+            matches = []
+            if display_ids:
+                # one query fills in the card columns the ranking load skipped
+                query = (
+                    select(User)
+                    .where(User.id.in_(display_ids), User.deleted_at.is_(None))
+                    .options(*MATCH_CARD)
+                )
+                cards = {u.id: u for u in db_session.exec(query).all()}
+                matches = [cards[i] for i in display_ids if i in cards]
 
             if not matches:
                 return fh.Main(
@@ -733,7 +935,10 @@ def get_app():  # noqa: C901
                         *[
                             fh.Div(
                                 fh.Div(
-                                    profile_img(src=u.profile_img, cls="size-48"),
+                                    profile_img(
+                                        src=profile_img_src(u, "192"),
+                                        cls="size-48",
+                                    ),
                                     fh.Div(
                                         fh.H2(
                                             u.username or u.email,
@@ -822,8 +1027,8 @@ def get_app():  # noqa: C901
                                             cls="flex flex-col justify-center items-start gap-2",
                                         ),
                                         schedule_img(
-                                            u.schedule.img
-                                            if u.schedule and u.schedule.img
+                                            img_src(u.schedule.img_hash, "schedule")
+                                            if u.schedule
                                             else ""
                                         ),
                                         cls=f"{input_cls} p-8 {xsmall_text} flex flex-col gap-4",
@@ -904,6 +1109,47 @@ def get_app():  # noqa: C901
                     ws_send=True,
                     cls="w-full relative",
                 ),
+                fh.Script(
+                    """
+                    (() => {
+                        const feed = document.getElementById('feed');
+                        const list = document.getElementById('msg-list');
+                        let atBottom = true;
+                        const nearBottom = () =>
+                            list.scrollHeight - list.scrollTop - list.clientHeight < 80;
+
+                        // a broadcast can race a catch-up page: keep the first copy
+                        function settle() {
+                            const seen = new Set();
+                            list.querySelectorAll(':scope > [data-cursor]').forEach(el => {
+                                if (seen.has(el.id)) el.remove();
+                                else seen.add(el.id);
+                            });
+                            if (atBottom) list.scrollTop = list.scrollHeight;
+                        }
+
+                        list.scrollTop = list.scrollHeight;
+                        list.addEventListener('htmx:oobBeforeSwap', () => atBottom = nearBottom());
+                        list.addEventListener('htmx:oobAfterSwap', settle);
+                        list.addEventListener('htmx:afterSwap', e => {
+                            if (e.detail.target === list) settle();
+                        });
+
+                        // (re)connected: fetch whatever was posted while the socket was down
+                        feed.addEventListener('htmx:wsOpen', () => {
+                            const cards = list.querySelectorAll(':scope > [data-cursor]');
+                            const last = cards[cards.length - 1];
+                            atBottom = nearBottom();
+                            htmx.ajax(
+                                'GET',
+                                '/feed/newer' + (last ? '?after=' + encodeURIComponent(last.dataset.cursor) : ''),
+                                {target: list, swap: 'beforeend'},
+                            );
+                        });
+                    })();
+                    """
+                ),
+                id="feed",
                 hx_ext="ws",
                 ws_connect="ws",
                 cls=f"w-full md:w-2/3 {input_cls} p-8 flex flex-col justify-start items-center gap-8",
@@ -1252,7 +1498,9 @@ def get_app():  # noqa: C901
             return fh.Main(
                 fh.Div(
                     fh.Div(
-                        profile_img(src=curr_user.profile_img, cls="size-20"),
+                        profile_img(
+                            src=profile_img_src(curr_user, "80"), cls="size-20"
+                        ),
                         fh.Button(
                             fh.P(
                                 "Edit",
@@ -1503,8 +1751,8 @@ def get_app():  # noqa: C901
                     fh.Div(
                         fh.P("Schedule:", cls=f"font-semibold text-{text_color}"),
                         schedule_img(
-                            curr_user.schedule.img
-                            if curr_user.schedule and curr_user.schedule.img
+                            img_src(curr_user.schedule.img_hash, "schedule")
+                            if curr_user.schedule
                             else ""
                         ),
                         cls="w-full flex flex-col justify-center items-start gap-4",
@@ -1524,61 +1772,28 @@ def get_app():  # noqa: C901
             )
 
     # helper fns
-    def validate_image_base64(image_base64: str) -> dict[str, str]:
-        max_file_size = 10  # MB
-        max_img_dim = (4096, 4096)
-
-        # Verify MIME type and magic #
-        img = Image.open(io.BytesIO(base64.b64decode(image_base64)))
-        try:
-            img.verify()
-        except Exception as e:
-            return {"error": e}
-
-        # Limit img size
-        if len(image_base64) > max_file_size * 1024 * 1024:
-            return {"error": f"File size exceeds {max_file_size}MB limit."}
-        if img.size[0] > max_img_dim[0] or img.size[1] > max_img_dim[1]:
-            return {
-                "error": f"Image dimensions exceed {max_img_dim[0]}x{max_img_dim[1]} pixels limit."
-            }
-
-        # Run antivirus
-        # write image_base64 to tmp file
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(base64.b64decode(image_base64))
-            tmp_file_path = tmp_file.name
-
+    async def scan_image_bytes(img_bytes: bytes) -> dict:
         try:
-            result = subprocess.run(  # noqa: S603
-                ["python", "main.py", str(tmp_file_path)],  # noqa: S607
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=PARENT_PATH / "Python-Antivirus"
-                if modal.is_local()
-                else "/root/Python-Antivirus",
-            )
-            scan_result = result.stdout.strip().lower()
-            if scan_result == "infected":
+            if await scanner.scan_async(img_bytes):
                 return {"error": "Potential threat detected."}
         except Exception as e:
             return {"error": f"Error during antivirus scan: {e}"}
+        return {"success": img_bytes}
 
-        return {"success": image_base64}
-
-    def validate_image_file(
+    async def validate_image_file(
         image_file: fh.UploadFile | None,
-    ) -> dict[str, str]:
+    ) -> dict:
         if image_file is not None:
-            valid_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"}
             file_extension = Path(image_file.filename).suffix.lower()
-            if file_extension not in valid_extensions:
+            if file_extension not in VALID_EXTENSIONS:
                 return {"error": "Invalid file type. Please upload an image."}
-            image_file.file.seek(0)  # reset pointer in case of multiple uploads
-            img_bytes = image_file.file.read()
-            image_base64 = base64.b64encode(img_bytes).decode("utf-8")
-            return validate_image_base64(image_base64)
+            img_bytes = await read_upload(image_file)
+            if img_bytes is None:
+                return {"error": f"File size exceeds {MAX_UPLOAD_MB}MB limit."}
+            res = await in_upload_pool(validate_image_bytes, img_bytes)
+            if "error" in res.keys():
+                return res
+            return await scan_image_bytes(img_bytes)
         return {"error": "No image uploaded"}
 
     def send_password_reset_email(email, reset_link):
@@ -1647,6 +1862,7 @@ def get_app():  # noqa: C901
 
     # pages
     @f_app.get("/")
+    @in_db
     def home(
         session,
     ):
@@ -1661,18 +1877,20 @@ def get_app():  # noqa: C901
         )
 
     @f_app.get("/matches")
-    def matches(session):
+    async def matches(session):
+        content = await matches_content(session)
         return (
             fh.Title(f"{APP_NAME} | matches"),
             fh.Div(
                 toast_container(),
-                nav(session, "matches"),
-                matches_content(session),
+                await run_in_db(nav, session, "matches"),
+                content,
                 cls=main_page,
             ),
         )
 
     @f_app.get("/feed")
+    @in_db
     def feed(session):
         return (
             fh.Title(f"{APP_NAME} | feed"),
@@ -1684,7 +1902,32 @@ def get_app():  # noqa: C901
             ),
         )
 
+    @f_app.get("/feed/older")
+    @in_db
+    def feed_older_page(session, before: str):
+        if not get_curr_user(session):
+            return fh.Response(status_code=401)
+        with get_db_session() as db_session:
+            try:
+                messages = feed_page(db_session, feed_page_size, before=before)
+            except ValueError:
+                return fh.Response(status_code=400)
+            return feed_older(messages), *[feed_msg(m) for m in messages]
+
+    @f_app.get("/feed/newer")
+    @in_db
+    def feed_newer_page(session, after: str | None = None):
+        if not get_curr_user(session):
+            return fh.Response(status_code=401)
+        with get_db_session() as db_session:
+            try:
+                messages = feed_page(db_session, feed_page_size, after=after)
+            except ValueError:
+                return fh.Response(status_code=400)
+            return *[feed_msg(m) for m in messages], feed_newer(messages)
+
     @f_app.get("/signup")
+    @in_db
     def signup_page(req, session):
         return (
             fh.Title(f"{APP_NAME} | sign up"),
@@ -1697,6 +1940,7 @@ def get_app():  # noqa: C901
         )
 
     @f_app.get("/login")
+    @in_db
     def login_page(req, session):
         return (
             fh.Title(f"{APP_NAME} | log in"),
@@ -1709,6 +1953,7 @@ def get_app():  # noqa: C901
         )
 
     @f_app.get("/forgot-password")
+    @in_db
     def forgot_password_page(session):
         return (
             fh.Title(f"{APP_NAME} | forgot password"),
@@ -1721,6 +1966,7 @@ def get_app():  # noqa: C901
         )
 
     @f_app.get("/reset-password")
+    @in_db
     def reset_password_page(req, session):
         token = req.query_params.get("token")
         return (
@@ -1734,6 +1980,7 @@ def get_app():  # noqa: C901
         )
 
     @f_app.get("/settings")
+    @in_db
     def settings_page(session):
         return (
             fh.Title(f"{APP_NAME} | settings"),
@@ -1787,8 +2034,8 @@ def get_app():  # noqa: C901
         return None
 
     @f_app.post("/set-schedule")
-    def set_schedule(session, schedule_img_file: fh.UploadFile):
-        res = validate_image_file(schedule_img_file)
+    async def set_schedule(session, schedule_img_file: fh.UploadFile):
+        res = await validate_image_file(schedule_img_file)
         if "error" in res.keys():
             return (
                 fh.Div(
@@ -1798,11 +2045,10 @@ def get_app():  # noqa: C901
                 toast_container(message=res["error"], type="error", hidden=False),
             )
 
-        schedule_img_str = f"data:image/png;base64,{res['success']}"
-        is_valid_schedule, schedule_text = (
-            get_schedule_text.local(schedule_img_str)
-            if modal.is_local()
-            else get_schedule_text.remote(schedule_img_str)
+        img_bytes = res["success"]
+        schedule_img_str = to_data_url(img_bytes)
+        is_valid_schedule, schedule_text = await call_remote(
+            get_schedule_text, schedule_img_str
         )
         if not is_valid_schedule:
             return (
@@ -1815,13 +2061,10 @@ def get_app():  # noqa: C901
                 ),
             )
 
-        with get_db_session() as db_session:
-            schedule = Schedule(img=schedule_img_str, text=schedule_text)
-            db_session.add(schedule)
-            db_session.commit()
-            db_session.refresh(schedule)
-            session["schedule_id"] = schedule.id
-            return schedule_img(schedule_img_str)
+        img_hash = await asyncio.to_thread(blob_store.put, img_bytes)
+        schedule = await run_in_db(save_schedule, img_hash, schedule_text)
+        session["schedule_id"] = schedule.id
+        return schedule_img(img_src(schedule.img_hash, "schedule"))
 
     @f_app.post("/set-bio")
     def set_bio(session, bio_text: str):
@@ -1830,6 +2073,7 @@ def get_app():  # noqa: C901
 
     ## find matches
     @f_app.post("/find-matches")
+    @in_db
     def find_matches(session):
         if not session["major"]:
             return toast_container(
@@ -1893,11 +2137,69 @@ def get_app():  # noqa: C901
         return fh.Redirect("/matches")
 
     ## feed
-    def on_connect(ws, send):
-        feed_users[id(ws)] = send
+    feed_channel = "feed"
 
-    def on_disconnect(ws):
-        feed_users.pop(id(ws), None)
+    def write_feed_messages(rows: list[dict]) -> list[int | None]:
+        # the posts whose users have budget left, None for the refused ones
+        with get_db_session() as db_session:
+            created_at = lock_feed_writes(db_session)  # first, then the budgets
+            now = time.time()
+            allowed = [False] * len(rows)
+            # in user id order, so concurrent batches lock budgets in one order
+            for i in sorted(range(len(rows)), key=lambda i: rows[i]["user_id"]):
+                allowed[i] = feed_budget.allow(db_session, rows[i]["user_id"], now)
+            accepted = [
+                row | {"created_at": created_at} for row, ok in zip(rows, allowed) if ok
+            ]
+            message_ids = []
+            if accepted:
+                message_ids = db_session.exec(
+                    insert(FeedMessage).returning(
+                        FeedMessage.id, sort_by_parameter_order=True
+                    ),
+                    params=accepted,
+                ).all()
+            db_session.commit()
+            message_ids = iter(message_ids)
+            return [next(message_ids)[0] if ok else None for ok in allowed]
+
+    async def write_feed_batch(rows: list[dict]) -> list[int | None]:
+        return await run_in_db(write_feed_messages, rows)  # one transaction
+
+    async def publish_feed_message(message_id: int | None):
+        # only the id, once committed: every container loads and renders the
+        # message itself. at most once, a failed publish is printed, not retried
+        if message_id is not None:
+            await feed_pubsub.publish(feed_channel, str(message_id))
+
+    feed_writer = get_write_behind(write_feed_batch, publish_feed_message)
+
+    def render_feed_message(message_id: int):
+        current_uow().use_primary()  # just written, perhaps not on the replica yet
+        with get_db_session() as db_session:
+            message = feed_message(db_session, message_id)
+            return fh.to_xml(feed_append(message)) if message else None
+
+    async def on_feed_message(payload: str):
+        # rendered to HTML once per container, queued for each of its sockets
+        rendered = await run_in_db(render_feed_message, int(payload))
+        if rendered:
+            feed_broadcaster.publish(rendered)
+
+    # async, so they run on the event loop the sender tasks live on
+    async def on_connect(ws, send):
+        await feed_pubsub.subscribe(feed_channel, on_feed_message)
+        feed_broadcaster.connect(id(ws), send, ws.close)
+
+    async def on_disconnect(ws):
+        feed_broadcaster.disconnect(id(ws))
+
+    def posting_too_fast():
+        return toast_container(
+            message="You're posting too fast, slow down a little.",
+            type="error",
+            hidden=False,
+        )
 
     @f_app.ws("/ws", conn=on_connect, disconn=on_disconnect)
     async def ws(session, msg: str, send):
@@ -1909,16 +2211,31 @@ def get_app():  # noqa: C901
                 )
             )
             return
+        user_uuid = session.get("user_uuid")
+        if not user_uuid:
+            return
+        if not feed_limiter.allow(user_uuid):
+            await send(posting_too_fast())
+            return
 
-        curr_user = get_curr_user(session)
-        with get_db_session() as db_session:
-            msg = FeedMessage(message=msg, user=curr_user)
-            db_session.add(msg)
-            db_session.commit()
-            db_session.refresh(msg)
-
-        for u in feed_users.values():
-            await u(feed_msgs())
+        curr_user = await run_in_db(get_curr_user, session)
+        if not curr_user:
+            return
+        row = {"message": msg, "user_id": curr_user.id}  # stamped when written
+        try:
+            message_id = await feed_writer.submit(row)
+        except Exception as e:
+            print(f"Error posting feed message: {e!r}")
+            await send(
+                toast_container(
+                    message="Couldn't post your message, please try again.",
+                    type="error",
+                    hidden=False,
+                )
+            )
+            return
+        if message_id is None:
+            await send(posting_too_fast())
 
     ## overlay
     def overlay(session):
@@ -1929,7 +2246,7 @@ def get_app():  # noqa: C901
 
         return fh.Div(
             fh.Div(
-                profile_img(src=curr_user.profile_img, cls="size-12"),
+                profile_img(src=profile_img_src(curr_user, "48"), cls="size-12"),
                 fh.P(
                     curr_user.username
                     if len(curr_user.username) <= max_username_length
@@ -1993,174 +2310,160 @@ def get_app():  # noqa: C901
             del session["user_uuid"]
         return fh.Redirect("/")
 
-    @f_app.post("/auth/login")
-    def email_login(session, email: str, password: str):
+    def find_user_by_email(email: str) -> User | None:
         with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
-            if not db_user:
-                return fh.Redirect("/signup")
-            else:
-                if not db_user.hashed_password:
-                    return toast_container(
-                        message="This account uses a different login method.",
-                        type="error",
-                        hidden=False,
-                    )
-                if not pbkdf2_sha256.verify(password, db_user.hashed_password):
-                    return toast_container(
-                        message="Incorrect credentials", type="error", hidden=False
-                    )
-                else:
-                    session["user_uuid"] = db_user.uuid
-                    if session["waiting_for_match"]:
-                        db_user.graduation_year = int(session["graduation_year"])
-                        db_user.major = session["major"]
-                        db_user.minor = session["minor"]
-                        db_user.interests = json.loads(session["interests"])
-                        db_user.personality_traits = json.loads(session["traits"])
-                        db_user.schedule = db_session.exec(
-                            select(Schedule).where(
-                                Schedule.id == session["schedule_id"]
-                            )
-                        ).first()
-                        db_user.bio = session["bio"]
-                        db_user.waiting_for_match = session["waiting_for_match"]
-                        db_session.commit()
-                        db_session.refresh(db_user)
-
-                        session["major"] = ""
-                        session["minor"] = ""
-                        session["graduation_year"] = ""
-                        session["interests"] = ""
-                        session["traits"] = ""
-                        session["schedule_id"] = ""
-                        session["bio"] = ""
-                        session["waiting_for_match"] = ""
-                    return fh.Redirect("/matches")
+            query = select(User).where(User.email == email).options(*USER_AUTH)
+            return db_session.exec(query).first()
 
-    @f_app.post("/auth/signup")
-    def email_signup(session, email: str, password: str):
+    def save_schedule(img_hash: str, text: str) -> Schedule:
         with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
-            if db_user:
-                return fh.Redirect("/login")
-            else:
-                extra_data = {
-                    "hashed_password": pbkdf2_sha256.hash(password),
-                }
+            schedule = Schedule(img_hash=img_hash, text=text)
+            db_session.add(schedule)
+            db_session.commit()
+            db_session.refresh(schedule)
+            return schedule
+
+    def log_in(session, db_user: User):
+        # attach the profile filled in before signing up, if any
+        session["user_uuid"] = db_user.uuid
+        if not session["waiting_for_match"]:
+            return
+        with get_db_session() as db_session:
+            db_user.graduation_year = int(session["graduation_year"])
+            db_user.major = session["major"]
+            db_user.minor = session["minor"]
+            db_user.interests = json.loads(session["interests"])
+            db_user.personality_traits = json.loads(session["traits"])
+            db_user.schedule = db_session.exec(
+                select(Schedule).where(Schedule.id == session["schedule_id"])
+            ).first()
+            db_user.bio = session["bio"]
+            db_user.waiting_for_match = session["waiting_for_match"]
+            db_session.commit()
+            db_session.refresh(db_user)
+
+        session["major"] = ""
+        session["minor"] = ""
+        session["graduation_year"] = ""
+        session["interests"] = ""
+        session["traits"] = ""
+        session["schedule_id"] = ""
+        session["bio"] = ""
+        session["waiting_for_match"] = ""
+
+    @f_app.post("/auth/login")
+    async def email_login(session, email: str, password: str):
+        db_user = await run_in_db(find_user_by_email, email)
+        if not db_user:
+            return fh.Redirect("/signup")
+        if not db_user.hashed_password:
+            return toast_container(
+                message="This account uses a different login method.",
+                type="error",
+                hidden=False,
+            )
+        # pbkdf2 is deliberately slow, keep it off the event loop
+        if not await asyncio.to_thread(
+            pbkdf2_sha256.verify, password, db_user.hashed_password
+        ):
+            return toast_container(
+                message="Incorrect credentials", type="error", hidden=False
+            )
+        await run_in_db(log_in, session, db_user)
+        return fh.Redirect("/matches")
+
+    @f_app.post("/auth/signup")
+    async def email_signup(session, email: str, password: str):
+        if await run_in_db(find_user_by_email, email):
+            return fh.Redirect("/login")
+        hashed_password = await asyncio.to_thread(pbkdf2_sha256.hash, password)
+
+        def sign_up():
+            with get_db_session() as db_session:
                 db_user = User.model_validate(
                     {
                         "login_type": "email",
-                        "profile_img": f"data:image/svg+xml;base64,{base64.b64encode(f'<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"100\" height=\"100\" viewBox=\"0 0 100 100\"><circle cx=\"50\" cy=\"50\" r=\"50\" fill=\"{tailwind_to_hex[click_color]}\"/><text x=\"50\" y=\"60\" font-size=\"40\" text-anchor=\"middle\" fill=\"{tailwind_to_hex[text_color]}\" font-family=\"{font_hex}\">{email[0].upper()}</text></svg>'.encode()).decode()}",
                         "email": email,
                         "username": email,
                     },
-                    update=extra_data,
+                    update={"hashed_password": hashed_password},
                 )
                 db_session.add(db_user)
                 db_session.commit()
                 db_session.refresh(db_user)
-                session["user_uuid"] = db_user.uuid
-                if session["waiting_for_match"]:
-                    db_user.graduation_year = int(session["graduation_year"])
-                    db_user.major = session["major"]
-                    db_user.minor = session["minor"]
-                    db_user.interests = json.loads(session["interests"])
-                    db_user.personality_traits = json.loads(session["traits"])
-                    db_user.schedule = db_session.exec(
-                        select(Schedule).where(Schedule.id == session["schedule_id"])
-                    ).first()
-                    db_user.bio = session["bio"]
-                    db_user.waiting_for_match = session["waiting_for_match"]
-                    db_session.commit()
-                    db_session.refresh(db_user)
-
-                    session["major"] = ""
-                    session["minor"] = ""
-                    session["graduation_year"] = ""
-                    session["interests"] = ""
-                    session["traits"] = ""
-                    session["schedule_id"] = ""
-                    session["bio"] = ""
-                    session["waiting_for_match"] = ""
-                return fh.Redirect("/matches")
+            log_in(session, db_user)
+
+        await run_in_db(sign_up)
+        return fh.Redirect("/matches")
 
     @f_app.post("/auth/forgot-password")
-    def forgot_password(session, email: str):
+    async def forgot_password(session, email: str):
         token_expiry = 24  # hours
 
-        with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
-            if not db_user:
-                return fh.Redirect("/login")
-            if db_user.login_type != "email":
-                return toast_container(
-                    message="This account uses a different login method.",
-                    type="error",
-                    hidden=False,
+        def set_reset_token():
+            with get_db_session() as db_session:
+                db_user = db_session.exec(
+                    select(User).where(User.email == email)
+                ).first()
+                if not db_user or db_user.login_type != "email":
+                    return db_user, None
+                db_user.reset_token = str(uuid.uuid4())
+                db_user.reset_token_expiry = to_local(datetime.now()) + timedelta(
+                    hours=token_expiry
                 )
+                db_session.add(db_user)
+                db_session.commit()
+                return db_user, db_user.reset_token
 
-            reset_token = str(uuid.uuid4())
-            db_user.reset_token = reset_token
-            db_user.reset_token_expiry = to_local(datetime.now()) + timedelta(
-                hours=token_expiry
-            )
-            db_session.add(db_user)
-            db_session.commit()
-            db_session.refresh(db_user)
-            reset_link = f"{os.getenv('DOMAIN')}/reset-password?token={reset_token}"
-            send_password_reset_email(email, reset_link)
-
+        db_user, reset_token = await run_in_db(set_reset_token)
+        if not db_user:
             return fh.Redirect("/login")
+        if not reset_token:
+            return toast_container(
+                message="This account uses a different login method.",
+                type="error",
+                hidden=False,
+            )
+        reset_link = f"{os.getenv('DOMAIN')}/reset-password?token={reset_token}"
+        await asyncio.to_thread(send_password_reset_email, email, reset_link)
+        return fh.Redirect("/login")
 
     @f_app.post("/auth/reset-password")
-    def reset_password(session, password: str, confirm_password: str, token: str):
+    async def reset_password(session, password: str, confirm_password: str, token: str):
         if password != confirm_password:
             return toast_container(
                 message="Passwords do not match", type="error", hidden=False
             )
         if not token:
             return fh.Redirect("/login")
+        hashed_password = await asyncio.to_thread(pbkdf2_sha256.hash, password)
 
-        with get_db_session() as db_session:
-            query = select(User).where(User.reset_token == token)
-            db_user = db_session.exec(query).first()
-            if not db_user:
-                return fh.Redirect(loc="/login")
-            if to_local(db_user.reset_token_expiry) < to_local(datetime.now()):
-                return fh.Redirect("/login")
-
-            db_user.hashed_password = pbkdf2_sha256.hash(password)
-            db_user.reset_token = None
-            db_user.reset_token_expiry = None
-            db_session.add(db_user)
-            db_session.commit()
-            db_session.refresh(db_user)
-            return fh.Redirect("/login")
-
-    @f_app.get("/redirect-github")
-    def redirect_github(
-        request, session, code: str | None = None, error: str | None = None
-    ):
-        if not code or error:
-            return fh.Redirect("/login")
+        def reset():
+            current_uow().use_primary()  # the token was written moments ago
+            with get_db_session() as db_session:
+                query = select(User).where(User.reset_token == token)
+                db_user = db_session.exec(query).first()
+                if not db_user:
+                    return
+                if to_local(db_user.reset_token_expiry) < to_local(datetime.now()):
+                    return
+
+                db_user.hashed_password = hashed_password
+                db_user.reset_token = None
+                db_user.reset_token_expiry = None
+                db_session.add(db_user)
+                db_session.commit()
 
-        redir = redir_url(request, "/redirect-github")
-        user_info = github_client.retr_info(code, redir)
-        email = user_info.get("email", "")
-        username = user_info.get("login", "")
+        await run_in_db(reset)
+        return fh.Redirect("/login")
 
+    def oauth_log_in(session, login_type: str, email: str, username: str):
         with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
+            db_user = find_user_by_email(email)
             if not db_user:
                 db_user = User.model_validate(
                     {
-                        "login_type": "github",
-                        "profile_img": f"data:image/svg+xml;base64,{base64.b64encode(f'<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"100\" height=\"100\" viewBox=\"0 0 100 100\"><circle cx=\"50\" cy=\"50\" r=\"50\" fill=\"{tailwind_to_hex[click_color]}\"/><text x=\"50\" y=\"60\" font-size=\"40\" text-anchor=\"middle\" fill=\"{tailwind_to_hex[text_color]}\" font-family=\"{font_hex}\">{email[0].upper() if email else username[0].upper()}</text></svg>'.encode()).decode()}",
+                        "login_type": login_type,
                         "email": email,
                         "username": username,
                     }
@@ -2168,87 +2471,41 @@ def get_app():  # noqa: C901
                 db_session.add(db_user)
                 db_session.commit()
                 db_session.refresh(db_user)
+        log_in(session, db_user)
 
-            session["user_uuid"] = db_user.uuid
-            if session["waiting_for_match"]:
-                db_user.graduation_year = int(session["graduation_year"])
-                db_user.major = session["major"]
-                db_user.minor = session["minor"]
-                db_user.interests = json.loads(session["interests"])
-                db_user.personality_traits = json.loads(session["traits"])
-                db_user.schedule = db_session.exec(
-                    select(Schedule).where(Schedule.id == session["schedule_id"])
-                ).first()
-                db_user.bio = session["bio"]
-                db_user.waiting_for_match = session["waiting_for_match"]
-                db_session.commit()
-                db_session.refresh(db_user)
+    @f_app.get("/redirect-github")
+    async def redirect_github(
+        request, session, code: str | None = None, error: str | None = None
+    ):
+        if not code or error:
+            return fh.Redirect("/login")
 
-                session["major"] = ""
-                session["minor"] = ""
-                session["graduation_year"] = ""
-                session["interests"] = ""
-                session["traits"] = ""
-                session["schedule_id"] = ""
-                session["bio"] = ""
-                session["waiting_for_match"] = ""
-            return fh.RedirectResponse("/matches", status_code=303)
+        redir = redir_url(request, "/redirect-github")
+        user_info = await asyncio.to_thread(github_client.retr_info, code, redir)
+        email = user_info.get("email", "")
+        username = user_info.get("login", "")
+
+        await run_in_db(oauth_log_in, session, "github", email, username)
+        return fh.RedirectResponse("/matches", status_code=303)
 
     @f_app.get("/redirect-google")
-    def redirect_google(
+    async def redirect_google(
         request, session, code: str | None = None, error: str | None = None
     ):
         if not code or error:
             return fh.Redirect("/login")
 
         redir = redir_url(request, "/redirect-google")
-        user_info = google_client.retr_info(code, redir)
+        user_info = await asyncio.to_thread(google_client.retr_info, code, redir)
         email = user_info.get("email", "")
         username = email.split("@")[0] if email else ""
 
-        with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
-            if not db_user:
-                db_user = User.model_validate(
-                    {
-                        "login_type": "google",
-                        "profile_img": f"data:image/svg+xml;base64,{base64.b64encode(f'<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"100\" height=\"100\" viewBox=\"0 0 100 100\"><circle cx=\"50\" cy=\"50\" r=\"50\" fill=\"{tailwind_to_hex[click_color]}\"/><text x=\"50\" y=\"60\" font-size=\"40\" text-anchor=\"middle\" fill=\"{tailwind_to_hex[text_color]}\" font-family=\"{font_hex}\">{email[0].upper() if email else "U"}</text></svg>'.encode()).decode()}",
-                        "email": email,
-                        "username": username,
-                    }
-                )
-                db_session.add(db_user)
-                db_session.commit()
-                db_session.refresh(db_user)
-
-            session["user_uuid"] = db_user.uuid
-            if session["waiting_for_match"]:
-                db_user.graduation_year = int(session["graduation_year"])
-                db_user.major = session["major"]
-                db_user.minor = session["minor"]
-                db_user.interests = json.loads(session["interests"])
-                db_user.personality_traits = json.loads(session["traits"])
-                db_user.schedule = db_session.exec(
-                    select(Schedule).where(Schedule.id == session["schedule_id"])
-                ).first()
-                db_user.bio = session["bio"]
-                db_user.waiting_for_match = session["waiting_for_match"]
-                db_session.commit()
-                db_session.refresh(db_user)
-
-                session["major"] = ""
-                session["minor"] = ""
-                session["graduation_year"] = ""
-                session["interests"] = ""
-                session["traits"] = ""
-                session["schedule_id"] = ""
-                session["bio"] = ""
-                session["waiting_for_match"] = ""
-            return fh.RedirectResponse("/matches", status_code=303)
+        await run_in_db(oauth_log_in, session, "google", email, username)
+        return fh.RedirectResponse("/matches", status_code=303)
 
     ## settings
     @f_app.get("/user/settings/edit")
+    @in_db
     def edit_settings(session):
         curr_user = get_curr_user(session)
         if not curr_user:
@@ -2281,7 +2538,7 @@ def get_app():  # noqa: C901
                             ),
                             profile_img(
                                 id="profile-img-settings",
-                                src=curr_user.profile_img,
+                                src=profile_img_src(curr_user, "80"),
                                 cls=f"hide-when-loading size-20 cursor-pointer hover:{img_hover}",
                             ),
                             spinner(
@@ -2521,8 +2778,8 @@ def get_app():  # noqa: C901
                             cls="hidden",
                         ),
                         schedule_img(
-                            curr_user.schedule.img
-                            if curr_user.schedule and curr_user.schedule.img
+                            img_src(curr_user.schedule.img_hash, "schedule")
+                            if curr_user.schedule
                             else "",
                             cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
                         ),
@@ -2554,24 +2811,24 @@ def get_app():  # noqa: C901
             )
 
     @f_app.post("/user/settings/update-profile")
-    def update_profile(
+    async def update_profile(
         session,
         profile_img_file: fh.UploadFile,
     ):
-        curr_user = get_curr_user(session)
+        curr_user = await run_in_db(get_curr_user, session)
         if not curr_user:
             return toast_container(
                 message="You must be logged in to update your profile.",
                 type="error",
                 hidden=False,
             )
-        res = validate_image_file(profile_img_file)
+        res = await validate_image_file(profile_img_file)
         if "error" in res.keys():
             return (
                 (
                     profile_img(
                         id="profile-img-settings",
-                        src=curr_user.profile_img,
+                        src=profile_img_src(curr_user, "80"),
                         cls=f"hide-when-loading size-20 cursor-pointer hover:{img_hover}",
                     ),
                     toast_container(message=res["error"], type="error", hidden=False),
@@ -2579,11 +2836,12 @@ def get_app():  # noqa: C901
             )
         return profile_img(
             id="profile-img-settings",
-            src=f"data:image/png;base64,{res['success']}",
+            src=to_data_url(res["success"]),
             cls=f"hide-when-loading size-20 cursor-pointer hover:{img_hover}",
         )
 
     @f_app.post("/user/settings/update-email")
+    @in_db
     def update_email(session, email: str):
         curr_user = get_curr_user(session)
         if not curr_user:
@@ -2593,15 +2851,15 @@ def get_app():  # noqa: C901
                 hidden=False,
             )
         with get_db_session() as db_session:
-            query = select(User).where(User.email == email)
-            db_user = db_session.exec(query).first()
-            if db_user:
+            query = select(User.id).where(User.email == email)
+            if db_session.exec(query).first():
                 return toast_container(
                     message="Email already exists", type="error", hidden=False
                 )
         return None
 
     @f_app.post("/user/settings/update-username")
+    @in_db
     def update_username(session, username: str):
         curr_user = get_curr_user(session)
         if not curr_user:
@@ -2611,15 +2869,15 @@ def get_app():  # noqa: C901
                 hidden=False,
             )
         with get_db_session() as db_session:
-            query = select(User).where(User.username == username)
-            db_user = db_session.exec(query).first()
-            if db_user:
+            query = select(User.id).where(User.username == username)
+            if db_session.exec(query).first():
                 return toast_container(
                     message="Username already exists", type="error", hidden=False
                 )
         return None
 
     @f_app.post("/user/settings/update-interest")
+    @in_db
     def update_interest(session, interest: str):
         curr_user = get_curr_user(session)
         if not curr_user:
@@ -2643,6 +2901,7 @@ def get_app():  # noqa: C901
         return None
 
     @f_app.post("/user/settings/update-trait")
+    @in_db
     def update_trait(session, trait: str):
         curr_user = get_curr_user(session)
         if not curr_user:
@@ -2664,11 +2923,11 @@ def get_app():  # noqa: C901
         return None
 
     @f_app.post("/user/settings/update-schedule")
-    def update_schedule(
+    async def update_schedule(
         session,
         schedule_img_file: fh.UploadFile,
     ):
-        curr_user = get_curr_user(session)
+        curr_user = await run_in_db(get_curr_user, session)
         if not curr_user:
             return toast_container(
                 message="You must be logged in to update your schedule.",
@@ -2676,51 +2935,45 @@ def get_app():  # noqa: C901
                 hidden=False,
             )
 
-        with get_db_session() as db_session:
-            curr_user = db_session.merge(curr_user)
-            res = validate_image_file(schedule_img_file)
-            if "error" in res.keys():
-                return (
-                    (
-                        schedule_img(
-                            curr_user.schedule.img
-                            if curr_user.schedule and curr_user.schedule.img
-                            else "",
-                            cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
-                        ),
-                        toast_container(
-                            message=res["error"], type="error", hidden=False
-                        ),
+        def current_schedule_src():
+            if curr_user.schedule is None:
+                return ""
+            return img_src(curr_user.schedule.img_hash, "schedule")
+
+        schedule_src = await run_in_db(current_schedule_src)
+        res = await validate_image_file(schedule_img_file)
+        if "error" in res.keys():
+            return (
+                (
+                    schedule_img(
+                        schedule_src,
+                        cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
                     ),
-                )
-            schedule_img_str = f"data:image/png;base64,{res['success']}"
-            is_valid_schedule, schedule_text = (
-                get_schedule_text.local(schedule_img_str)
-                if modal.is_local()
-                else get_schedule_text.remote(schedule_img_str)
+                    toast_container(message=res["error"], type="error", hidden=False),
+                ),
             )
-            if not is_valid_schedule:
-                return schedule_img(
-                    curr_user.schedule.img
-                    if curr_user.schedule and curr_user.schedule.img
-                    else "",
-                    cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
-                ), toast_container(
-                    message="Invalid schedule image.", type="error", hidden=False
-                )
-            with get_db_session() as db_session:
-                schedule = Schedule(img=schedule_img_str, text=schedule_text)
-                db_session.add(schedule)
-                db_session.commit()
-                db_session.refresh(schedule)
-                session["schedule_id"] = schedule.id
-                return schedule_img(
-                    schedule_img_str,
-                    cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
-                )
+        img_bytes = res["success"]
+        schedule_img_str = to_data_url(img_bytes)
+        is_valid_schedule, schedule_text = await call_remote(
+            get_schedule_text, schedule_img_str
+        )
+        if not is_valid_schedule:
+            return schedule_img(
+                schedule_src,
+                cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
+            ), toast_container(
+                message="Invalid schedule image.", type="error", hidden=False
+            )
+        img_hash = await asyncio.to_thread(blob_store.put, img_bytes)
+        schedule = await run_in_db(save_schedule, img_hash, schedule_text)
+        session["schedule_id"] = schedule.id
+        return schedule_img(
+            img_src(schedule.img_hash, "schedule"),
+            cls=f"hide-when-loading cursor-pointer hover:{img_hover}",
+        )
 
     @f_app.patch("/user/settings/save")
-    def save_settings(
+    async def save_settings(
         session,  # interests, traits, bio stored in session
         profile_img_file: fh.UploadFile | None = None,
         email: str | None = None,
@@ -2731,7 +2984,7 @@ def get_app():  # noqa: C901
         schedule_img_file: fh.UploadFile | None = None,
         password: str | None = None,
     ):
-        curr_user = get_curr_user(session)
+        curr_user = await run_in_db(get_curr_user, session)
         if not curr_user:
             return toast_container(
                 message="You must be logged in to update your settings.",
@@ -2739,98 +2992,173 @@ def get_app():  # noqa: C901
                 hidden=False,
             )
 
-        with get_db_session() as db_session:
-            curr_user = db_session.merge(curr_user)
-            if profile_img_file is not None and not profile_img_file.filename == "":
-                res = validate_image_file(profile_img_file)
-                if "error" in res.keys():
-                    return toast_container(
-                        message=res["error"], type="error", hidden=False
-                    )
-                curr_user.profile_img = f"data:image/png;base64,{res['success']}"
+        profile_img_hash = None
+        if profile_img_file is not None and not profile_img_file.filename == "":
+            res = await validate_image_file(profile_img_file)
+            if "error" in res.keys():
+                return toast_container(message=res["error"], type="error", hidden=False)
+            profile_img_hash = await asyncio.to_thread(blob_store.put, res["success"])
+
+        hashed_password = None
+        if (
+            curr_user.login_type == "email"
+            and password
+            and not await asyncio.to_thread(
+                pbkdf2_sha256.verify, password, curr_user.hashed_password
+            )
+        ):
+            hashed_password = await asyncio.to_thread(pbkdf2_sha256.hash, password)
 
-            if email and email != curr_user.email:
-                query = select(User).where(User.email == email)
-                db_user = db_session.exec(query).first()
-                if db_user:
-                    return toast_container(
-                        message="Email already exists", type="error", hidden=False
-                    )
-                curr_user.email = email
+        def save():
+            with get_db_session() as db_session:
+                if profile_img_hash:
+                    curr_user.profile_img_hash = profile_img_hash
+
+                if email and email != curr_user.email:
+                    query = select(User.id).where(User.email == email)
+                    if db_session.exec(query).first():
+                        return toast_container(
+                            message="Email already exists", type="error", hidden=False
+                        )
+                    curr_user.email = email
+
+                if username and username != curr_user.username:
+                    query = select(User.id).where(User.username == username)
+                    if db_session.exec(query).first():
+                        return toast_container(
+                            message="Username already exists",
+                            type="error",
+                            hidden=False,
+                        )
+                    curr_user.username = username
+
+                if major and major != curr_user.major and major != "-- select major --":
+                    curr_user.major = major
+                    curr_user.waiting_for_match = True
+                if (
+                    minor
+                    and minor != curr_user.minor
+                    and minor != "-- select minor (optional) --"
+                ):
+                    curr_user.minor = minor
+                    curr_user.waiting_for_match = True
+                if (
+                    graduation_year
+                    and graduation_year != curr_user.graduation_year
+                    and graduation_year != "-- select graduation year --"
+                ):
+                    curr_user.graduation_year = graduation_year
+                if (
+                    session["interests"]
+                    and json.loads(session["interests"]) != curr_user.interests
+                ):
+                    curr_user.interests = json.loads(session["interests"])
+                    curr_user.waiting_for_match = True
+                if (
+                    session["traits"]
+                    and json.loads(session["traits"]) != curr_user.personality_traits
+                ):
+                    curr_user.personality_traits = json.loads(session["traits"])
+                    curr_user.waiting_for_match = True
+                if session["bio"] and session["bio"] != curr_user.bio:
+                    curr_user.bio = session["bio"]
+                    curr_user.waiting_for_match = True
+                if (
+                    schedule_img_file is not None
+                    and not schedule_img_file.filename == ""
+                    and session["schedule_id"]
+                ):
+                    curr_user.schedule = db_session.exec(
+                        select(Schedule).where(Schedule.id == session["schedule_id"])
+                    ).first()
+                    curr_user.waiting_for_match = True
+                if hashed_password:
+                    curr_user.hashed_password = hashed_password
 
-            if username and username != curr_user.username:
-                query = select(User).where(User.username == username)
-                db_user = db_session.exec(query).first()
-                if db_user:
-                    return toast_container(
-                        message="Username already exists", type="error", hidden=False
-                    )
-                curr_user.username = username
-
-            if major and major != curr_user.major and major != "-- select major --":
-                curr_user.major = major
-                curr_user.waiting_for_match = True
-            if (
-                minor
-                and minor != curr_user.minor
-                and minor != "-- select minor (optional) --"
-            ):
-                curr_user.minor = minor
-                curr_user.waiting_for_match = True
-            if (
-                graduation_year
-                and graduation_year != curr_user.graduation_year
-                and graduation_year != "-- select graduation year --"
-            ):
-                curr_user.graduation_year = graduation_year
-            if (
-                session["interests"]
-                and json.loads(session["interests"]) != curr_user.interests
-            ):
-                curr_user.interests = json.loads(session["interests"])
-                curr_user.waiting_for_match = True
-            if (
-                session["traits"]
-                and json.loads(session["traits"]) != curr_user.personality_traits
-            ):
-                curr_user.personality_traits = json.loads(session["traits"])
-                curr_user.waiting_for_match = True
-            if session["bio"] and session["bio"] != curr_user.bio:
-                curr_user.bio = session["bio"]
-                curr_user.waiting_for_match = True
-            if (
-                schedule_img_file is not None
-                and not schedule_img_file.filename == ""
-                and session["schedule_id"]
-            ):
-                curr_user.schedule = db_session.exec(
-                    select(Schedule).where(Schedule.id == session["schedule_id"])
-                ).first()
-                curr_user.waiting_for_match = True
-            if (
-                curr_user.login_type == "email"
-                and password
-                and not pbkdf2_sha256.verify(password, curr_user.hashed_password)
-            ):
-                curr_user.hashed_password = pbkdf2_sha256.hash(password)
+                db_session.add(curr_user)
+                db_session.commit()
+                db_session.refresh(curr_user)
+            return fh.Redirect("/settings")
 
-            db_session.add(curr_user)
-            db_session.commit()
-            db_session.refresh(curr_user)
-        return fh.Redirect("/settings")
+        return await run_in_db(save)
 
     @f_app.delete("/user/settings/delete-account")
+    @in_db
     def delete_account(session):
         curr_user = get_curr_user(session)
         if curr_user is None:
             return fh.Redirect("/")
         with get_db_session() as db_session:
-            db_session.delete(curr_user)
+            # hidden from every read at once and the email/username freed for reuse;
+            # the row and its messages and matches are purged in the background
+            curr_user.deleted_at = datetime.now(timezone.utc)
+            curr_user.email = curr_user.username = None
+            curr_user.hashed_password = curr_user.reset_token = None
+            curr_user.waiting_for_match = False
+            db_session.add(curr_user)
             db_session.commit()
         session.clear()
         return fh.Redirect("/")
 
+    ## images
+    @f_app.get("/img/{key}/{size}")
+    async def img(req, key: str, size: str):
+        if not is_blob_key(key) or size not in THUMBNAIL_SIZES:
+            return fh.Response(status_code=404)
+
+        # content-addressed, so a (key, size) pair never changes
+        etag = f'"{key}-{size}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+        if not_modified(req, etag):
+            return fh.Response(status_code=304, headers=headers)
+
+        data = await asyncio.to_thread(thumbnails.get, key, size)
+        if data is None:
+            return fh.Response(status_code=404)
+        return fh.Response(data, media_type=sniff_mime(data), headers=headers)
+
+    @f_app.get("/avatar/{initial}/{color}")
+    def avatar(req, initial: str, color: str):
+        if (
+            len(initial) != 1
+            or not initial.isalnum()
+            or not re.fullmatch(r"[0-9A-Fa-f]{6}", color)
+        ):
+            return fh.Response(status_code=404)
+
+        etag = f'"avatar-{quote(initial)}-{color}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+        if not_modified(req, etag):
+            return fh.Response(status_code=304, headers=headers)
+        return fh.Response(
+            render_avatar(initial, color), media_type="image/svg+xml", headers=headers
+        )
+
     ## misc
+    # scraped with `Authorization: Bearer $METRICS_TOKEN`; open locally, off on
+    # Modal until a token is set
+    metrics_token = os.getenv("METRICS_TOKEN")
+
+    @f_app.get("/metrics")
+    def metrics(req):
+        if metrics_token:
+            given = req.headers.get("authorization", "")
+            if not hmac.compare_digest(
+                given.encode(), f"Bearer {metrics_token}".encode()
+            ):
+                return fh.Response(
+                    status_code=401, headers={"WWW-Authenticate": "Bearer"}
+                )
+        elif not modal.is_local():
+            return fh.Response(status_code=404)
+        return fh.Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
     @f_app.get("/{fname:path}.{ext:static}")
     def static_files(fname: str, ext: str):
         static_file_path = PARENT_PATH / f"{fname}.{ext}"
@@ -2848,8 +3176,8 @@ f_app = get_app()
 @app.function(
     image=FE_IMAGE,
     secrets=SECRETS,
+    volumes=VOLUME_CONFIG,
     timeout=24 * 60 * MINUTES,
-    max_containers=1,  # since we're using a session cookie, we need to limit the number of containers
     scaledown_window=60 * MINUTES,
 )
 @modal.concurrent(max_inputs=1000)
@@ -2859,4 +3187,31 @@ def modal_get():
 
 
 if __name__ == "__main__":
-    fh.serve(app="f_app")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes sharing the port, like web containers (no reload)",
+    )
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    if args.workers is None:
+        fh.serve(app="f_app", port=args.port)
+    else:
+        import uvicorn
+
+        if not os.getenv("SESSION_SECRET"):
+            # one key for every worker, persisted like fasthtml's own .sesskey
+            key_path = Path(".sesskey")
+            if not key_path.exists():
+                key_path.write_text(str(uuid.uuid4()))
+            os.environ["SESSION_SECRET"] = key_path.read_text()
+        if isinstance(get_pubsub(), MemoryPubSub):
+            print(
+                "Warning: in-memory pub/sub, feed posts and user cache "
+                "invalidations stay within their worker; use Postgres"
+            )
+        uvicorn.run(
+            "src.app:f_app", host="0.0.0.0", port=args.port, workers=args.workers
+        )
@@ -0,0 +1,712 @@
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+import modal
+
+# -----------------------------------------------------------------------------
+
+
+class _FakeRemoteCall:
+    def __init__(self, latency: float, result):
+        self.latency = latency
+        self.result = result
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _enter(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def __call__(self, *args):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return self.result
+        finally:
+            self.in_flight -= 1
+
+    async def aio(self, *args):
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            return self.result
+        finally:
+            self.in_flight -= 1
+
+
+class _FakeFunction:
+    """Stand-in for a GPU `modal.Function` that only sleeps for `latency` seconds."""
+
+    def __init__(self, latency: float, result):
+        self.remote = _FakeRemoteCall(latency, result)
+        self.local = self.remote
+
+
+def _png_bytes(size: tuple[int, int] = (64, 64)) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", size, "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _noise_image_bytes(size: tuple[int, int], format: str) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(
+        buf, format=format
+    )
+    return buf.getvalue()
+
+
+def _local_app():
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    if not os.getenv("ANTIVIRUS_SIGNATURES_PATH"):
+        signatures = tempfile.mkdtemp()
+        with open(f"{signatures}/hashes.txt", "w") as f:
+            f.write("0" * 64 + "\n")
+        os.environ["ANTIVIRUS_SIGNATURES_PATH"] = signatures
+    # the benches post far faster than a person, from one account
+    os.environ.setdefault("FEED_POST_RATE", "1000000")
+    os.environ.setdefault("FEED_POST_BURST", "1000000")
+
+    from sqlmodel import SQLModel, create_engine
+
+    from src import app as web
+
+    SQLModel.metadata.create_all(create_engine(os.environ["DATABASE_URL"]))
+    return web
+
+
+# -----------------------------------------------------------------------------
+
+
+async def _post_uploads(f_app, n: int, img: bytes) -> list[float]:
+    import httpx
+
+    async def one(client):
+        start = time.perf_counter()
+        r = await client.post(
+            "/set-schedule",
+            files={"schedule_img_file": ("schedule.png", img, "image/png")},
+        )
+        r.raise_for_status()
+        return time.perf_counter() - start
+
+    transport = httpx.ASGITransport(app=f_app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        return await asyncio.gather(*[one(client) for _ in range(n)])
+
+
+def bench_uploads(args):
+    web = _local_app()
+    fake = _FakeFunction(args.gpu_latency, (True, "Mon 9-11am: class"))
+    web.get_schedule_text = fake
+    modal.is_local = lambda: False  # route through `.remote` like on Modal
+
+    img = _png_bytes()
+    print(f"gpu latency: {args.gpu_latency:.2f}s")
+    print(f"{'uploads':>8} {'held':>6} {'wall (s)':>9} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for n in args.concurrency:
+        fake.remote.peak_in_flight = 0
+        start = time.perf_counter()
+        latencies = sorted(asyncio.run(_post_uploads(web.f_app, n, img)))
+        wall = time.perf_counter() - start
+        print(
+            f"{n:>8} {fake.remote.peak_in_flight:>6} {wall:>9.2f} "
+            f"{latencies[len(latencies) // 2]:>8.2f} "
+            f"{latencies[int(len(latencies) * 0.95) - 1]:>8.2f}"
+        )
+
+
+def _legacy_validate(img_bytes: bytes) -> dict:
+    # pre-streaming pipeline: base64 round trip, decoded twice (antivirus excluded)
+    import base64
+
+    from PIL import Image
+
+    image_base64 = base64.b64encode(img_bytes).decode("utf-8")
+    img = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+    img.verify()
+    if len(image_base64) > 10 * 1024 * 1024:
+        return {"error": "too large"}
+    with tempfile.NamedTemporaryFile() as tmp_file:
+        tmp_file.write(base64.b64decode(image_base64))
+    return {"success": image_base64}
+
+
+async def _streaming_validate(img_bytes: bytes) -> dict:
+    from starlette.datastructures import UploadFile
+
+    from src.images import in_upload_pool, read_upload, validate_image_bytes
+
+    data = await read_upload(UploadFile(io.BytesIO(img_bytes), filename="img"))
+    return await in_upload_pool(validate_image_bytes, data)
+
+
+def bench_validate(args):
+    import tracemalloc
+
+    async def streaming(data, n):  # one event loop, like the web container
+        for _ in range(n):
+            res = await _streaming_validate(data)
+        return res
+
+    pipelines = {
+        "legacy": lambda data, n: [_legacy_validate(data) for _ in range(n)][-1],
+        "streaming": lambda data, n: asyncio.run(streaming(data, n)),
+    }
+    images = {
+        "jpeg 2000x1500": _noise_image_bytes((2000, 1500), "JPEG"),
+        "png 1600x1200": _noise_image_bytes((1600, 1200), "PNG"),
+    }
+    print(f"{'image':>16} {'MB':>5} {'pipeline':>10} {'val/s':>8} {'peak MB':>8}")
+    for image_name, data in images.items():
+        for pipeline_name, fn in pipelines.items():
+            assert "success" in fn(data, 1)
+            start = time.perf_counter()
+            fn(data, args.iterations)
+            per_sec = args.iterations / (time.perf_counter() - start)
+
+            tracemalloc.start()
+            fn(data, 1)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{image_name:>16} {len(data) / 2**20:>5.1f} {pipeline_name:>10} "
+                f"{per_sec:>8.1f} {peak / 2**20:>8.1f}"
+            )
+
+
+def _seed_profiles(n: int):
+    """`n` users with full profiles, schedules and a feed message each."""
+    from sqlmodel import Session, create_engine, select
+
+    from src.models import FeedMessage, Schedule, User
+
+    with Session(create_engine(os.environ["DATABASE_URL"])) as session:
+        for i in range(n):
+            user = User(
+                login_type="email",
+                email=f"seed{i}@example.com",
+                username=f"seed{i}",
+                major="Finance",
+                interests=["Chess", "Hiking"],
+                personality_traits=["Curious"],
+                bio="I like long walks. " * 100,
+                schedule=Schedule(text="Mon 9-11am: class\n" * 50),
+            )
+            session.add(FeedMessage(message=f"hello from {i}", user=user))
+        me = session.exec(select(User).where(User.email == "bench@example.com")).one()
+        me.bio, me.interests = "I like benchmarks. " * 100, ["Chess"]
+        session.commit()
+
+
+def bench_queries(args):
+    import re
+
+    from sqlalchemy import event, inspect
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Mapper
+    from starlette.testclient import TestClient
+
+    web = _local_app()
+    statements = []
+    event.listen(
+        Engine, "before_cursor_execute", lambda *a: statements.append(a[2])
+    )  # every engine, so this also measures versions without a request counter
+    user_lookup = re.compile(r"WHERE \"?user\"?\.uuid = ")
+
+    # bytes of column data materialized into ORM objects, deferred loads included
+    loaded = [0]
+
+    def count(target, ctx, attrs=None):
+        state = inspect(target)
+        columns = state.mapper.column_attrs.keys()
+        loaded[0] += sum(
+            len(str(state.dict[key]).encode())
+            for key in attrs or state.dict.keys()
+            if key in columns and state.dict.get(key) is not None
+        )
+
+    event.listen(Mapper, "load", count)
+    event.listen(Mapper, "refresh", count)
+
+    # one portal for every request: pooled asyncpg connections are tied to their loop
+    with TestClient(web.f_app) as client:
+        client.post(
+            "/auth/signup", data={"email": "bench@example.com", "password": "x"}
+        )
+        _seed_profiles(args.users)
+        print(f"{'page':>20} {'queries':>8} {'user lookups':>13} {'loaded (KB)':>12}")
+        for page in args.pages:
+            statements.clear()
+            loaded[0] = 0
+            client.get(page).raise_for_status()
+            lookups = sum(bool(user_lookup.search(s)) for s in statements)
+            print(
+                f"{page:>20} {len(statements):>8} {lookups:>13} "
+                f"{loaded[0] / 1024:>12.1f}"
+            )
+
+
+def _serve(f_app):
+    import socket
+    import threading
+
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(f_app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def _feed_traffic(base_url: str, n_clients: int, n_messages: int):
+    import json
+
+    import httpx
+    import websockets
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        await http.post(
+            "/auth/signup",
+            data={"email": f"feed{n_clients}@example.com", "password": "x"},
+        )
+        cookie = "; ".join(f"{k}={v}" for k, v in http.cookies.items())
+        sockets = [
+            await websockets.connect(
+                base_url.replace("http", "ws", 1) + "/ws",
+                additional_headers={"Cookie": cookie},
+                max_size=None,
+                ping_interval=None,  # a blocked server loop can't answer pings
+            )
+            for _ in range(n_clients)
+        ]
+        for ws in sockets:
+            # an empty message is answered with the input + a toast, once the
+            # connection has been registered for broadcasts
+            await ws.send(json.dumps({"msg": ""}))
+            await ws.recv()
+            await ws.recv()
+
+        done = asyncio.Event()
+        page_latencies = []
+
+        async def post(ws):
+            for i in range(n_messages):
+                await ws.send(json.dumps({"msg": f"message {i}"}))
+
+        async def read(ws):
+            # every message is broadcast to every client
+            broadcasts = 0
+            while broadcasts < n_clients * n_messages:
+                broadcasts += 'id="msg-list"' in await ws.recv()
+
+        async def load_pages():
+            while not done.is_set():
+                start = time.perf_counter()
+                (await http.get("/settings")).raise_for_status()
+                page_latencies.append(time.perf_counter() - start)
+
+        pages = asyncio.create_task(load_pages())
+        start = time.perf_counter()
+        await asyncio.gather(*map(post, sockets), *map(read, sockets))
+        wall = time.perf_counter() - start
+        done.set()
+        await pages
+        for ws in sockets:
+            await ws.close()
+    return wall, sorted(page_latencies)
+
+
+def bench_feed(args):
+    """Run against Postgres (DATABASE_URL) to compare with the sync engine.
+
+    commits counts feed write transactions; posts arriving together share one.
+    """
+    web = _local_app()
+    base_url = _serve(web.f_app)
+
+    from src.feed import feed_write_batch
+
+    print(
+        f"{'clients':>8} {'messages':>9} {'msg/s':>7} {'commits':>8} "
+        f"{'page p50 (ms)':>14} {'page p95 (ms)':>14}"
+    )
+    for n in args.clients:
+        commits = feed_write_batch.count
+        wall, pages = asyncio.run(_feed_traffic(base_url, n, args.messages))
+        print(
+            f"{n:>8} {n * args.messages:>9} {n * args.messages / wall:>7.1f} "
+            f"{feed_write_batch.count - commits:>8} "
+            f"{pages[len(pages) // 2] * 1000:>14.1f} "
+            f"{pages[int(len(pages) * 0.95) - 1] * 1000:>14.1f}"
+        )
+
+
+def _seed_feed(user_email: str, n: int):
+    from sqlalchemy import delete, insert
+    from sqlmodel import Session, create_engine, select
+
+    from src.models import FeedMessage, User
+
+    with Session(create_engine(os.environ["DATABASE_URL"])) as session:
+        user_id = session.exec(select(User.id).where(User.email == user_email)).one()
+        session.exec(delete(FeedMessage))
+        if n:
+            session.exec(
+                insert(FeedMessage),
+                params=[
+                    {"message": f"history {i} " * 10, "user_id": user_id}
+                    for i in range(n)
+                ],
+            )
+        session.commit()
+
+
+async def _broadcast_cost(base_url: str, args) -> list[tuple]:
+    import json
+
+    import httpx
+    import websockets
+
+    from src.feed import feed_delivery_seconds
+
+    email = "broadcast@example.com"
+    rows = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        await http.post("/auth/signup", data={"email": email, "password": "x"})
+        cookie = "; ".join(f"{k}={v}" for k, v in http.cookies.items())
+        for history in args.history:
+            _seed_feed(email, history)
+            # /feed: the latest page of messages, whatever the history length
+            start = time.perf_counter()
+            page = (await http.get("/feed")).text
+            page_ms = (time.perf_counter() - start) * 1000
+            page_bytes = page.index("<form") - page.index('id="msg-list"')
+            for n_clients in args.clients:
+                sockets = [
+                    await websockets.connect(
+                        base_url.replace("http", "ws", 1) + "/ws",
+                        additional_headers={"Cookie": cookie},
+                        max_size=None,
+                        ping_interval=None,
+                    )
+                    for _ in range(n_clients)
+                ]
+                for ws in sockets:  # registered once the empty-message toast is back
+                    await ws.send(json.dumps({"msg": ""}))
+                    await ws.recv()
+                    await ws.recv()
+
+                async def receive(ws):
+                    while 'id="msg-list"' not in (frame := await ws.recv()):
+                        pass
+                    return len(frame)
+
+                lag = feed_delivery_seconds.sum, feed_delivery_seconds.count
+                walls = []
+                for i in range(args.messages):
+                    start = time.perf_counter()
+                    await sockets[0].send(json.dumps({"msg": f"message {i}"}))
+                    sizes = await asyncio.gather(*map(receive, sockets))
+                    walls.append(time.perf_counter() - start)
+                for ws in sockets:
+                    await ws.close()
+                walls.sort()
+                lag = (feed_delivery_seconds.sum - lag[0]) / (
+                    feed_delivery_seconds.count - lag[1]
+                )
+                rows.append(
+                    (
+                        history,
+                        n_clients,
+                        walls[len(walls) // 2] * 1000,
+                        lag * 1000,
+                        max(sizes),
+                        page_ms,
+                        page_bytes,
+                    )
+                )
+    return rows
+
+
+def bench_broadcast(args):
+    """Time from one post until every client has it, by feed history and client count.
+
+    lag is the mean time a frame waited in a client's queue until its socket took it.
+    """
+    web = _local_app()
+    base_url = _serve(web.f_app)
+    rows = asyncio.run(_broadcast_cost(base_url, args))
+    print(
+        f"{'history':>8} {'clients':>8} {'post p50 (ms)':>14} {'lag (ms)':>9} "
+        f"{'frame (B)':>10} {'feed page (ms)':>15} {'feed page (KB)':>15}"
+    )
+    for history, n_clients, post_ms, lag_ms, frame, page_ms, page_bytes in rows:
+        print(
+            f"{history:>8} {n_clients:>8} {post_ms:>14.1f} {lag_ms:>9.1f} {frame:>10} "
+            f"{page_ms:>15.1f} {page_bytes / 1024:>15.1f}"
+        )
+
+
+def _spawn_workers(n_workers: int) -> tuple:
+    import socket
+    import subprocess
+    import sys
+
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "src/app.py",
+            "--workers",
+            str(n_workers),
+            "--port",
+            str(port),
+        ],
+        env={**os.environ, "SESSION_SECRET": os.getenv("SESSION_SECRET", "bench")},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.get(f"{base_url}/login").raise_for_status()
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+
+
+async def _page_load(
+    base_url: str,
+    pages: list[str],
+    concurrency: int,
+    email: str,
+    start_at: float,
+    seconds: float,
+) -> list[float]:
+    import itertools
+
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as http:
+        await http.post("/auth/signup", data={"email": email, "password": "x"})
+        pages = itertools.cycle(pages)
+        latencies = []
+        await asyncio.sleep(
+            max(0, start_at - time.time())
+        )  # every load process at once
+        deadline = time.perf_counter() + seconds
+
+        async def client():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                (await http.get(next(pages))).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies
+
+
+def _page_load_process(*args) -> list[float]:
+    return asyncio.run(_page_load(*args))
+
+
+def bench_scale(args):
+    """Page loads per second against `src/app.py --workers N`, each worker standing in for a container.
+
+    Run against Postgres (DATABASE_URL): workers then share sessions, pub/sub
+    and cache invalidations like containers do. The clients are spread over
+    `--load_procs` processes so the load generator is not the bottleneck, and
+    throughput can only grow while workers + load processes fit the CPUs:
+    rows past that are marked.
+    """
+    import itertools
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    _local_app()  # env and tables, shared with the worker processes
+    cpus = len(os.sched_getaffinity(0))
+    print(
+        f"{cpus} usable CPUs, {args.concurrency} concurrent clients "
+        f"over {args.load_procs} load processes"
+    )
+    print(
+        f"{'workers':>8} {'requests':>9} {'req/s':>7} {'p50 (ms)':>9} {'p95 (ms)':>9}"
+    )
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.load_procs, mp_context=spawn) as load:
+        for n in args.workers:
+            process, base_url = _spawn_workers(n)
+            start_at = time.time() + 2  # time for every load process to sign up
+            try:
+                loads = [
+                    load.submit(
+                        _page_load_process,
+                        base_url,
+                        args.pages,
+                        max(1, args.concurrency // args.load_procs),
+                        f"scale{n}-{i}@example.com",
+                        start_at,
+                        args.seconds,
+                    )
+                    for i in range(args.load_procs)
+                ]
+                latencies = sorted(
+                    itertools.chain.from_iterable(f.result() for f in loads)
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            oversubscribed = (
+                "  (more processes than CPUs)" if n + args.load_procs > cpus else ""
+            )
+            print(
+                f"{n:>8} {len(latencies):>9} {len(latencies) / args.seconds:>7.1f} "
+                f"{latencies[len(latencies) // 2] * 1000:>9.1f} "
+                f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>9.1f}{oversubscribed}"
+            )
+
+
+def _fake_gen_users(n: int, offset: int) -> list[dict]:
+    # shaped like `gen_fake_users` output
+    return [
+        {
+            "login_type": "email",
+            "email": f"gen{offset + i}@example.com",
+            "username": f"gen{offset + i}",
+            "major": "Finance",
+            "minor": None,
+            "graduation_year": 2027,
+            "interests": ["Chess", "Hiking"],
+            "personality_traits": ["Curious"],
+            "schedule": {"text": "Mon 9-11am: class\n" * 20},
+            "bio": "I like long walks. " * 20,
+        }
+        for i in range(n)
+    ]
+
+
+def _legacy_insert_users(db_session, users_data: list[dict]):
+    # pre-bulk path: ORM objects, add_all, one commit
+    from src.models import Schedule, User
+
+    db_session.add_all(
+        User(**{**u, "schedule": Schedule(**u["schedule"])}) for u in users_data
+    )
+    db_session.commit()
+
+
+def bench_seed(args):
+    """Run against Postgres (DATABASE_URL) for the COPY path; SQLite uses multi-row INSERTs."""
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from src.gen_users import bulk_insert_users
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    SQLModel.metadata.create_all(engine)
+    paths = {
+        "orm": _legacy_insert_users,
+        "bulk": lambda session, data: bulk_insert_users(session, data, args.chunk_size),
+    }
+    print(f"{engine.dialect.name}, chunk size {args.chunk_size}")
+    print(f"{'path':>6} {'users':>7} {'wall (s)':>9} {'users/s':>9}")
+    offset = 0
+    for n in args.users:
+        for path_name, insert in paths.items():
+            data = _fake_gen_users(n, offset)
+            offset += n
+            with Session(engine) as session:
+                start = time.perf_counter()
+                insert(session, data)
+                wall = time.perf_counter() - start
+            print(f"{path_name:>6} {n:>7} {wall:>9.2f} {n / wall:>9.0f}")
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="bench", required=True)
+
+    uploads = subparsers.add_parser(
+        "uploads", help="concurrent schedule uploads held by one web container"
+    )
+    uploads.add_argument("--gpu_latency", type=float, default=2.0)
+    uploads.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    uploads.set_defaults(fn=bench_uploads)
+
+    validate = subparsers.add_parser(
+        "validate", help="upload validations per second and peak memory per upload"
+    )
+    validate.add_argument("--iterations", type=int, default=50)
+    validate.set_defaults(fn=bench_validate)
+
+    queries = subparsers.add_parser(
+        "queries", help="SQL statements and current-user lookups per page load"
+    )
+    queries.add_argument("--users", type=int, default=20)
+    queries.add_argument(
+        "--pages",
+        nargs="+",
+        default=["/", "/matches", "/feed", "/settings", "/user/settings/edit"],
+    )
+    queries.set_defaults(fn=bench_queries)
+
+    feed = subparsers.add_parser(
+        "feed", help="feed messages per second and page latency under websocket load"
+    )
+    feed.add_argument("--clients", type=int, nargs="+", default=[10, 50])
+    feed.add_argument("--messages", type=int, default=10)
+    feed.set_defaults(fn=bench_feed)
+
+    broadcast = subparsers.add_parser(
+        "broadcast", help="feed broadcast cost by history length and client count"
+    )
+    broadcast.add_argument("--history", type=int, nargs="+", default=[0, 100, 1000])
+    broadcast.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    broadcast.add_argument("--messages", type=int, default=20)
+    broadcast.set_defaults(fn=bench_broadcast)
+
+    scale = subparsers.add_parser(
+        "scale", help="page loads per second by number of web workers"
+    )
+    scale.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    scale.add_argument("--concurrency", type=int, default=32)
+    scale.add_argument("--seconds", type=float, default=10)
+    scale.add_argument("--pages", nargs="+", default=["/feed", "/settings"])
+    scale.add_argument(
+        "--load_procs", type=int, default=max(1, len(os.sched_getaffinity(0)) // 4)
+    )
+    scale.set_defaults(fn=bench_scale)
+
+    seed = subparsers.add_parser(
+        "seed", help="generated users inserted per second, ORM vs bulk path"
+    )
+    seed.add_argument("--users", type=int, nargs="+", default=[1000, 10000])
+    seed.add_argument("--chunk_size", type=int, default=1000)
+    seed.set_defaults(fn=bench_seed)
+
+    args = parser.parse_args()
+    args.fn(args)
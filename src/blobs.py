@@ -0,0 +1,276 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import modal
+
+from src.utils import APP_NAME, PARENT_PATH
+
+# Modal
+BLOBS_VOLUME = f"{APP_NAME}-blobs"
+VOLUME_CONFIG: dict[str, modal.Volume] = {
+    f"/{BLOBS_VOLUME}": modal.Volume.from_name(BLOBS_VOLUME, create_if_missing=True),
+}
+if modal.is_local():
+    BLOBS_VOL_PATH = PARENT_PATH / "blobs"
+else:
+    BLOBS_VOL_PATH = Path(f"/{BLOBS_VOLUME}")
+
+# -----------------------------------------------------------------------------
+
+MAGIC_MIME_TYPES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"<svg", "image/svg+xml"),
+    (b"<?xml", "image/svg+xml"),
+]
+
+
+def blob_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_blob_key(key: str) -> bool:
+    return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
+
+
+def sniff_mime(data: bytes) -> str:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime in MAGIC_MIME_TYPES:
+        if data.startswith(magic):
+            return mime
+    return "application/octet-stream"
+
+
+def to_data_url(data: bytes) -> str:
+    return f"data:{sniff_mime(data)};base64,{base64.b64encode(data).decode()}"
+
+
+def from_data_url(data_url: str) -> bytes:
+    return base64.b64decode(data_url.split(",", 1)[-1])
+
+
+# -----------------------------------------------------------------------------
+
+
+class BlobStore(ABC):
+    """Content-addressed store: blobs are immutable and keyed by their sha256.
+
+    Putting a blob that is already stored refreshes its write time, so a
+    garbage collector's grace period covers the rows about to reference it.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> str: ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        """Every stored blob as (key, size in bytes, unix time last written)."""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs on a local or mounted filesystem.
+
+    On a Modal volume shared by several containers, pass the `volume`: writes
+    are committed so other containers can see them, and a miss reloads the
+    volume in case another container wrote the blob since. Reloads are shared:
+    at most one starts per `reload_interval` seconds, however many misses
+    (e.g. random keys) ask for one, and misses that waited on a reload retry
+    their read instead of starting another. A reload fails while files on the
+    volume are open, so it waits for this store's reads and writes to finish
+    and holds new ones back until it is done.
+    """
+
+    def __init__(self, root: str | Path, volume=None, reload_interval: float = 1):
+        self.root = Path(root)
+        self.volume = volume
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._reload_tried_at = float("-inf")
+        self._reloaded_at = float("-inf")  # start of the last reload that worked
+        self._open_files = 0
+        self._files_closed = threading.Condition()
+
+    def _path(self, key: str) -> Path:
+        if not is_blob_key(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return self.root / key[:2] / key[2:4] / key
+
+    @contextmanager
+    def _file_open(self):
+        with self._files_closed:
+            self._open_files += 1
+        try:
+            yield
+        finally:
+            with self._files_closed:
+                self._open_files -= 1
+                self._files_closed.notify_all()
+
+    def put(self, data: bytes) -> str:
+        key = blob_hash(data)
+        path = self._path(key)
+        if path.exists():  # same hash, same bytes
+            path.touch()
+            if self.volume is not None:
+                self.volume.commit()
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_open():
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+                tmp.write(data)
+        os.replace(tmp.name, path)  # atomic, readers never see partial blobs
+        if self.volume is not None:
+            self.volume.commit()
+        return key
+
+    def _reload(self, missed_at: float) -> bool:
+        """Whether the volume has been reloaded since a miss at `missed_at`."""
+        if self.volume is None:
+            return False
+        with self._reload_lock:
+            if self._reloaded_at >= missed_at:  # another miss's reload covers this one
+                return True
+            if missed_at - self._reload_tried_at < self.reload_interval:
+                return False
+            started_at = self._reload_tried_at = time.monotonic()
+            with self._files_closed:  # no new reads or writes until it's done
+                if not self._files_closed.wait_for(
+                    lambda: self._open_files == 0, timeout=self.reload_interval
+                ):
+                    return False
+                try:
+                    self.volume.reload()
+                except RuntimeError as e:  # a file open outside this store
+                    print(f"Blob volume reload failed: {e!r}")
+                    return False
+            self._reloaded_at = started_at
+            return True
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        for attempt in range(2):
+            missed_at = time.monotonic()
+            try:
+                with self._file_open():
+                    return path.read_bytes()
+            except FileNotFoundError:
+                if attempt or not self._reload(missed_at):
+                    return None
+
+    def exists(self, key: str) -> bool:
+        path = self._path(key)
+        if path.exists():
+            return True
+        return self._reload(time.monotonic()) and path.exists()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+        if self.volume is not None:
+            self.volume.commit()
+
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        for path in self.root.glob("*/*/*"):
+            if not is_blob_key(path.name):  # e.g. a put's temporary file
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # deleted since the listing
+                continue
+            yield path.name, stat.st_size, stat.st_mtime
+
+
+class ObjectBlobStore(BlobStore):
+    """Any S3-compatible client (boto3, R2, MinIO, GCS interop) works."""
+
+    def __init__(self, client, bucket: str, prefix: str = "blobs/"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put(self, data: bytes) -> str:
+        key = blob_hash(data)
+        if self.exists(key):  # copied onto itself, only to refresh LastModified
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self._key(key),
+                CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+                MetadataDirective="REPLACE",
+                ContentType=sniff_mime(data),
+            )
+        else:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(key),
+                Body=data,
+                ContentType=sniff_mime(data),
+            )
+        return key
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return obj["Body"].read()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix
+        )
+        for page in pages:
+            for obj in page.get("Contents", []):
+                key = obj["Key"].removeprefix(self.prefix)
+                if is_blob_key(key):
+                    yield key, obj["Size"], obj["LastModified"].timestamp()
+
+
+def get_blob_store() -> BlobStore:
+    backend = os.getenv("BLOB_STORE", "local")
+    if backend == "local":
+        if os.getenv("BLOB_STORE_PATH"):
+            return LocalBlobStore(os.getenv("BLOB_STORE_PATH"))
+        # on Modal, the volume every web container mounts
+        volume = None if modal.is_local() else VOLUME_CONFIG[f"/{BLOBS_VOLUME}"]
+        return LocalBlobStore(BLOBS_VOL_PATH, volume)
+    if backend == "s3":
+        import boto3
+
+        client = boto3.client("s3", endpoint_url=os.getenv("BLOB_ENDPOINT_URL"))
+        return ObjectBlobStore(client, os.getenv("BLOB_BUCKET"))
+    raise ValueError(f"Unknown BLOB_STORE backend: {backend}")
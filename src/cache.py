@@ -0,0 +1,144 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.metrics import Counter, Gauge
+from src.models import User
+
+USER_COLUMNS = set(inspect(User).column_attrs.keys())
+
+user_cache_hits = Counter(
+    "user_cache_hits_total", "Current-user loads served from cache."
+)
+user_cache_misses = Counter(
+    "user_cache_misses_total", "Current-user loads that hit the DB."
+)
+user_cache_hit_ratio = Gauge("user_cache_hit_ratio", "Hits / (hits + misses).")
+
+# -----------------------------------------------------------------------------
+
+
+class UserCache:
+    """Bounded LRU of current-user column snapshots keyed by uuid, each valid for `ttl` seconds.
+
+    Snapshots are dropped whenever a session commits a change to that user
+    (see `invalidate_on_commit`). Deleted uuids are tombstoned so a load that
+    raced the delete can never cache the account again.
+    """
+
+    def __init__(
+        self, maxsize: int = 10_000, ttl: float = 30, max_tombstones: int = 100_000
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_tombstones = max_tombstones
+        self._lock = threading.Lock()
+        self._snapshots: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._invalidated_at: OrderedDict[str, float] = OrderedDict()
+        self._deleted: OrderedDict[str, None] = OrderedDict()
+
+    def _record(self, hit: bool):
+        (user_cache_hits if hit else user_cache_misses).inc()
+        total = user_cache_hits.value + user_cache_misses.value
+        user_cache_hit_ratio.set(user_cache_hits.value / total)
+
+    def get(self, user_uuid: str) -> User | None:
+        """A detached `User` rebuilt from the snapshot; merge it into a session with `load=False`."""
+        with self._lock:
+            entry = self._snapshots.get(user_uuid)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._snapshots[user_uuid]
+                entry = None
+            if entry is not None:
+                self._snapshots.move_to_end(user_uuid)
+        self._record(entry is not None)
+        if entry is None:
+            return None
+        snapshot = copy.deepcopy(entry[1])
+        user = User(**snapshot)
+        state = inspect(user)
+        for key in USER_COLUMNS - snapshot.keys():
+            state.dict.pop(key, None)  # still deferred: loaded on first access
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User, loaded_at: float):
+        """Cache `user` as read at `loaded_at` (time.monotonic() taken before the query)."""
+        unloaded = inspect(user).unloaded
+        snapshot = {
+            key: copy.deepcopy(getattr(user, key))
+            for key in USER_COLUMNS
+            if key not in unloaded
+        }
+        with self._lock:
+            if user.uuid in self._deleted:
+                return
+            if loaded_at <= self._invalidated_at.get(user.uuid, float("-inf")):
+                return  # a write committed after this row was read
+            self._snapshots[user.uuid] = (loaded_at, snapshot)
+            self._snapshots.move_to_end(user.uuid)
+            while len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
+
+    def invalidate(self, user_uuid: str, deleted: bool = False):
+        with self._lock:
+            self._snapshots.pop(user_uuid, None)
+            # only loads younger than the ttl can still be in flight
+            now = time.monotonic()
+            self._invalidated_at[user_uuid] = now
+            self._invalidated_at.move_to_end(user_uuid)
+            while (
+                self._invalidated_at
+                and now - next(iter(self._invalidated_at.values())) > self.ttl
+            ):
+                self._invalidated_at.popitem(last=False)
+            if deleted:
+                self._deleted[user_uuid] = None
+                while len(self._deleted) > self.max_tombstones:
+                    self._deleted.popitem(last=False)
+
+
+def invalidate_on_commit(cache: UserCache, session_cls, on_invalidate=None):
+    """Write-through invalidation: every ORM flush that touches a user drops its snapshot on commit.
+
+    Only sessions of `session_cls` (and its subclasses) are watched, so pass
+    the app's own class: jobs and scripts sharing the process are left alone.
+
+    `on_invalidate(user_uuid, deleted)` is called after each local invalidation,
+    e.g. to tell other containers to drop theirs too.
+    """
+
+    @event.listens_for(session_cls, "after_flush")
+    def _collect(session, flush_context):
+        written = session.info.setdefault("written_users", {})
+        for obj in [*session.new, *session.dirty]:
+            if isinstance(obj, User) and obj.uuid:
+                # read without loading: partial loads may leave it unloaded
+                soft_deleted = inspect(obj).dict.get("deleted_at") is not None
+                written[obj.uuid] = written.get(obj.uuid, False) or soft_deleted
+        for obj in session.deleted:
+            if isinstance(obj, User) and obj.uuid:
+                written[obj.uuid] = True
+
+    @event.listens_for(session_cls, "after_commit")
+    def _invalidate(session):
+        for user_uuid, deleted in session.info.pop("written_users", {}).items():
+            cache.invalidate(user_uuid, deleted=deleted)
+            if on_invalidate is not None:
+                on_invalidate(user_uuid, deleted)
+
+    @event.listens_for(session_cls, "after_rollback")
+    def _discard(session):
+        session.info.pop("written_users", None)
+
+
+def get_user_cache() -> UserCache:
+    return UserCache(
+        maxsize=int(os.getenv("USER_CACHE_SIZE", 10_000)),
+        ttl=float(os.getenv("USER_CACHE_TTL", 30)),
+    )
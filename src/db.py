@@ -0,0 +1,414 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import Select, event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.metrics import Gauge, Histogram
+from src.models import User
+
+# per-role pool settings, each overridable with DB_<ROLE>_<SETTING> (e.g. DB_WEB_POOL_SIZE)
+POOL_DEFAULTS = {
+    "web": {  # one container serves many concurrent inputs
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 30 * 60,
+        "pool_pre_ping": True,
+    },
+    "replica": {  # read-only units of work, see RoutingSession
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 30 * 60,
+        "pool_pre_ping": True,
+    },
+    "worker": {  # batch jobs hold one connection at a time
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 30,
+        "pool_recycle": 30 * 60,
+        "pool_pre_ping": True,
+    },
+}
+
+# -----------------------------------------------------------------------------
+
+
+def _env_setting(role: str, setting: str, default):
+    value = os.getenv(f"DB_{role.upper()}_{setting.upper()}")
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes")
+    return type(default)(value)
+
+
+def pool_settings(role: str) -> dict:
+    return {
+        setting: _env_setting(role, setting, default)
+        for setting, default in POOL_DEFAULTS[role].items()
+    }
+
+
+def pgbouncer_mode() -> bool:
+    # transaction pooling: PgBouncer owns the pool, so connections must not be held
+    # across transactions or carry session state (SET, LISTEN, prepared statements)
+    return os.getenv("DB_PGBOUNCER", "").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """One role's pool metrics, shared by every engine of that role (see `for_role`)."""
+
+    _by_role: dict[str, "PoolMetrics"] = {}
+
+    @classmethod
+    def for_role(cls, role: str) -> "PoolMetrics":
+        # metrics register by name, so a second set would replace the first
+        # engine's in the registry; engines of one role add up instead
+        if role not in cls._by_role:
+            cls._by_role[role] = cls(role)
+        return cls._by_role[role]
+
+    def __init__(self, role: str):
+        prefix = f"db_{role}_pool"
+        self.checkout_seconds = Histogram(
+            f"{prefix}_checkout_seconds", "Time spent waiting for a connection."
+        )
+        self.hold_seconds = Histogram(
+            f"{prefix}_hold_seconds",
+            "Time a connection is checked out before being returned.",
+        )
+        self.waiting = Gauge(
+            f"{prefix}_waiting", "Requests currently waiting for a connection."
+        )
+        self.checked_out = Gauge(f"{prefix}_checked_out", "Connections in use.")
+
+
+class InstrumentedPool:
+    """Pool mixin that times checkouts and counts callers blocked on them."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        self.metrics.waiting.inc()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.waiting.dec()
+            self.metrics.checkout_seconds.observe(time.perf_counter() - start)
+
+
+def _instrument(engine, metrics: PoolMetrics):
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        metrics.checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            metrics.hold_seconds.observe(time.perf_counter() - checked_out_at)
+            metrics.checked_out.dec()
+
+
+def _pool_kwargs(role: str, url: str, queue_pool_cls, metrics: PoolMetrics) -> dict:
+    if pgbouncer_mode():
+        pool_cls, kwargs = NullPool, {}
+    elif url.startswith("sqlite"):
+        # sqlalchemy picks the right pool for file vs memory dbs
+        return {}
+    else:
+        pool_cls, kwargs = queue_pool_cls, pool_settings(role)
+
+    kwargs["poolclass"] = type(
+        f"Instrumented{pool_cls.__name__}",
+        (InstrumentedPool, pool_cls),
+        {"metrics": metrics},
+    )
+    return kwargs
+
+
+def _sqlite_foreign_keys(engine):
+    # SQLite only enforces FKs (and ON DELETE CASCADE) when asked, per connection
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def create_db_engine(role: str = "web", url: str | None = None):
+    """Sync engine, for Alembic and batch jobs."""
+    url = url or os.getenv("DATABASE_URL")
+    metrics = PoolMetrics.for_role(role)
+    engine = create_engine(
+        url, echo=False, **_pool_kwargs(role, url, QueuePool, metrics)
+    )
+    if engine.dialect.name == "sqlite":
+        _sqlite_foreign_keys(engine)
+    _instrument(engine, metrics)
+    count_queries(engine)
+    return engine
+
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    if url.drivername.startswith("postgresql"):
+        query = dict(url.query)
+        if "sslmode" in query:  # libpq spelling -> asyncpg spelling
+            query["ssl"] = query.pop("sslmode")
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif url.drivername.startswith("sqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def create_async_db_engine(role: str = "web", url: str | None = None):
+    """asyncpg-backed engine, for request handlers and websockets."""
+    url = async_database_url(url or os.getenv("DATABASE_URL"))
+    metrics = PoolMetrics.for_role(role)
+    kwargs = _pool_kwargs(role, url, AsyncAdaptedQueuePool, metrics)
+    if pgbouncer_mode():
+        # transaction pooling can hand each statement a different server connection
+        kwargs["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        }
+    engine = create_async_engine(url, echo=False, **kwargs)
+    if engine.dialect.name == "sqlite":
+        _sqlite_foreign_keys(engine.sync_engine)
+    _instrument(engine.sync_engine, metrics)
+    count_queries(engine.sync_engine)
+    return engine
+
+
+def create_replica_engine():
+    """asyncpg engine for DATABASE_REPLICA_URL, or None when no replica is configured."""
+    url = os.getenv("DATABASE_REPLICA_URL")
+    return create_async_db_engine("replica", url) if url else None
+
+
+# -----------------------------------------------------------------------------
+
+# a browser that just wrote reads from the primary until this long after its
+# last write, so redirects after a save never see a lagging replica; keep it
+# above the replica's worst lag
+PIN_KEY = "db_primary_until"
+
+
+def replica_pin_seconds() -> float:
+    return float(os.getenv("DB_REPLICA_PIN_SECONDS", 10))
+
+
+def _is_plain_read(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the replica until the session writes, then pins it to the primary.
+
+    `info["replica"]` holds the replica's sync engine (none: everything goes to
+    the primary); `info["primary"] = True` pins the session from the start.
+    A statement executed with an explicit `bind_arguments={"bind": ...}` goes
+    there without pinning anything.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self.info.get("primary") or kw.get("bind") is not None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self._flushing or not _is_plain_read(clause):
+            # reads after a write must see it, so stay on the primary from here on
+            self.info["primary"] = True
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_browser(session, *args):
+    on_write = session.info.get("on_write")
+    if session.info.pop("wrote", False) and on_write is not None:
+        on_write()
+
+
+# -----------------------------------------------------------------------------
+
+queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one request.",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+
+# set per http request by RequestScope, filled in by the Beforeware
+_request_state: ContextVar[dict | None] = ContextVar("request_state", default=None)
+
+
+class UnitOfWork:
+    """One async DB session per request, opened on first use and closed once the response is sent.
+
+    Handlers run their ORM code through `run()`, which executes it against the
+    session's sync facade inside a greenlet: lazy loads and commits await the
+    async driver instead of blocking the event loop. Objects stay loaded after
+    commits (`expire_on_commit=False`) so components can keep reading the
+    current user without re-querying it.
+
+    With a `replica` engine, reads go there until the unit of work writes (see
+    `RoutingSession`). `browser_session` (the signed cookie session) carries
+    the staleness guard: a committed write pins that browser to the primary
+    for `replica_pin_seconds()`.
+    """
+
+    def __init__(self, engine, user_cache=None, replica=None, browser_session=None):
+        self.engine = engine
+        self.user_cache = user_cache
+        self.replica = replica
+        self.browser_session = browser_session
+        self.query_count = 0
+        self._async_session: AsyncSession | None = None
+        self._users: dict[str, User | None] = {}
+
+    @property
+    def pinned(self) -> bool:
+        if self.browser_session is None:
+            return False
+        return self.browser_session.get(PIN_KEY, 0) > time.time()
+
+    def _pin(self):
+        self.browser_session[PIN_KEY] = time.time() + replica_pin_seconds()
+
+    def use_primary(self):
+        """Read from the primary from here on, e.g. to look up a row another browser just wrote."""
+        self.session.info["primary"] = True
+
+    @property
+    def async_session(self) -> AsyncSession:
+        if self._async_session is None:
+            self._async_session = AsyncSession(
+                self.engine, expire_on_commit=False, sync_session_class=RoutingSession
+            )
+            info = self._async_session.sync_session.info
+            if self.replica is not None and not self.pinned:
+                info["replica"] = self.replica.sync_engine
+            if self.browser_session is not None:
+                info["on_write"] = self._pin
+        return self._async_session
+
+    @property
+    def session(self):
+        """Sync view of the session, only usable inside `run()`."""
+        return self.async_session.sync_session
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.async_session.run_sync(lambda _: fn(*args, **kwargs))
+
+    def user(self, user_uuid: str) -> User | None:
+        if user_uuid in self._users:
+            return self._users[user_uuid]
+
+        cached = self.user_cache.get(user_uuid) if self.user_cache else None
+        if cached is not None:
+            user = self.session.merge(cached, load=False)  # no SQL
+        else:
+            loaded_at = time.monotonic()
+            query = select(User).where(
+                User.uuid == user_uuid, User.deleted_at.is_(None)
+            )
+            # what gets cached must come from the primary: a lagging replica row
+            # read after an invalidation would pass the cache's race guard and be
+            # served for the whole ttl, in every container
+            bind = {"bind": self.engine.sync_engine} if self.user_cache else None
+            user = self.session.exec(query, bind_arguments=bind).first()
+            self._end_read()
+            if user is not None and self.user_cache:
+                self.user_cache.put(user, loaded_at)
+        self._users[user_uuid] = user
+        return user
+
+    def _end_read(self):
+        session = self._async_session and self._async_session.sync_session
+        if session is not None and not (
+            session.new or session.dirty or session.deleted
+        ):
+            session.commit()
+
+    async def release(self):
+        # end a read-only transaction so the connection goes back to the pool
+        # while the request awaits uploads or remote calls; objects stay loaded
+        if self._async_session is not None:
+            await self.run(self._end_read)
+
+    async def close(self):
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+        self._users.clear()
+
+
+def begin_request(
+    engine, user_cache=None, replica=None, browser_session=None
+) -> UnitOfWork | None:
+    state = _request_state.get()
+    if state is None:  # not inside RequestScope (e.g. websockets)
+        return None
+    state["uow"] = UnitOfWork(engine, user_cache, replica, browser_session)
+    return state["uow"]
+
+
+def current_uow() -> UnitOfWork | None:
+    state = _request_state.get()
+    return state.get("uow") if state else None
+
+
+@asynccontextmanager
+async def unit_of_work(engine, user_cache=None, replica=None):
+    """A unit of work outside RequestScope, e.g. per websocket message."""
+    uow = UnitOfWork(engine, user_cache, replica)
+    token = _request_state.set({"uow": uow})
+    try:
+        yield uow
+    finally:
+        _request_state.reset(token)
+        await uow.close()
+
+
+def count_queries(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        uow = current_uow()
+        if uow is not None:
+            uow.query_count += 1
+
+
+class RequestScope:
+    """ASGI middleware that owns the request's unit of work and closes it at response end."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        state = {}
+        token = _request_state.set(state)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_state.reset(token)
+            uow = state.get("uow")
+            if uow is not None:
+                queries_per_request.observe(uow.query_count)
+                await uow.close()
@@ -0,0 +1,249 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import OrderedDict
+
+from src.metrics import Counter, Gauge, Histogram
+from src.queries import take_post_token
+
+feed_clients = Gauge("feed_clients", "Open feed websockets.")
+feed_queue_depth = Gauge(
+    "feed_queue_depth_max", "Deepest per-client outbound queue at the last broadcast."
+)
+feed_delivery_seconds = Histogram(
+    "feed_delivery_seconds", "Time from broadcast until a client's socket took it."
+)
+feed_dropped = Counter(
+    "feed_clients_dropped_total", "Clients disconnected for falling behind or failing."
+)
+feed_posts_limited = Counter(
+    "feed_posts_rate_limited_total", "Posts refused for exceeding the per-user rate."
+)
+feed_write_batch = Histogram(
+    "feed_write_batch_size",
+    "Messages written per feed transaction.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+feed_write_seconds = Histogram(
+    "feed_write_seconds", "Time from a post being accepted until its batch committed."
+)
+
+# -----------------------------------------------------------------------------
+
+
+class FeedClient:
+    """One websocket's bounded outbound queue, drained by its own sender task."""
+
+    def __init__(self, send, close, maxsize: int):
+        self.send = send
+        self.close = close
+        self.queue: asyncio.Queue[tuple[float, str]] = asyncio.Queue(maxsize)
+        self.lag = 0.0  # of the last delivered frame, in seconds
+        self.task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+
+class Broadcaster:
+    """Fans feed frames out to every connected client without waiting on any of them.
+
+    `publish` only enqueues. A client whose queue fills up, whose send raises,
+    or whose send takes longer than `send_timeout` is disconnected, so one slow
+    or dead socket never delays the others or the poster.
+    """
+
+    def __init__(self, maxsize: int = 256, send_timeout: float = 10):
+        self.maxsize = maxsize
+        self.send_timeout = send_timeout
+        self.clients: dict[int, FeedClient] = {}
+        self._closing: set[asyncio.Task] = set()  # held so they aren't collected
+
+    def connect(self, key: int, send, close):
+        """Register a socket; `send(text)` and `close()` are its coroutine functions."""
+        client = FeedClient(send, close, self.maxsize)
+        client.task = asyncio.create_task(self._deliver(key, client))
+        self.clients[key] = client
+        feed_clients.set(len(self.clients))
+
+    def disconnect(self, key: int):
+        client = self.clients.pop(key, None)
+        feed_clients.set(len(self.clients))
+        if client and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def publish(self, text: str):
+        now = time.monotonic()
+        depth = 0
+        for key, client in list(self.clients.items()):
+            try:
+                client.queue.put_nowait((now, text))
+            except asyncio.QueueFull:
+                self._drop(key, client)
+                continue
+            depth = max(depth, client.depth)
+        feed_queue_depth.set(depth)
+
+    def stats(self) -> dict[int, tuple[int, float]]:
+        """Per-client (queue depth, last delivery lag in seconds)."""
+        return {key: (c.depth, c.lag) for key, c in self.clients.items()}
+
+    async def _deliver(self, key: int, client: FeedClient):
+        while True:
+            enqueued_at, text = await client.queue.get()
+            try:
+                await asyncio.wait_for(client.send(text), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._drop(key, client)
+                return
+            client.lag = time.monotonic() - enqueued_at
+            feed_delivery_seconds.observe(client.lag)
+
+    def _drop(self, key: int, client: FeedClient):
+        if self.clients.get(key) is not client:
+            return
+        feed_dropped.inc()
+        self.disconnect(key)
+        task = asyncio.create_task(self._close(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, client: FeedClient):
+        try:
+            await asyncio.wait_for(client.close(), self.send_timeout)
+        except Exception:
+            pass  # already gone
+
+
+class RateLimiter:
+    """A token bucket per key: `burst` posts at once, refilled at `rate` per second.
+
+    Buckets live in this container's memory, in front of the shared budget
+    (`SharedRateLimiter`): a flood is refused here without touching the
+    database, and only posts within a container's own budget are checked
+    against the one every container shares. The least recently used are
+    evicted past `max_keys`; a forgotten bucket was full anyway once it had
+    refilled.
+    """
+
+    def __init__(self, rate: float = 1, burst: int = 5, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def allow(self, key: str, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        tokens, last = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        if not allowed:
+            feed_posts_limited.inc()
+        return allowed
+
+
+class SharedRateLimiter:
+    """The same bucket per user, as a `PostBudget` row every container shares.
+
+    Tokens are taken in the transaction that stores the posts, so a post that
+    passed its container's `RateLimiter` costs no transaction of its own.
+    """
+
+    def __init__(self, rate: float = 1, burst: int = 5):
+        self.rate = rate
+        self.burst = burst
+
+    def allow(self, db_session, user_id: int, now: float | None = None) -> bool:
+        now = time.time() if now is None else now  # wall clock, shared by containers
+        allowed = take_post_token(db_session, user_id, self.rate, self.burst, now)
+        if not allowed:
+            feed_posts_limited.inc()
+        return allowed
+
+
+class WriteBehind:
+    """Group commit: rows submitted while a batch is being written go out together in the next.
+
+    `write(rows)` is a coroutine function that stores a batch in one
+    transaction and returns one result per row, in order. Submitters get their
+    results as soon as it commits. Then `after(result)`, if given, runs for
+    each row in order, say to publish it; its failures are printed, never
+    raised, so they neither fail a committed row nor skip the rows after it.
+    Batches are written one at a time in submission order, so `after` keeps
+    that order. An idle writer starts at once, so a lone post waits one
+    transaction; under load each waits at most the batch ahead of it plus its
+    own.
+    """
+
+    def __init__(self, write, after=None, max_batch: int = 100):
+        self.write = write
+        self.after = after
+        self.max_batch = max_batch
+        self._pending: list[tuple[object, asyncio.Future, float]] = []
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, row):
+        """Queue `row` and wait for its batch to commit; returns `write`'s result for it."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future, time.monotonic()))
+        if self._task is None or self._task.done():
+            # a clean context: the writer must not inherit the submitter's request state
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+        return await future
+
+    async def _run(self):
+        while self._pending:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            feed_write_batch.observe(len(batch))
+            try:
+                results = await self.write([row for row, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            now = time.monotonic()
+            for (_, future, accepted_at), result in zip(batch, results):
+                feed_write_seconds.observe(now - accepted_at)
+                if not future.done():  # the submitter may have gone away
+                    future.set_result(result)
+            if self.after is None:
+                continue
+            for result in results:
+                try:
+                    await self.after(result)
+                except Exception as e:
+                    print(f"Error after writing a row: {e!r}")
+
+
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        rate=float(os.getenv("FEED_POST_RATE", 1)),
+        burst=int(os.getenv("FEED_POST_BURST", 5)),
+    )
+
+
+def get_shared_rate_limiter() -> SharedRateLimiter:
+    return SharedRateLimiter(
+        rate=float(os.getenv("FEED_POST_RATE", 1)),
+        burst=int(os.getenv("FEED_POST_BURST", 5)),
+    )
+
+
+def get_write_behind(write, after=None) -> WriteBehind:
+    return WriteBehind(write, after, max_batch=int(os.getenv("FEED_WRITE_BATCH", 100)))
+
+
+def get_broadcaster() -> Broadcaster:
+    return Broadcaster(
+        maxsize=int(os.getenv("FEED_QUEUE_SIZE", 256)),
+        send_timeout=float(os.getenv("FEED_SEND_TIMEOUT", 10)),
+    )
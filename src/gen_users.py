@@ -1,4 +1,6 @@
 import argparse
+import csv
+import io
 import os
 import random
 from contextlib import contextmanager
@@ -59,10 +61,13 @@ with GPU_IMAGE.imports():
 
 
 with DB_IMAGE.imports():
+    from sqlalchemy import func, insert
     from sqlmodel import Session as DBSession
-    from sqlmodel import create_engine
+    from sqlmodel import or_, select
 
-    engine = create_engine(url=os.getenv("DATABASE_URL"), echo=False)
+    from src.db import create_db_engine
+
+    engine = create_db_engine("worker")
 
     @contextmanager
     def get_db_session():
@@ -164,6 +169,94 @@ def gen_fake_users(user_idxs: list[int]) -> list[dict]:
     ]
 
 
+def _rows(model, items: list[dict]) -> list[dict]:
+    """Column values as the ORM would write them, python-side defaults included."""
+    # plain dicts: building ORM objects dominated the insert time
+    defaults, factories = {}, {}
+    for column in model.__table__.columns:
+        if column.name == "id":
+            continue
+        field = model.model_fields[column.name]
+        if field.default_factory is not None:
+            factories[column.name] = field.default_factory
+        else:
+            defaults[column.name] = field.default
+    return [
+        {
+            **defaults,
+            **{name: factory() for name, factory in factories.items()},
+            **{k: v for k, v in item.items() if k in defaults or k in factories},
+        }
+        for item in items
+    ]
+
+
+def _copy(db_session, table, rows: list[dict]):
+    """Stream `rows` into `table` with a single `COPY ... FROM STDIN` (psycopg2 only)."""
+    dialect = db_session.get_bind().dialect
+    columns = list(rows[0])
+    processors = [table.c[c].type._cached_bind_processor(dialect) for c in columns]
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_NOTNULL)  # None -> unquoted NULL
+    for row in rows:
+        writer.writerow(
+            [
+                value if process is None or value is None else process(value)
+                for process, value in zip(processors, row.values())
+            ]
+        )
+    buf.seek(0)
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    cursor = db_session.connection().connection.cursor()
+    cursor.copy_expert(
+        f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buf
+    )
+
+
+def _reserve_ids(db_session, table, n: int) -> list[int]:
+    sequence = func.pg_get_serial_sequence(table.name, "id")
+    return db_session.exec(
+        select(func.nextval(sequence)).select_from(func.generate_series(1, n))
+    ).all()
+
+
+default_chunk_size = 1000
+
+
+def bulk_insert_users(
+    db_session, users_data: list[dict], chunk_size: int = default_chunk_size
+) -> int:
+    """Insert users with their schedules `chunk_size` at a time, committing each chunk.
+
+    Postgres (psycopg2): schedule ids are reserved from the sequence in one
+    query, then both tables are streamed with COPY. Elsewhere: one multi-row
+    `INSERT ... RETURNING` per chunk for schedules, then one for users.
+    """
+    use_copy = db_session.get_bind().dialect.driver == "psycopg2"
+    for start in range(0, len(users_data), chunk_size):
+        chunk = users_data[start : start + chunk_size]
+        schedules = _rows(Schedule, [u["schedule"] for u in chunk])
+        if use_copy:
+            schedule_ids = _reserve_ids(db_session, Schedule.__table__, len(chunk))
+            for schedule, schedule_id in zip(schedules, schedule_ids):
+                schedule["id"] = schedule_id
+            _copy(db_session, Schedule.__table__, schedules)
+        else:
+            schedule_ids = db_session.exec(
+                insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+                params=schedules,
+            ).scalars()
+        users = _rows(User, chunk)
+        for user, schedule_id in zip(users, schedule_ids):
+            user["schedule_id"] = schedule_id
+        if use_copy:
+            _copy(db_session, User.__table__, users)
+        else:
+            db_session.exec(insert(User), params=users)
+        db_session.commit()
+    return len(users_data)
+
+
 @app.function(
     image=DB_IMAGE,
     cpu=0.25,
@@ -172,16 +265,27 @@ def gen_fake_users(user_idxs: list[int]) -> list[dict]:
     timeout=1 * MINUTES,
 )
 @modal.concurrent(max_inputs=llm_max_num_seqs)
-def insert_users(gen_users_data: list[dict]):
+def insert_users(gen_users_data: list[dict], chunk_size: int = default_chunk_size):
     with get_db_session() as session:
+        # email and username are unique, so drop generated users that would collide
+        taken = set()
+        for email, username in session.exec(
+            select(User.email, User.username).where(
+                or_(
+                    User.email.in_([u["email"] for u in gen_users_data]),
+                    User.username.in_([u["username"] for u in gen_users_data]),
+                )
+            )
+        ):
+            taken.update([email, username])
+
         users_to_persist = []
         for user_data_dict in gen_users_data:
-            schedule_attributes = user_data_dict.pop("schedule")
-            db_schedule = Schedule(**schedule_attributes)
-            db_user = User(**user_data_dict, schedule=db_schedule)
-            users_to_persist.append(db_user)
-        session.add_all(users_to_persist)
-        session.commit()
+            if {user_data_dict["email"], user_data_dict["username"]} & taken:
+                continue
+            taken.update([user_data_dict["email"], user_data_dict["username"]])
+            users_to_persist.append(user_data_dict)
+        bulk_insert_users(session, users_to_persist, chunk_size)
 
 
 # -----------------------------------------------------------------------------
@@ -197,7 +301,7 @@ default_num_users = llm_max_num_seqs
     secrets=SECRETS,
     timeout=10 * MINUTES,
 )
-def main(num_users: int):
+def main(num_users: int, chunk_size: int = default_chunk_size):
     print(f"Creating {num_users} users...")
     batched_user_idxs = [
         list(range(i, min(i + llm_max_num_seqs, num_users)))
@@ -208,20 +312,29 @@ def main(num_users: int):
         if modal.is_local()
         else list(gen_fake_users.map(batched_user_idxs))
     )
+    # regroup the small LLM batches into insert chunks
+    gen_users_data = [u for batch in batched_gen_users_data for u in batch]
+    chunks = [
+        gen_users_data[i : i + chunk_size]
+        for i in range(0, len(gen_users_data), chunk_size)
+    ]
     if modal.is_local():
-        _ = [insert_users.local(batch_data) for batch_data in batched_gen_users_data]
+        _ = [insert_users.local(chunk, chunk_size) for chunk in chunks]
     else:
-        _ = list(insert_users.map(batched_gen_users_data))
+        _ = list(insert_users.map(chunks, kwargs={"chunk_size": chunk_size}))
     print("Done!")
 
 
 @app.local_entrypoint()
-def main_modal(num_users: int = default_num_users):
-    main.remote(num_users)
+def main_modal(
+    num_users: int = default_num_users, chunk_size: int = default_chunk_size
+):
+    main.remote(num_users, chunk_size)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--num_users", type=int, default=default_num_users)
+    parser.add_argument("--chunk_size", type=int, default=default_chunk_size)
     args = parser.parse_args()
-    main.local(args.num_users)
+    main.local(args.num_users, args.chunk_size)
@@ -0,0 +1,185 @@
+import asyncio
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from src.blobs import BlobStore, sniff_mime
+from src.utils import APP_NAME
+
+# uploads
+MAX_UPLOAD_MB = 10
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+MAX_REQUEST_BYTES = 2 * MAX_UPLOAD_BYTES + 1024 * 1024  # settings form has 2 files
+MAX_IMG_DIM = (4096, 4096)
+VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"}
+VALID_FORMATS = {"JPEG", "PNG", "GIF", "BMP", "TIFF"}
+
+# PIL work never runs on the event loop
+UPLOAD_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPLOAD_WORKERS", min(8, os.cpu_count() or 1))),
+    thread_name_prefix="upload",
+)
+
+# sizes the UI renders images at (px)
+THUMBNAIL_SIZES = {
+    "48": (48, 48),  # nav/overlay avatar (size-12)
+    "80": (80, 80),  # settings avatar (size-20)
+    "192": (192, 192),  # match card avatar (size-48)
+    "schedule": (768, 2048),  # schedule preview (w-96, 2x for retina)
+}
+SQUARE_SIZES = {"48", "80", "192"}
+
+THUMBNAIL_CACHE_PATH = Path(
+    os.getenv("THUMBNAIL_CACHE_PATH")
+    or Path(tempfile.gettempdir()) / f"{APP_NAME}-thumbnails"
+)
+
+# -----------------------------------------------------------------------------
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimit:
+    """ASGI middleware that rejects request bodies over `max_bytes` with a 413.
+
+    Declared lengths are refused before anything is read; chunked bodies are
+    cut off as soon as the running total crosses the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if int(headers.get(b"content-length", 0) or 0) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        started = False
+
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > self.max_bytes:
+                raise UploadTooLarge()
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, capped_receive, tracked_send)
+        except UploadTooLarge:
+            if not started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"text/plain")],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f"Upload exceeds {MAX_UPLOAD_MB}MB limit.".encode(),
+            }
+        )
+
+
+async def read_upload(upload_file, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes | None:
+    """Read an upload into a single buffer, or None if it is larger than `max_bytes`."""
+    if upload_file.size is not None and upload_file.size > max_bytes:
+        return None
+    await upload_file.seek(0)  # reset pointer in case of multiple uploads
+    data = await upload_file.read(max_bytes + 1)  # never reads past the cap
+    return data if len(data) <= max_bytes else None
+
+
+def validate_image_bytes(data: bytes) -> dict:
+    # header only: format, magic # and dimensions are known before any pixels are decoded
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Exception:
+        return {"error": "Invalid file type. Please upload an image."}
+    if img.format not in VALID_FORMATS:
+        return {"error": "Invalid file type. Please upload an image."}
+    if img.size[0] > MAX_IMG_DIM[0] or img.size[1] > MAX_IMG_DIM[1]:
+        return {
+            "error": f"Image dimensions exceed {MAX_IMG_DIM[0]}x{MAX_IMG_DIM[1]} pixels limit."
+        }
+
+    try:
+        img.verify()
+    except Exception as e:
+        return {"error": f"Invalid image: {e}"}
+    return {"success": data}
+
+
+async def in_upload_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(UPLOAD_POOL, fn, *args)
+
+
+# -----------------------------------------------------------------------------
+
+
+def render_thumbnail(data: bytes, size: str) -> bytes:
+    if sniff_mime(data) == "image/svg+xml":  # vector, already scales
+        return data
+
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if size in SQUARE_SIZES:  # avatars are shown as object-cover circles
+        img = ImageOps.fit(img, THUMBNAIL_SIZES[size], Image.Resampling.LANCZOS)
+    else:
+        img.thumbnail(THUMBNAIL_SIZES[size], Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=85, method=4)
+    return buf.getvalue()
+
+
+class ThumbnailCache:
+    """Resized variants of blob store images, rendered on first request and kept on disk."""
+
+    def __init__(self, blob_store: BlobStore, root: str | Path = THUMBNAIL_CACHE_PATH):
+        self.blob_store = blob_store
+        self.root = Path(root)
+
+    def _path(self, key: str, size: str) -> Path:
+        return self.root / size / key[:2] / key
+
+    def get(self, key: str, size: str) -> bytes | None:
+        if size not in THUMBNAIL_SIZES:
+            return None
+        path = self._path(key, size)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+
+        data = self.blob_store.get(key)
+        if data is None:
+            return None
+        thumbnail = render_thumbnail(data, size)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+            tmp_file.write(thumbnail)
+        os.replace(tmp_file.name, path)
+        return thumbnail
@@ -0,0 +1,229 @@
+import argparse
+import time
+from itertools import batched
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import modal
+
+from src.blobs import VOLUME_CONFIG, BlobStore, get_blob_store
+from src.models import FeedMessage, Schedule, User
+from src.utils import APP_NAME, MINUTES, PYTHON_VERSION, SECRETS
+
+# -----------------------------------------------------------------------------
+
+# Modal
+JOBS_IMAGE = (
+    modal.Image.debian_slim(PYTHON_VERSION)
+    .apt_install("libpq-dev")  # add system dependencies
+    .pip_install(
+        "boto3>=1.38.0",  # BLOB_STORE=s3
+        "psycopg2>=2.9.10",
+        "python-dotenv>=1.1.0",
+        "sqlmodel>=0.0.24",
+    )  # add Python dependencies
+)
+
+app = modal.App(f"{APP_NAME}-jobs")
+
+# -----------------------------------------------------------------------------
+
+with JOBS_IMAGE.imports():
+    from sqlalchemy import delete, exists, func, update
+    from sqlmodel import Session as DBSession
+    from sqlmodel import select
+
+    from src.db import create_db_engine
+
+    engine = create_db_engine("worker")
+
+    @contextmanager
+    def get_db_session():
+        with DBSession(engine) as session:
+            yield session
+
+
+default_batch_size = 500
+
+
+def _delete_batch(db_session, model, condition, batch_size: int) -> int:
+    ids = select(model.id).where(condition).limit(batch_size)
+    deleted = db_session.exec(delete(model).where(model.id.in_(ids))).rowcount
+    db_session.commit()
+    return deleted
+
+
+def purge_deleted_users(db_session, batch_size: int = default_batch_size) -> int:
+    """Hard-delete soft-deleted accounts `batch_size` at a time, each batch its own transaction.
+
+    Feed messages go first in bounded batches, so a prolific account never
+    turns into one huge cascade; matches are removed by ON DELETE CASCADE.
+    """
+    purged = 0
+    while True:
+        rows = db_session.exec(
+            select(User.id, User.schedule_id)
+            .where(User.deleted_at.is_not(None))
+            .order_by(User.deleted_at)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return purged
+        user_ids = [user_id for user_id, _ in rows]
+        schedule_ids = [schedule_id for _, schedule_id in rows if schedule_id]
+
+        in_batch = FeedMessage.user_id.in_(user_ids)
+        while _delete_batch(db_session, FeedMessage, in_batch, batch_size):
+            pass
+        db_session.exec(delete(User).where(User.id.in_(user_ids)))
+        if schedule_ids:
+            db_session.exec(delete(Schedule).where(Schedule.id.in_(schedule_ids)))
+        db_session.commit()
+        purged += len(user_ids)
+
+
+@app.function(
+    image=JOBS_IMAGE,
+    cpu=0.25,
+    memory=256,
+    secrets=SECRETS,
+    timeout=10 * MINUTES,
+    schedule=modal.Period(minutes=10),
+)
+def purge(batch_size: int = default_batch_size):
+    with get_db_session() as session:
+        purged = purge_deleted_users(session, batch_size)
+    print(f"Purged {purged} deleted accounts")
+
+
+default_grace = timedelta(days=7)  # longer than anyone takes to finish signing up
+default_pause = 0.1  # seconds between batches, so GC never hogs the database
+
+
+def collect_garbage(
+    db_session,
+    blob_store: BlobStore | None = None,
+    grace: timedelta = default_grace,
+    batch_size: int = default_batch_size,
+    pause: float = default_pause,
+) -> dict[str, int]:
+    """Delete schedules and images nothing points at once older than `grace`, and clear expired reset tokens.
+
+    Returns the rows and blobs reclaimed and the bytes they held. A blob goes
+    once no schedule or profile references it and it was last written more
+    than `grace` ago; re-uploading an identical image refreshes that time, so
+    a blob a signup is about to reference again is kept.
+    """
+    stats = {
+        "schedules": 0,
+        "schedule_bytes": 0,
+        "blobs": 0,
+        "blob_bytes": 0,
+        "reset_tokens": 0,
+    }
+
+    orphaned = (Schedule.created_at < datetime.now(timezone.utc) - grace) & ~exists(
+        select(User.id).where(User.schedule_id == Schedule.id)
+    )
+    size = func.coalesce(func.length(Schedule.text), 0) + func.coalesce(
+        func.length(Schedule.img_hash), 0
+    )
+    while ids := db_session.exec(
+        select(Schedule.id).where(orphaned).limit(batch_size)
+    ).all():
+        # re-checked on delete: a late signup may have just attached one, so
+        # only what was actually deleted is counted
+        reclaimed = db_session.exec(
+            delete(Schedule).where(Schedule.id.in_(ids), orphaned).returning(size)
+        ).all()
+        db_session.commit()
+        stats["schedules"] += len(reclaimed)
+        stats["schedule_bytes"] += sum(n for (n,) in reclaimed)
+        time.sleep(pause)
+
+    if blob_store is not None:
+        written_before = time.time() - grace.total_seconds()
+        old_blobs = (blob for blob in blob_store.scan() if blob[2] < written_before)
+        for batch in batched(old_blobs, batch_size):
+            keys = [key for key, _, _ in batch]
+            referenced = set(
+                db_session.exec(
+                    select(Schedule.img_hash).where(Schedule.img_hash.in_(keys))
+                ).all()
+            ) | set(
+                db_session.exec(
+                    select(User.profile_img_hash).where(User.profile_img_hash.in_(keys))
+                ).all()
+            )
+            db_session.commit()  # end the read, don't hold a snapshot open
+            for key, size, _ in batch:
+                if key not in referenced:
+                    blob_store.delete(key)
+                    stats["blobs"] += 1
+                    stats["blob_bytes"] += size
+            time.sleep(pause)
+
+    expired = User.reset_token.is_not(None) & (
+        User.reset_token_expiry < datetime.now(timezone.utc)
+    )
+    while cleared := db_session.exec(
+        update(User)
+        .where(User.id.in_(select(User.id).where(expired).limit(batch_size)))
+        .values(reset_token=None, reset_token_expiry=None)
+    ).rowcount:
+        db_session.commit()
+        stats["reset_tokens"] += cleared
+        time.sleep(pause)
+    db_session.commit()
+    return stats
+
+
+@app.function(
+    image=JOBS_IMAGE,
+    cpu=0.25,
+    memory=256,
+    secrets=SECRETS,
+    timeout=30 * MINUTES,
+    schedule=modal.Period(hours=6),
+    volumes=VOLUME_CONFIG,
+)
+def gc(
+    grace_days: float = default_grace.days,
+    batch_size: int = default_batch_size,
+    pause: float = default_pause,
+):
+    with get_db_session() as session:
+        stats = collect_garbage(
+            session, get_blob_store(), timedelta(days=grace_days), batch_size, pause
+        )
+    print(
+        f"Deleted {stats['schedules']} orphaned schedules "
+        f"({stats['schedule_bytes'] / 1024:.1f} KB) and {stats['blobs']} "
+        f"unreferenced images ({stats['blob_bytes'] / 1024:.1f} KB), "
+        f"cleared {stats['reset_tokens']} expired reset tokens"
+    )
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="job", required=True)
+
+    purge_parser = subparsers.add_parser("purge", help="hard-delete deleted accounts")
+    purge_parser.add_argument("--batch_size", type=int, default=default_batch_size)
+    purge_parser.set_defaults(fn=lambda args: purge.local(args.batch_size))
+
+    gc_parser = subparsers.add_parser(
+        "gc",
+        help="delete orphaned schedules, unreferenced images and expired reset tokens",
+    )
+    gc_parser.add_argument("--grace_days", type=float, default=default_grace.days)
+    gc_parser.add_argument("--batch_size", type=int, default=default_batch_size)
+    gc_parser.add_argument("--pause", type=float, default=default_pause)
+    gc_parser.set_defaults(
+        fn=lambda args: gc.local(args.grace_days, args.batch_size, args.pause)
+    )
+
+    args = parser.parse_args()
+    args.fn(args)
@@ -0,0 +1,113 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# -----------------------------------------------------------------------------
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def samples(self) -> list[tuple[str, float]]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.value = 0.0
+
+    def inc(self, n: float = 1):
+        with self._lock:
+            self.value += n
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, n: float = 1):
+        with self._lock:
+            self.value += n
+
+    def dec(self, n: float = 1):
+        self.inc(-n)
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def samples(self):
+        return [
+            *[
+                (f'{self.name}_bucket{{le="{bound}"}}', n)
+                for bound, n in zip(self.buckets, self.counts)
+            ],
+            (f'{self.name}_bucket{{le="+Inf"}}', self.count),
+            (f"{self.name}_sum", self.sum),
+            (f"{self.name}_count", self.count),
+        ]
+
+
+REGISTRY: dict[str, Metric] = {}
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every registered metric."""
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {value:g}" for name, value in metric.samples())
+    return "\n".join(lines) + "\n"
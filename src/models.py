@@ -1,16 +1,74 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import JSON, Column
+from sqlalchemy import (
+    JSON,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Index,
+    TypeDecorator,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declared_attr, deferred
 from sqlmodel import Field, Relationship, SQLModel
 
 
+class UTCDateTime(TypeDecorator):
+    """Naive-UTC `timestamp without time zone`; aware datetimes are converted on the way in.
+
+    psycopg2 let Postgres drop the offset, asyncpg refuses aware values outright.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+# lists of vocabulary strings (see INTERESTS / PERSONALITY_TRAITS in src/utils.py);
+# JSONB on Postgres so GIN indexes can answer containment and overlap queries
+TagList = JSON().with_variant(JSONB(), "postgresql")
+
+
+def deferred_columns(*names: str, group: str | None = None):
+    """`__mapper_args__` that leave `names` out of SELECTs until first access (or `undefer`)."""
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {
+            "properties": {
+                name: deferred(cls.__table__.c[name], group=group) for name in names
+            }
+        }
+
+    return __mapper_args__
+
+
 class Match(SQLModel, table=True):
-    user_id_1: int | None = Field(default=None, foreign_key="user.id", primary_key=True)
-    user_id_2: int | None = Field(default=None, foreign_key="user.id", primary_key=True)
+    """An undirected pair, stored once with the lower user id first (see `upsert_matches`)."""
+
+    user_id_1: int | None = Field(
+        default=None, foreign_key="user.id", ondelete="CASCADE", primary_key=True
+    )
+    user_id_2: int | None = Field(
+        default=None,
+        foreign_key="user.id",
+        ondelete="CASCADE",
+        primary_key=True,
+        index=True,
+    )  # user_id_1 lookups use the primary key
+
+    # each side's latest ranking of the other, 1.0 = ranked first
+    score_1: float | None = Field(default=None)
+    score_2: float | None = Field(default=None)
 
     created_at: datetime | None = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
+        default_factory=lambda: datetime.now(timezone.utc), sa_type=UTCDateTime
     )
 
     # explicit relationships to disambiguate the two FK columns
@@ -23,51 +81,94 @@ class Match(SQLModel, table=True):
         sa_relationship_kwargs={"foreign_keys": "[Match.user_id_2]"},
     )
 
+    __table_args__ = (
+        CheckConstraint("user_id_1 < user_id_2", name="ck_match_canonical"),
+    )
+
+    def partner_id(self, user_id: int) -> int:
+        return self.user_id_2 if self.user_id_1 == user_id else self.user_id_1
+
+    def score_of(self, user_id: int) -> float | None:
+        """How `user_id`'s latest ranking scored the other user."""
+        return self.score_1 if self.user_id_1 == user_id else self.score_2
+
 
 class User(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    uuid: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    uuid: str = Field(
+        default_factory=lambda: str(uuid.uuid4()), unique=True, index=True
+    )
 
     login_type: str | None = Field(default=None)  # github, google, email
     created_at: datetime | None = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
+        default_factory=lambda: datetime.now(timezone.utc), sa_type=UTCDateTime
     )
     hashed_password: str | None = Field(default=None)
-    reset_token: str | None = Field(default=None)
-    reset_token_expiry: datetime | None = Field(default=None)
-    schedule_id: int | None = Field(default=None, foreign_key="schedule.id")
+    reset_token: str | None = Field(default=None, index=True)
+    reset_token_expiry: datetime | None = Field(default=None, sa_type=UTCDateTime)
+    schedule_id: int | None = Field(
+        default=None, foreign_key="schedule.id", index=True
+    )  # GC looks for schedules no user points at
     schedule: "Schedule" = Relationship(
         back_populates="user",
         sa_relationship_kwargs={"single_parent": True},
     )
+    # children are removed by ON DELETE CASCADE, never loaded just to be deleted
     feed_messages: list["FeedMessage"] = Relationship(
         back_populates="user",
         cascade_delete=True,
+        passive_deletes=True,
     )
     waiting_for_match: bool | None = Field(default=False)
+    # set by account deletion; the row is hidden at once and purged later (src/jobs.py)
+    deleted_at: datetime | None = Field(default=None, sa_type=UTCDateTime)
 
-    # two directional collections that use the link table
+    # the matches where this user is the lower / higher id (see Match)
     outgoing_matches: list["Match"] = Relationship(
         back_populates="user1",
         sa_relationship_kwargs={"foreign_keys": "[Match.user_id_1]"},
         cascade_delete=True,
+        passive_deletes=True,
     )
     incoming_matches: list["Match"] = Relationship(
         back_populates="user2",
         sa_relationship_kwargs={"foreign_keys": "[Match.user_id_2]"},
         cascade_delete=True,
+        passive_deletes=True,
     )
 
-    profile_img: str | None = Field(default=None)  # base64
-    email: str | None = Field(default=None)
-    username: str | None = Field(default=None)
+    profile_img_hash: str | None = Field(default=None)  # blob store key
+    email: str | None = Field(default=None, unique=True, index=True)
+    username: str | None = Field(default=None, unique=True, index=True)
     major: str | None = Field(default=None)
     minor: str | None = Field(default=None)
     graduation_year: int | None = Field(default=None)
-    interests: list[str] | None = Field(default=None, sa_column=Column(JSON))
-    personality_traits: list[str] | None = Field(default=None, sa_column=Column(JSON))
+    interests: list[str] | None = Field(default=None, sa_column=Column(TagList))
+    personality_traits: list[str] | None = Field(
+        default=None, sa_column=Column(TagList)
+    )
     bio: str | None = Field(default=None)
 
+    # profile details are only read on the settings and matches pages
+    __mapper_args__ = deferred_columns(
+        "bio", "interests", "personality_traits", group="profile"
+    )
+    __table_args__ = (
+        *(
+            Index(f"ix_user_{column}", column, postgresql_using="gin").ddl_if(
+                dialect="postgresql"
+            )
+            for column in ("interests", "personality_traits")
+        ),
+        # only the few accounts waiting to be purged
+        Index(
+            "ix_user_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
     def __str__(self):
         interests = self.interests or []
         traits = self.personality_traits or []
@@ -86,19 +187,42 @@ class User(SQLModel, table=True):
 
 class Schedule(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    img: str | None = Field(default=None)  # base64
+    img_hash: str | None = Field(default=None)  # blob store key
     text: str | None = Field(default=None)
 
+    # uploads start unattached (the user may not have signed up yet); GC only
+    # removes unattached ones older than its grace period
+    created_at: datetime | None = Field(
+        default_factory=lambda: datetime.now(timezone.utc), sa_type=UTCDateTime
+    )
+
     user: User | None = Relationship(back_populates="schedule")
 
+    __mapper_args__ = deferred_columns("text")
+
 
 class FeedMessage(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     message: str | None = Field(default=None)
 
     created_at: datetime | None = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
+        default_factory=lambda: datetime.now(timezone.utc), sa_type=UTCDateTime
     )
 
-    user_id: int | None = Field(default=None, foreign_key="user.id")
+    user_id: int | None = Field(
+        default=None, foreign_key="user.id", ondelete="CASCADE", index=True
+    )
     user: User | None = Relationship(back_populates="feed_messages")
+
+    # feed pages are keyset ranges over (created_at, id), see `feed_page`
+    __table_args__ = (Index("ix_feedmessage_created_at_id", "created_at", "id"),)
+
+
+class PostBudget(SQLModel, table=True):
+    """A user's feed posting token bucket, shared by every container (see `take_post_token`)."""
+
+    user_id: int | None = Field(
+        default=None, foreign_key="user.id", ondelete="CASCADE", primary_key=True
+    )
+    tokens: float
+    refilled_at: float  # unix seconds, so the refill is plain arithmetic in any dialect
@@ -0,0 +1,198 @@
+import asyncio
+import contextvars
+import os
+from abc import ABC, abstractmethod
+
+from sqlalchemy.engine import make_url
+
+from src.metrics import Counter
+
+pubsub_published = Counter("pubsub_published_total", "Messages published.")
+pubsub_received = Counter("pubsub_received_total", "Messages received.")
+
+# -----------------------------------------------------------------------------
+
+
+class PubSub(ABC):
+    """Text messages on named channels, delivered to subscribers in every container.
+
+    Subscribers are async callbacks, called one message at a time in the order
+    messages arrive, so a channel's messages are handled in publish order.
+    Delivery is at most once: anything published while a container is
+    disconnected is not replayed to it.
+    """
+
+    def __init__(self):
+        self.callbacks: dict[str, list] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._inbox: asyncio.Queue | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._ready: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    async def subscribe(self, channel: str, callback):
+        """Call `await callback(payload)` for every message on `channel`; idempotent."""
+        await self._start()
+        callbacks = self.callbacks.setdefault(channel, [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+        if len(callbacks) == 1:
+            await self._listen(channel)
+
+    async def publish(self, channel: str, payload: str):
+        await self._start()
+        await self._send(channel, payload)
+        pubsub_published.inc()
+
+    def publish_soon(self, channel: str, payload: str):
+        """`publish` from sync code on the event loop's thread, e.g. session events.
+
+        Raises RuntimeError off the loop, before creating a coroutine that would
+        never be awaited.
+        """
+        asyncio.get_running_loop()
+        self._spawn(self.publish(channel, payload), "publishing")
+
+    def _spawn(self, coro, doing: str):
+        # held until done: the event loop only keeps a weak reference to tasks
+        task = asyncio.get_running_loop().create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(lambda task: self._done(task, doing))
+
+    def _done(self, task: asyncio.Task, doing: str):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Error {doing}: {task.exception()!r}")
+
+    async def _start(self):
+        # a new event loop (e.g. between test clients) needs its own dispatcher
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inbox = asyncio.Queue()
+            # a clean context: callbacks must not inherit the caller's request state
+            self._dispatcher = asyncio.create_task(
+                self._dispatch(), context=contextvars.Context()
+            )
+            self._ready = None
+        failed = self._ready and self._ready.done() and self._ready.exception()
+        if self._ready is None or failed:
+            self._ready = asyncio.create_task(self._connect_and_listen())
+        await asyncio.shield(self._ready)  # concurrent first calls share one connect
+
+    async def _connect_and_listen(self):
+        await self._connect()
+        for channel in list(self.callbacks):
+            await self._listen(channel)
+
+    def _received(self, channel: str, payload: str):
+        pubsub_received.inc()
+        self._inbox.put_nowait((channel, payload))
+
+    async def _dispatch(self):
+        while True:
+            channel, payload = await self._inbox.get()
+            for callback in list(self.callbacks.get(channel, ())):
+                try:
+                    await callback(payload)
+                except Exception as e:
+                    print(f"Error handling {channel} message: {e!r}")
+
+    async def _connect(self):
+        pass
+
+    async def _listen(self, channel: str):
+        pass
+
+    @abstractmethod
+    async def _send(self, channel: str, payload: str): ...
+
+
+class MemoryPubSub(PubSub):
+    """Delivers within this process only: tests, local dev, a single container."""
+
+    async def _send(self, channel: str, payload: str):
+        self._received(channel, payload)
+
+
+class PostgresPubSub(PubSub):
+    """LISTEN/NOTIFY over one dedicated asyncpg connection per container.
+
+    The connection must reach Postgres directly: PgBouncer in transaction
+    pooling mode does not keep a LISTEN session. Payloads are capped at
+    Postgres' 8000 bytes, so publish ids and let subscribers load the rest.
+    """
+
+    max_payload = 7999
+
+    def __init__(self, url: str, reconnect_delay: float = 1):
+        super().__init__()
+        self.dsn = make_url(url).set(drivername="postgresql")
+        self.reconnect_delay = reconnect_delay
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._connected = asyncio.Event()  # set while `_conn` is usable
+
+    async def _start(self):
+        if self._loop is not asyncio.get_running_loop():
+            # bound to the loop they are first awaited on
+            self._lock = asyncio.Lock()
+            self._connected = asyncio.Event()
+        await super()._start()
+
+    async def _connect(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn.render_as_string(False))
+        self._conn.add_termination_listener(self._lost)
+        self._connected.set()
+
+    def _disconnected(self):
+        self._conn = None
+        self._connected.clear()
+
+    def _lost(self, conn):
+        if conn is self._conn:
+            self._disconnected()
+            self._spawn(self._reconnect(), "reconnecting")
+
+    async def _reconnect(self):
+        while self._conn is None:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect_and_listen()
+            except Exception as e:
+                self._disconnected()
+                print(f"Pub/sub reconnect failed: {e!r}")
+
+    def _notified(self, conn, pid, channel, payload):
+        self._received(channel, payload)
+
+    async def _listen(self, channel: str):
+        while True:  # a subscribe while reconnecting waits for the new connection
+            await self._connected.wait()
+            async with self._lock:
+                if self._conn is not None:  # not lost again while waiting
+                    await self._conn.add_listener(channel, self._notified)
+                    return
+
+    async def _send(self, channel: str, payload: str):
+        if len(payload.encode()) > self.max_payload:
+            raise ValueError(f"{channel} payload over {self.max_payload} bytes")
+        if self._conn is None:
+            raise ConnectionError("pub/sub connection lost, reconnecting")
+        async with self._lock:  # one statement at a time per connection
+            await self._conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+
+
+def get_pubsub() -> PubSub:
+    """Postgres LISTEN/NOTIFY when the database is Postgres, in-memory otherwise.
+
+    PUBSUB_BACKEND=memory|postgres overrides the choice; PUBSUB_DATABASE_URL
+    points the listener somewhere other than DATABASE_URL (e.g. past PgBouncer).
+    """
+    url = os.getenv("PUBSUB_DATABASE_URL") or os.getenv("DATABASE_URL")
+    default = "postgres" if url and url.startswith("postgres") else "memory"
+    if os.getenv("PUBSUB_BACKEND", default) == "postgres":
+        return PostgresPubSub(url)
+    return MemoryPubSub()
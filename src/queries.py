@@ -0,0 +1,322 @@
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    case,
+    cast,
+    exists,
+    false,
+    func,
+    literal,
+    or_,
+    true,
+    tuple_,
+    type_coerce,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import contains_eager, load_only, selectinload
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.types import Boolean
+from sqlmodel import select
+
+from src.models import FeedMessage, Match, PostBudget, Schedule, User
+
+# named load profiles, one per use site: pass to `.options(*PROFILE)`.
+# heavy columns (User.bio/interests/personality_traits, Schedule.text) are
+# deferred on the models, so a plain `select(User)` already skips them.
+# the current user (nav, overlay, every page) has none: it is loaded whole,
+# bar those, once per cache ttl and then served to any page without SQL,
+# including the async handlers that can't lazy-load (see `UnitOfWork.user`).
+
+# feed authors, filled in from the message query's own join (see `feed_page`)
+FEED_AUTHOR = (contains_eager(FeedMessage.user).load_only(User.id, User.username),)
+
+# email login: the password check plus what `log_in` writes
+USER_AUTH = (
+    load_only(
+        User.id,
+        User.uuid,
+        User.email,
+        User.login_type,
+        User.hashed_password,
+        User.waiting_for_match,
+    ),
+)
+
+# the 500 ranking candidates: what `User.__str__` reads, plus the uuid that
+# cache invalidation reads when matches are added
+RANK_CANDIDATE = (
+    load_only(
+        User.id,
+        User.uuid,
+        User.login_type,
+        User.created_at,
+        User.major,
+        User.minor,
+        User.graduation_year,
+        User.interests,
+        User.personality_traits,
+        User.bio,
+        User.schedule_id,
+    ),
+    # img_hash too, so the top matches render their cards without a reload
+    selectinload(User.schedule).load_only(
+        Schedule.id, Schedule.img_hash, Schedule.text
+    ),
+)
+
+# a match card: the whole public profile, never the credentials
+MATCH_CARD = (
+    load_only(
+        User.id,
+        User.uuid,
+        User.login_type,
+        User.created_at,
+        User.email,
+        User.username,
+        User.profile_img_hash,
+        User.major,
+        User.minor,
+        User.graduation_year,
+        User.interests,
+        User.personality_traits,
+        User.bio,
+        User.schedule_id,
+    ),
+    selectinload(User.schedule).load_only(Schedule.id, Schedule.img_hash),
+)
+
+
+# -----------------------------------------------------------------------------
+# tag columns (User.interests, User.personality_traits): GIN-indexed JSONB on
+# Postgres, json_each scans on SQLite (local dev and tests)
+
+
+class _TagMatch(ColumnElement):
+    type = Boolean()
+    inherit_cache = True
+    _traverse_internals = [
+        ("column", InternalTraversal.dp_clauseelement),
+        ("values", InternalTraversal.dp_plain_obj),
+    ]
+
+    def __init__(self, column, values):
+        self.column = column
+        self.values = tuple(dict.fromkeys(values))
+
+
+class has_all_tags(_TagMatch):
+    """True where `column` contains every one of `values`."""
+
+    inherit_cache = True
+
+
+class has_any_tag(_TagMatch):
+    """True where `column` shares at least one of `values`."""
+
+    inherit_cache = True
+
+
+@compiles(has_all_tags, "postgresql")
+def _has_all_tags_pg(element, compiler, **kw):
+    tags = type_coerce(element.column, JSONB)
+    # a text literal cast to jsonb, so the query also renders with literal_binds
+    wanted = cast(literal(json.dumps(list(element.values))), JSONB)
+    return compiler.process(tags.contains(wanted), **kw)
+
+
+@compiles(has_any_tag, "postgresql")
+def _has_any_tag_pg(element, compiler, **kw):
+    if not element.values:  # `?| ARRAY[]` has no element type
+        return compiler.process(false(), **kw)
+    tags = type_coerce(element.column, JSONB)
+    return compiler.process(tags.has_any(array(element.values)), **kw)
+
+
+def _tag_values(column):
+    return func.json_each(column).table_valued("value")
+
+
+@compiles(has_all_tags)
+def _has_all_tags(element, compiler, **kw):
+    tags = _tag_values(element.column)
+    matched = (
+        select(func.count(tags.c.value.distinct()))
+        .where(tags.c.value.in_(element.values))
+        .scalar_subquery()
+    )
+    return compiler.process(matched == len(element.values), **kw)
+
+
+@compiles(has_any_tag)
+def _has_any_tag(element, compiler, **kw):
+    tags = _tag_values(element.column)
+    return compiler.process(
+        exists().select_from(tags).where(tags.c.value.in_(element.values)), **kw
+    )
+
+
+def tag_counts(db_session, column) -> dict[str, int]:
+    """How many users carry each tag, most common first."""
+    if db_session.get_bind().dialect.name == "postgresql":
+        is_list = func.jsonb_typeof(column) == "array"
+        tags = func.jsonb_array_elements_text(column).table_valued("value").lateral()
+    else:
+        is_list = func.json_type(column) == "array"
+        tags = _tag_values(column)
+    count = func.count()
+    query = (
+        select(tags.c.value, count)
+        .select_from(column.table)
+        .join(tags, true())
+        .where(is_list)  # unset lists are stored as JSON null
+        .group_by(tags.c.value)
+        .order_by(count.desc(), tags.c.value)
+    )
+    return dict(db_session.exec(query).all())
+
+
+# -----------------------------------------------------------------------------
+# matches: one row per pair, lower user id first
+
+
+def matches_of(user_id: int):
+    """Every match `user_id` is part of (primary key prefix + ix_match_user_id_2)."""
+    return select(Match).where(
+        or_(Match.user_id_1 == user_id, Match.user_id_2 == user_id)
+    )
+
+
+def upsert_matches(db_session, user_id: int, scores: dict[int, float]):
+    """Store `user_id`'s ranking scores in one statement, keeping the other side's score."""
+    if not scores:
+        return
+    now = datetime.now(timezone.utc)
+    rows = []
+    for other_id, score in scores.items():
+        low, high = sorted((user_id, other_id))
+        rows.append(
+            {
+                "user_id_1": low,
+                "user_id_2": high,
+                "score_1": score if user_id == low else None,
+                "score_2": score if user_id == high else None,
+                "created_at": now,
+            }
+        )
+    is_postgres = db_session.get_bind().dialect.name == "postgresql"
+    query = (postgresql.insert if is_postgres else sqlite.insert)(Match)
+    query = query.values(rows).on_conflict_do_update(
+        index_elements=[Match.user_id_1, Match.user_id_2],
+        set_={
+            column: func.coalesce(query.excluded[column], Match.__table__.c[column])
+            for column in ("score_1", "score_2")
+        },
+    )
+    db_session.exec(query)
+
+
+def take_post_token(
+    db_session, user_id: int, rate: float, burst: int, now: float
+) -> bool:
+    """Take one token from `user_id`'s bucket in one statement; False if it has none.
+
+    The row stays locked until the transaction ends, so concurrent takers
+    queue on it. Take in user id order when taking for several users.
+    """
+    elapsed = literal(now) - PostBudget.refilled_at
+    refilled = PostBudget.tokens + elapsed * rate
+    refilled = case((refilled > burst, literal(float(burst))), else_=refilled)
+    is_postgres = db_session.get_bind().dialect.name == "postgresql"
+    query = (postgresql.insert if is_postgres else sqlite.insert)(PostBudget)
+    query = (
+        query.values(user_id=user_id, tokens=burst - 1, refilled_at=now)
+        .on_conflict_do_update(
+            index_elements=[PostBudget.user_id],
+            set_={"tokens": refilled - 1, "refilled_at": now},
+            where=refilled >= 1,
+        )
+        .returning(PostBudget.user_id)
+    )
+    return db_session.exec(query).first() is not None
+
+
+# -----------------------------------------------------------------------------
+# feed: keyset pages over (created_at, id), ix_feedmessage_created_at_id
+
+
+FEED_WRITE_LOCK = 0x66656564  # "feed", the advisory lock key
+
+
+def lock_feed_writes(db_session) -> datetime:
+    """Hold off other feed writes until this transaction ends; returns the time to stamp its posts.
+
+    `feed_page(after=)` trusts that a message is committed before any with a
+    later (created_at, id). Stamping after taking the lock, from the database
+    clock, makes commit order and stamp order agree across containers. On
+    SQLite, one writer process, the local clock is enough.
+    """
+    if db_session.get_bind().dialect.name != "postgresql":
+        return datetime.now(timezone.utc)
+    db_session.exec(select(func.pg_advisory_xact_lock(FEED_WRITE_LOCK)))
+    return db_session.exec(select(func.clock_timestamp())).one()
+
+
+def feed_cursor(message: FeedMessage) -> str:
+    """Opaque position of `message` in the feed, for `feed_page(before=/after=)`."""
+    created_at = message.created_at
+    if created_at.tzinfo is not None:  # fresh, not yet read back as naive UTC
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{created_at.isoformat()}_{message.id}"
+
+
+def parse_feed_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of `feed_cursor`; raises ValueError on anything else."""
+    created_at, _, message_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+def feed_message(db_session, message_id: int) -> FeedMessage | None:
+    """One message with its author, unless the author has been deleted since."""
+    return db_session.exec(
+        select(FeedMessage)
+        .join(FeedMessage.user)
+        .where(FeedMessage.id == message_id, User.deleted_at.is_(None))
+        .options(*FEED_AUTHOR)
+    ).first()
+
+
+def feed_page(
+    db_session, limit: int, before: str | None = None, after: str | None = None
+) -> list[FeedMessage]:
+    """Up to `limit` messages of live accounts, oldest first.
+
+    The latest ones by default, the ones just before the `before` cursor, or
+    the ones just after the `after` cursor. Each page is one index range
+    scan, authors included, so its cost grows with neither the history nor
+    the page size.
+    """
+    position = tuple_(FeedMessage.created_at, FeedMessage.id)
+    query = (
+        select(FeedMessage)
+        .join(FeedMessage.user)
+        .where(User.deleted_at.is_(None))
+        .options(*FEED_AUTHOR)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(position > parse_feed_cursor(after))
+        return list(
+            db_session.exec(
+                query.order_by(FeedMessage.created_at, FeedMessage.id)
+            ).all()
+        )
+    if before is not None:
+        query = query.where(position < parse_feed_cursor(before))
+    messages = db_session.exec(
+        query.order_by(FeedMessage.created_at.desc(), FeedMessage.id.desc())
+    ).all()
+    return messages[::-1]
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from src.antivirus import Scanner, load_signatures
+
+EICAR = b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*"
+
+
+@pytest.fixture
+def signatures(tmp_path):
+    (tmp_path / "md5.txt").write_text(hashlib.md5(EICAR).hexdigest() + "\n")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "sha256.txt").write_text(
+        f"{hashlib.sha256(b'other').hexdigest().upper()}:Some.Trojan\n"
+    )
+    return tmp_path
+
+
+class TestLoadSignatures:
+    def test_groups_by_digest_length(self, signatures):
+        loaded = load_signatures(signatures)
+        assert loaded["md5"] == {hashlib.md5(EICAR).hexdigest()}
+        assert loaded["sha256"] == {hashlib.sha256(b"other").hexdigest()}
+        assert "sha1" not in loaded
+
+    # Invalid
+
+    def test_skips_junk_lines(self, tmp_path):
+        (tmp_path / "hashes.txt").write_text("# comment\n\nnot-a-hash\n" + "z" * 32)
+        assert load_signatures(tmp_path) == {}
+
+    def test_missing_lists(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_signatures(tmp_path)
+
+
+class TestScanner:
+    def test_detects_signature(self, signatures):
+        scanner = Scanner(signatures)
+        assert scanner.scan(EICAR)
+        assert not scanner.scan(b"clean image bytes")
+
+    def test_signatures_loaded_once(self, signatures):
+        """Lists are read on first use only, so removing them afterwards is harmless."""
+        scanner = Scanner(signatures)
+        scanner.scan(b"x")
+        for path in signatures.rglob("*.txt"):
+            path.unlink()
+        assert scanner.scan(EICAR)
+
+    def test_duplicate_upload_skips_scan(self, signatures):
+        scanner = Scanner(signatures)
+        calls = []
+        scan = scanner.scan
+        scanner.scan = lambda data: calls.append(data) or scan(data)
+
+        async def twice():
+            return [await scanner.scan_async(EICAR) for _ in range(2)]
+
+        assert asyncio.run(twice()) == [True, True]
+        assert len(calls) == 1
+
+    # Edge
+
+    def test_cache_is_bounded(self, signatures):
+        scanner = Scanner(signatures, cache_size=2)
+
+        async def scan_all():
+            for data in [b"a", b"b", b"c"]:
+                await scanner.scan_async(data)
+
+        asyncio.run(scan_all())
+        assert hashlib.sha256(b"a").hexdigest() not in scanner._cache
+        assert len(scanner._cache) == 2
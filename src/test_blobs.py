@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src.blobs import (
+    LocalBlobStore,
+    blob_hash,
+    from_data_url,
+    sniff_mime,
+    to_data_url,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+
+
+class _Volume:
+    """A Modal volume another container writes to: blobs appear on reload."""
+
+    def __init__(self, root, fail: int = 0):
+        self.root = root
+        self.fail = fail  # reloads that raise, as Modal does with files open
+        self.store = None  # when set, a reload with its files open raises
+        self.reloads = 0
+        self.remote: dict[str, bytes] = {}
+
+    def write_elsewhere(self, data: bytes) -> str:
+        self.remote[blob_hash(data)] = data
+        return blob_hash(data)
+
+    def commit(self):
+        pass
+
+    def reload(self):
+        if self.fail or (self.store and self.store._open_files):
+            self.fail = max(self.fail - 1, 0)
+            raise RuntimeError("there are open files preventing the operation")
+        self.reloads += 1
+        for key, data in self.remote.items():
+            path = self.root / key[:2] / key[2:4] / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+
+class TestLocalBlobStore:
+    def test_put_get_roundtrip(self, tmp_path):
+        """Stored bytes come back unchanged under their sha256."""
+        store = LocalBlobStore(tmp_path)
+        key = store.put(PNG)
+        assert key == blob_hash(PNG)
+        assert store.get(key) == PNG
+
+    def test_put_is_idempotent(self, tmp_path):
+        """Identical content is stored once."""
+        store = LocalBlobStore(tmp_path)
+        assert store.put(PNG) == store.put(PNG)
+        assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+
+    def test_put_again_refreshes_write_time(self, tmp_path):
+        """A re-upload restarts the garbage collector's grace period."""
+        store = LocalBlobStore(tmp_path)
+        key = store.put(PNG)
+        os.utime(store._path(key), (0, 0))
+        store.put(PNG)
+        assert [(k, size) for k, size, _ in store.scan()] == [(key, len(PNG))]
+        assert next(store.scan())[2] > time.time() - 60
+
+    # Edge
+
+    def test_missing_blob(self, tmp_path):
+        store = LocalBlobStore(tmp_path)
+        assert store.get(blob_hash(b"nope")) is None
+        assert not store.exists(blob_hash(b"nope"))
+
+    def test_delete(self, tmp_path):
+        store = LocalBlobStore(tmp_path)
+        key = store.put(SVG)
+        store.delete(key)
+        store.delete(key)  # deleting twice is fine
+        assert not store.exists(key)
+
+    def test_shared_volume(self, tmp_path):
+        """Writes are committed; a miss reloads once in case another container wrote it."""
+
+        class Volume:
+            commits = reloads = 0
+
+            def commit(self):
+                self.commits += 1
+
+            def reload(self):
+                self.reloads += 1
+
+        volume = Volume()
+        store = LocalBlobStore(tmp_path, volume, reload_interval=0)
+        key = store.put(PNG)
+        assert store.get(key) == PNG
+        assert (volume.commits, volume.reloads) == (1, 0)
+        assert store.get(blob_hash(b"nope")) is None
+        assert not store.exists(blob_hash(b"nope"))
+        assert volume.reloads == 2
+
+    def test_reloads_are_throttled(self, tmp_path):
+        """Random keys can't make every request reload the volume."""
+        volume = _Volume(tmp_path)
+        store = LocalBlobStore(tmp_path, volume, reload_interval=60)
+        for i in range(5):
+            assert store.get(blob_hash(f"nope {i}".encode())) is None
+        assert volume.reloads == 1
+
+    def test_failed_reload_is_retried(self, tmp_path):
+        """A blob another container wrote shows up once a later reload succeeds."""
+        volume = _Volume(tmp_path, fail=1)
+        store = LocalBlobStore(tmp_path, volume, reload_interval=0.05)
+        key = volume.write_elsewhere(PNG)
+        assert store.get(key) is None  # reload failed
+        assert store.get(key) is None  # throttled
+        time.sleep(0.05)
+        assert store.get(key) == PNG
+        assert volume.reloads == 1
+
+    def test_reload_waits_for_open_files(self, tmp_path):
+        volume = _Volume(tmp_path)
+        store = LocalBlobStore(tmp_path, volume)
+        volume.store = store
+        key = volume.write_elsewhere(PNG)
+
+        def read_slowly():
+            with store._file_open():
+                time.sleep(0.1)
+
+        reader = threading.Thread(target=read_slowly)
+        reader.start()
+        time.sleep(0.01)
+        assert store.get(key) == PNG
+        reader.join()
+
+    # Invalid
+
+    def test_rejects_path_traversal(self, tmp_path):
+        """Keys are hex digests only, never paths."""
+        store = LocalBlobStore(tmp_path)
+        with pytest.raises(ValueError):
+            store.get("../" * 20 + "etc/passwd")
+
+
+class TestDataUrls:
+    def test_sniff_mime(self):
+        assert sniff_mime(PNG) == "image/png"
+        assert sniff_mime(SVG) == "image/svg+xml"
+        assert sniff_mime(b"???") == "application/octet-stream"
+
+    def test_roundtrip(self):
+        data_url = to_data_url(PNG)
+        assert data_url.startswith("data:image/png;base64,")
+        assert from_data_url(data_url) == PNG
@@ -0,0 +1,162 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import undefer
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, create_engine, select
+
+from src.cache import UserCache, invalidate_on_commit
+from src.models import User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/db.sqlite")
+    SQLModel.metadata.create_all(engine)
+    with DBSession(engine) as session:
+        session.add(
+            User(uuid="u1", username="alice", major="Finance", interests=["Chess"])
+        )
+        session.commit()
+    return engine
+
+
+def _load(engine, cache, *options):
+    loaded_at = time.monotonic()
+    with DBSession(engine) as session:
+        query = select(User).where(User.uuid == "u1").options(*options)
+        user = session.exec(query).first()
+        cache.put(user, loaded_at)
+    return user
+
+
+class TestUserCache:
+    def test_snapshot_round_trip(self, engine):
+        cache = UserCache()
+        _load(engine, cache)
+        user = cache.get("u1")
+        assert (user.username, user.major) == ("alice", "Finance")
+
+    def test_snapshot_is_copied(self, engine):
+        """Mutating a returned user never leaks into the cache."""
+        cache = UserCache()
+        _load(engine, cache, undefer(User.interests))
+        cache.get("u1").interests.append("Golf")
+        assert cache.get("u1").interests == ["Chess"]
+
+    def test_merges_without_sql(self, engine):
+        cache = UserCache()
+        _load(engine, cache)
+        with DBSession(engine) as session:
+            user = session.merge(cache.get("u1"), load=False)
+            user.bio = "hi"
+            session.commit()
+        with DBSession(engine) as session:
+            assert session.exec(select(User.bio)).first() == "hi"
+
+    def test_deferred_columns_stay_deferred(self, engine):
+        """Columns the load skipped aren't cached as None; they load on first access."""
+        cache = UserCache()
+        _load(engine, cache)
+        with DBSession(engine) as session:
+            user = session.merge(cache.get("u1"), load=False)
+            assert "interests" in inspect(user).unloaded
+            assert user.interests == ["Chess"]
+
+    # Edge
+
+    def test_ttl(self, engine):
+        cache = UserCache(ttl=0.01)
+        _load(engine, cache)
+        time.sleep(0.02)
+        assert cache.get("u1") is None
+
+    def test_lru_bound(self, engine):
+        cache = UserCache(maxsize=1)
+        user = _load(engine, cache)
+        user.uuid = "u2"
+        cache.put(user, time.monotonic())
+        assert cache.get("u1") is None
+        assert cache.get("u2") is not None
+
+    def test_load_racing_a_write_is_not_cached(self, engine):
+        cache = UserCache()
+        loaded_at = time.monotonic()
+        with DBSession(engine) as session:
+            user = session.exec(select(User)).first()
+        cache.invalidate("u1")  # committed while the row above was in flight
+        cache.put(user, loaded_at)
+        assert cache.get("u1") is None
+
+
+class TestInvalidateOnCommit:
+    @pytest.fixture
+    def watched(self):
+        class Session(DBSession):  # scope the listeners to this test
+            pass
+
+        cache = UserCache()
+        invalidate_on_commit(cache, Session)
+        return cache, Session
+
+    def test_write_drops_snapshot(self, engine, watched):
+        cache, Session = watched
+        _load(engine, cache)
+        with Session(engine) as session:
+            user = session.exec(select(User)).first()
+            user.username = "bob"
+            session.commit()
+        assert cache.get("u1") is None
+        assert _load(engine, cache).username == "bob"
+
+    def test_reports_each_invalidation(self, engine):
+        """e.g. for other containers to drop their snapshots too."""
+
+        class Session(DBSession):
+            pass
+
+        reported = []
+        invalidate_on_commit(UserCache(), Session, lambda *args: reported.append(args))
+        with Session(engine) as session:
+            session.exec(select(User)).first().username = "bob"
+            session.commit()
+            session.exec(select(User)).first().deleted_at = datetime.now(timezone.utc)
+            session.commit()
+        assert reported == [("u1", False), ("u1", True)]
+
+    def test_rollback_keeps_snapshot(self, engine, watched):
+        cache, Session = watched
+        _load(engine, cache)
+        with Session(engine) as session:
+            user = session.exec(select(User)).first()
+            user.username = "bob"
+            session.flush()
+            session.rollback()
+        assert cache.get("u1").username == "alice"
+
+    # Invalid
+
+    def test_deleted_user_never_cached_again(self, engine, watched):
+        """A snapshot read before the delete can't bring the account back."""
+        cache, Session = watched
+        loaded_at = time.monotonic()
+        with DBSession(engine) as session:
+            stale = session.exec(select(User)).first()
+        with Session(engine) as session:
+            session.delete(session.exec(select(User)).first())
+            session.commit()
+        cache.put(stale, loaded_at)
+        cache.put(stale, time.monotonic())
+        assert cache.get("u1") is None
+
+    def test_soft_deleted_user_never_cached_again(self, engine, watched):
+        cache, Session = watched
+        with DBSession(engine) as session:
+            stale = session.exec(select(User)).first()
+        with Session(engine) as session:
+            session.exec(select(User)).first().deleted_at = datetime.now(timezone.utc)
+            session.commit()
+        cache.put(stale, time.monotonic())
+        assert cache.get("u1") is None
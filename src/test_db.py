@@ -0,0 +1,300 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, create_engine, select
+
+from src.db import (
+    PIN_KEY,
+    InstrumentedPool,
+    PoolMetrics,
+    RequestScope,
+    UnitOfWork,
+    _instrument,
+    async_database_url,
+    begin_request,
+    create_async_db_engine,
+    create_db_engine,
+    current_uow,
+    pool_settings,
+    unit_of_work,
+)
+from src.cache import UserCache
+from src.metrics import REGISTRY
+from src.models import User
+
+
+class TestPoolSettings:
+    def test_role_defaults(self):
+        assert pool_settings("web")["pool_size"] > pool_settings("worker")["pool_size"]
+
+    def test_env_override(self, monkeypatch):
+        monkeypatch.setenv("DB_WORKER_POOL_SIZE", "7")
+        monkeypatch.setenv("DB_WORKER_POOL_PRE_PING", "false")
+        settings = pool_settings("worker")
+        assert settings["pool_size"] == 7
+        assert settings["pool_pre_ping"] is False
+
+    def test_pgbouncer_mode(self, monkeypatch):
+        """PgBouncer owns the pool, so connections are closed after every checkout."""
+        monkeypatch.setenv("DB_PGBOUNCER", "1")
+        engine = create_db_engine("web", "postgresql+psycopg2://u@localhost/db")
+        assert isinstance(engine.pool, NullPool)
+
+
+class TestPoolMetrics:
+    def _engine(self, tmp_path, metrics, **kwargs):
+        pool_cls = type("P", (InstrumentedPool, QueuePool), {"metrics": metrics})
+        engine = create_engine(
+            f"sqlite:///{tmp_path}/db.sqlite", poolclass=pool_cls, **kwargs
+        )
+        _instrument(engine, metrics)
+        return engine
+
+    def test_hold_time(self, tmp_path):
+        metrics = PoolMetrics("test_hold")
+        engine = self._engine(tmp_path, metrics)
+        with engine.connect() as conn:
+            assert metrics.checked_out.value == 1
+            time.sleep(0.05)
+            conn.execute(text("select 1"))
+        assert metrics.checked_out.value == 0
+        assert metrics.hold_seconds.count == 1
+        assert metrics.hold_seconds.sum >= 0.05
+        assert metrics.checkout_seconds.count == 1
+
+    def test_engines_of_one_role_share_metrics(self, tmp_path):
+        """A second engine of a role adds to the first's metrics instead of replacing them."""
+        url = f"sqlite:///{tmp_path}/db.sqlite"
+        engines = [create_db_engine("test_shared", url) for _ in range(2)]
+        metrics = PoolMetrics.for_role("test_shared")
+        assert REGISTRY["db_test_shared_pool_checked_out"] is metrics.checked_out
+        with engines[0].connect(), engines[1].connect():
+            assert metrics.checked_out.value == 2
+        assert metrics.hold_seconds.count == 2
+
+    # Edge
+
+    def test_waiting_on_exhausted_pool(self, tmp_path):
+        """A caller blocked on a full pool is counted until it times out."""
+        metrics = PoolMetrics("test_waiting")
+        engine = self._engine(
+            tmp_path, metrics, pool_size=1, max_overflow=0, pool_timeout=0.2
+        )
+        seen = []
+        with engine.connect():
+            watcher = threading.Thread(
+                target=lambda: time.sleep(0.1) or seen.append(metrics.waiting.value)
+            )
+            watcher.start()
+            with pytest.raises(TimeoutError):
+                engine.connect()
+            watcher.join()
+        assert seen == [1]
+        assert metrics.waiting.value == 0
+        assert metrics.checkout_seconds.max >= 0.2
+
+
+class TestAsyncDatabaseUrl:
+    def test_postgres_uses_asyncpg(self):
+        url = async_database_url("postgresql://u:p@host/db?sslmode=require")
+        assert url == "postgresql+asyncpg://u:p@host/db?ssl=require"
+
+    def test_sqlite_uses_aiosqlite(self):
+        assert async_database_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+    # Edge
+
+    def test_pgbouncer_disables_statement_cache(self, monkeypatch):
+        """Prepared statements don't survive transaction pooling."""
+        monkeypatch.setenv("DB_PGBOUNCER", "1")
+        engine = create_async_db_engine("web", "postgresql://u@localhost/db")
+        assert isinstance(engine.pool, NullPool)
+        assert engine.dialect.name == "postgresql"
+        assert engine.dialect.driver == "asyncpg"
+
+        # what asyncpg.connect would be called with, captured before any I/O
+        seen = {}
+
+        @event.listens_for(engine.sync_engine, "do_connect")
+        def capture(dialect, conn_rec, cargs, cparams):
+            seen.update(cparams)
+            raise ConnectionAbortedError
+
+        async def connect():
+            async with engine.connect():
+                pass
+
+        with pytest.raises(ConnectionAbortedError):
+            asyncio.run(connect())
+        assert seen["statement_cache_size"] == 0
+        assert seen["prepared_statement_cache_size"] == 0
+
+
+class TestUnitOfWork:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        url = f"sqlite:///{tmp_path}/db.sqlite"
+        sync_engine = create_db_engine("test_uow_setup", url)
+        SQLModel.metadata.create_all(sync_engine)
+        with DBSession(sync_engine) as session:
+            session.add(User(uuid="u1", username="alice"))
+            session.commit()
+        return create_async_db_engine("test_uow", url)
+
+    def _in_request(self, engine, handler):
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen["uow"] = begin_request(engine)
+            await seen["uow"].run(handler, seen["uow"])
+
+        asyncio.run(RequestScope(app)({"type": "http"}, None, None))
+        return seen["uow"]
+
+    def test_user_loaded_once(self, engine):
+        """Every component asking for the current user shares one query."""
+
+        def handler(uow):
+            users = [uow.user("u1") for _ in range(3)]
+            assert users[0] is users[1] is users[2]
+            assert users[0].username == "alice"
+
+        assert self._in_request(engine, handler).query_count == 1
+
+    def test_closed_at_response_end(self, engine):
+        uow = self._in_request(engine, lambda uow: uow.user("u1"))
+        assert uow._async_session is None
+        assert current_uow() is None
+
+    def test_release_keeps_objects_loaded(self, engine):
+        def handler(uow):
+            user = uow.user("u1")
+            assert not uow.session.in_transaction()  # connection back in the pool
+            assert user.username == "alice"
+
+        assert self._in_request(engine, handler).query_count == 1
+
+    def test_unit_of_work_outside_request(self, engine):
+        """Websocket messages get their own unit of work, visible to `current_uow`."""
+
+        async def post():
+            async with unit_of_work(engine) as uow:
+                assert current_uow() is uow
+                return await uow.run(lambda: uow.user("u1").username)
+
+        assert asyncio.run(post()) == "alice"
+        assert current_uow() is None
+
+    # Edge
+
+    def test_outside_request(self, engine):
+        """Websockets and 404s have no unit of work and open their own."""
+        assert begin_request(engine) is None
+        assert current_uow() is None
+
+    def test_unknown_user_is_memoized(self, engine):
+        def handler(uow):
+            assert uow.user("missing") is None
+            assert uow.user("missing") is None
+
+        assert self._in_request(engine, handler).query_count == 1
+
+
+class TestReplicaRouting:
+    """The replica is a second SQLite file whose copy of the user is stale."""
+
+    @pytest.fixture
+    def engines(self, tmp_path):
+        engines = []
+        for name, username in [("primary", "alice"), ("replica", "stale")]:
+            url = f"sqlite:///{tmp_path}/{name}.sqlite"
+            sync_engine = create_db_engine(f"test_{name}_setup", url)
+            SQLModel.metadata.create_all(sync_engine)
+            with DBSession(sync_engine) as session:
+                session.add(User(uuid="u1", username=username))
+                session.commit()
+            engines.append(create_async_db_engine(f"test_{name}", url))
+        return engines
+
+    def _run(self, uow, fn):
+        async def run():
+            try:
+                return await uow.run(fn, uow.session)
+            finally:
+                await uow.close()
+
+        return asyncio.run(run())
+
+    def _username(self, session) -> str:
+        return session.exec(select(User.username).where(User.uuid == "u1")).one()
+
+    def test_reads_go_to_replica(self, engines):
+        uow = UnitOfWork(engines[0], None, engines[1])
+        assert self._run(uow, self._username) == "stale"
+
+    def test_reads_after_write_go_to_primary(self, engines):
+        def write_then_read(session):
+            user = session.exec(select(User)).one()
+            user.bio = "hi"
+            session.commit()
+            return self._username(session)
+
+        uow = UnitOfWork(engines[0], None, engines[1])
+        assert self._run(uow, write_then_read) == "alice"
+
+    def test_write_pins_browser_to_primary(self, engines):
+        """A redirect straight after a save reads what the save wrote."""
+        browser_session = {}
+
+        def write(session):
+            session.add(User(uuid="u2", username="bob"))
+            session.commit()
+
+        self._run(UnitOfWork(engines[0], None, engines[1], browser_session), write)
+        assert browser_session[PIN_KEY] > time.time()
+        uow = UnitOfWork(engines[0], None, engines[1], browser_session)
+        assert self._run(uow, self._username) == "alice"
+
+    def test_use_primary(self, engines):
+        def read(session):
+            uow.use_primary()
+            return self._username(session)
+
+        uow = UnitOfWork(engines[0], None, engines[1])
+        assert self._run(uow, read) == "alice"
+
+    def test_cached_user_comes_from_primary(self, engines):
+        """A stale replica row must not be cached and served to every request."""
+        cache = UserCache()
+
+        def read(session):
+            return uow.user("u1").username, self._username(session)
+
+        uow = UnitOfWork(engines[0], cache, engines[1])
+        # everything else keeps reading the replica
+        assert self._run(uow, read) == ("alice", "stale")
+        assert cache.get("u1").username == "alice"
+
+    # Edge
+
+    def test_pin_expires(self, engines):
+        browser_session = {PIN_KEY: time.time() - 1}
+        uow = UnitOfWork(engines[0], None, engines[1], browser_session)
+        assert self._run(uow, self._username) == "stale"
+        assert browser_session[PIN_KEY] < time.time()  # reads don't extend it
+
+    def test_locking_read_goes_to_primary(self, engines):
+        def lock(session):
+            query = select(User.username).where(User.uuid == "u1")
+            return session.exec(query.with_for_update()).one()
+
+        assert self._run(UnitOfWork(engines[0], None, engines[1]), lock) == "alice"
+
+    def test_no_replica(self, engines):
+        assert self._run(UnitOfWork(engines[0]), self._username) == "alice"
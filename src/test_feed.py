@@ -0,0 +1,299 @@
+import asyncio
+import functools
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, create_engine
+
+from src.feed import Broadcaster, RateLimiter, SharedRateLimiter, WriteBehind
+from src.models import User
+from src.queries import lock_feed_writes
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class _Socket:
+    def __init__(self, delay: float = 0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+        self.closed = False
+
+    async def send(self, text: str):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.received.append(text)
+
+    async def close(self):
+        self.closed = True
+
+
+def _run(scenario):
+    return asyncio.run(scenario())
+
+
+class TestBroadcaster:
+    def test_fans_out_in_order(self):
+        async def scenario():
+            feed = Broadcaster()
+            sockets = [_Socket() for _ in range(3)]
+            for i, s in enumerate(sockets):
+                feed.connect(i, s.send, s.close)
+            for text in ("a", "b"):
+                feed.publish(text)
+            await asyncio.sleep(0.01)
+            return sockets
+
+        assert all(s.received == ["a", "b"] for s in _run(scenario))
+
+    def test_slow_client_does_not_delay_others(self):
+        async def scenario():
+            feed = Broadcaster()
+            slow, fast = _Socket(delay=1), _Socket()
+            feed.connect(0, slow.send, slow.close)
+            feed.connect(1, fast.send, fast.close)
+            feed.publish("a")
+            await asyncio.sleep(0.05)
+            stats = feed.stats()
+            feed.disconnect(0)
+            return fast, stats
+
+        fast, stats = _run(scenario)
+        assert fast.received == ["a"]
+        assert stats[0][0] == 0 and stats[1][0] == 0  # taken off the queue, being sent
+        assert stats[1][1] < 0.05
+
+    # Edge
+
+    def test_drops_client_that_falls_behind(self):
+        async def scenario():
+            feed = Broadcaster(maxsize=2)
+            stuck = _Socket(delay=10)
+            feed.connect(0, stuck.send, stuck.close)
+            for text in "abcd":  # one in flight, two queued, one too many
+                feed.publish(text)
+                await asyncio.sleep(0)
+            closing = len(feed._closing)  # held, so it can't be collected mid-close
+            await asyncio.sleep(0)
+            return feed, stuck, closing
+
+        feed, stuck, closing = _run(scenario)
+        assert feed.clients == {}
+        assert stuck.closed
+        assert closing == 1 and feed._closing == set()
+
+    def test_drops_client_whose_send_fails(self):
+        async def scenario():
+            feed = Broadcaster()
+            dead, alive = _Socket(fail=True), _Socket()
+            feed.connect(0, dead.send, dead.close)
+            feed.connect(1, alive.send, alive.close)
+            feed.publish("a")
+            await asyncio.sleep(0.01)
+            feed.publish("b")
+            await asyncio.sleep(0.01)
+            return feed, dead, alive
+
+        feed, dead, alive = _run(scenario)
+        assert list(feed.clients) == [1]
+        assert dead.closed
+        assert alive.received == ["a", "b"]
+
+    def test_drops_client_whose_send_times_out(self):
+        async def scenario():
+            feed = Broadcaster(send_timeout=0.01)
+            hung = _Socket(delay=10)
+            feed.connect(0, hung.send, hung.close)
+            feed.publish("a")
+            await asyncio.sleep(0.05)
+            return feed, hung
+
+        feed, hung = _run(scenario)
+        assert feed.clients == {}
+        assert hung.closed
+
+
+class TestRateLimiter:
+    def test_burst_then_refill(self):
+        limiter = RateLimiter(rate=2, burst=3)
+        assert [limiter.allow("u1", now=0) for _ in range(4)] == [True] * 3 + [False]
+        assert limiter.allow("u2", now=0)  # buckets are per user
+        assert limiter.allow("u1", now=0.5)  # one token back after 1 / rate
+        assert not limiter.allow("u1", now=0.5)
+
+    # Edge
+
+    def test_refill_caps_at_burst(self):
+        limiter = RateLimiter(rate=1, burst=2)
+        limiter.allow("u1", now=0)
+        assert [limiter.allow("u1", now=100) for _ in range(3)] == [True, True, False]
+
+    def test_evicts_least_recently_used(self):
+        limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+        for key in ("u1", "u2", "u1", "u3"):
+            limiter.allow(key, now=0)
+        assert list(limiter.buckets) == ["u1", "u3"]
+
+
+class TestSharedRateLimiter:
+    """Each engine stands in for a container; the buckets are rows they share."""
+
+    @pytest.fixture(params=["sqlite", "postgres"])
+    def engines(self, request, tmp_path):
+        if request.param == "sqlite":
+            url, connect_args = f"sqlite:///{tmp_path}/db.sqlite", {}
+        elif TEST_DATABASE_URL:
+            url, connect_args = (
+                TEST_DATABASE_URL,
+                {"options": "-csearch_path=test_feed"},
+            )
+            with create_engine(url).begin() as conn:
+                conn.exec_driver_sql("DROP SCHEMA IF EXISTS test_feed CASCADE")
+                conn.exec_driver_sql("CREATE SCHEMA test_feed")
+        else:
+            pytest.skip("TEST_DATABASE_URL (Postgres) not set")
+        engines = [create_engine(url, connect_args=connect_args) for _ in range(2)]
+        SQLModel.metadata.create_all(engines[0])
+        with DBSession(engines[0]) as session:
+            session.add_all([User(id=1), User(id=2)])
+            session.commit()
+        yield engines
+        for engine in engines:
+            engine.dispose()
+        if request.param == "postgres":
+            with create_engine(url).begin() as conn:
+                conn.exec_driver_sql("DROP SCHEMA test_feed CASCADE")
+
+    def _allow(self, engine, limiter, user_id, now) -> bool:
+        with DBSession(engine) as session:
+            allowed = limiter.allow(session, user_id, now=now)
+            session.commit()
+            return allowed
+
+    def test_burst_then_refill(self, engines):
+        limiter = SharedRateLimiter(rate=2, burst=3)
+        allow = functools.partial(self._allow, engines[0], limiter)
+        assert [allow(1, 0) for _ in range(4)] == [True] * 3 + [False]
+        assert allow(2, 0)  # buckets are per user
+        assert allow(1, 0.5)  # one token back after 1 / rate
+        assert not allow(1, 0.5)
+
+    def test_budget_is_shared_by_containers(self, engines):
+        limiter = SharedRateLimiter(rate=1, burst=2)
+        assert self._allow(engines[0], limiter, 1, 0)
+        assert self._allow(engines[1], limiter, 1, 0)
+        assert not self._allow(engines[0], limiter, 1, 0)
+        assert not self._allow(engines[1], limiter, 1, 0)
+
+    # Edge
+
+    def test_refill_caps_at_burst(self, engines):
+        limiter = SharedRateLimiter(rate=1, burst=2)
+        allow = functools.partial(self._allow, engines[0], limiter)
+        allow(1, 0)
+        assert [allow(1, 100) for _ in range(3)] == [True, True, False]
+
+    def test_rolled_back_take_is_returned(self, engines):
+        limiter = SharedRateLimiter(rate=1, burst=1)
+        with DBSession(engines[0]) as session:
+            assert limiter.allow(session, 1, now=0)  # the batch then fails
+        assert self._allow(engines[1], limiter, 1, 0)
+
+
+@pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL (Postgres) not set"
+)
+class TestFeedWriteLock:
+    def test_writers_commit_in_stamp_order(self):
+        """A second container's batch waits for the first and is stamped after it commits."""
+        engine = create_engine(TEST_DATABASE_URL)
+        with DBSession(engine) as first, DBSession(engine) as second:
+            stamped_first = lock_feed_writes(first)
+            second.connection().exec_driver_sql("SET lock_timeout = '100ms'")
+            with pytest.raises(OperationalError):
+                lock_feed_writes(second)
+            second.rollback()
+            first.commit()
+            assert lock_feed_writes(second) > stamped_first
+            second.commit()
+        engine.dispose()
+
+
+class TestWriteBehind:
+    def test_batches_concurrent_rows_in_order(self):
+        async def scenario():
+            batches, published = [], []
+
+            async def write(rows):
+                await asyncio.sleep(0.01)  # a transaction
+                batches.append(rows)
+                return [row * 10 for row in rows]
+
+            async def publish(result):
+                published.append(result)
+
+            writer = WriteBehind(write, publish, max_batch=3)
+            results = await asyncio.gather(*(writer.submit(i) for i in range(5)))
+            return batches, published, results
+
+        batches, published, results = _run(scenario)
+        assert batches == [[0, 1, 2], [3, 4]]
+        assert published == [0, 10, 20, 30, 40]
+        assert results == [0, 10, 20, 30, 40]
+
+    def test_lone_row_is_written_at_once(self):
+        async def scenario():
+            async def write(rows):
+                return rows
+
+            writer = WriteBehind(write)
+            return await asyncio.wait_for(writer.submit("a"), 0.01)
+
+        assert _run(scenario) == "a"
+
+    # Edge
+
+    def test_failed_batch_fails_its_rows_only(self):
+        async def scenario():
+            async def write(rows):
+                await asyncio.sleep(0.01)
+                if "bad" in rows:
+                    raise RuntimeError("deadlock")
+                return rows
+
+            writer = WriteBehind(write)
+            first = asyncio.gather(writer.submit("a"), writer.submit("bad"))
+            await asyncio.sleep(0.005)  # the first batch is being written
+            second = await writer.submit("b")
+            try:
+                await first
+            except RuntimeError as e:
+                return e, second
+
+        e, second = _run(scenario)
+        assert str(e) == "deadlock"
+        assert second == "b"
+
+    def test_failed_publish_neither_fails_rows_nor_skips_later_ones(self):
+        async def scenario():
+            published = []
+
+            async def write(rows):
+                return rows
+
+            async def publish(result):
+                if result == "b":
+                    raise ConnectionError("pub/sub down")
+                published.append(result)
+
+            writer = WriteBehind(write, publish)
+            results = await asyncio.gather(*(writer.submit(r) for r in "abc"))
+            await writer._task
+            return results, published
+
+        results, published = _run(scenario)
+        assert results == ["a", "b", "c"]  # committed, so reported as posted
+        assert published == ["a", "c"]
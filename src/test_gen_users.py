@@ -0,0 +1,54 @@
+import pytest
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, create_engine, select
+
+from src.gen_users import bulk_insert_users
+from src.models import User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/db.sqlite")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _gen_users(n: int) -> list[dict]:
+    return [
+        {
+            "login_type": "email",
+            "email": f"u{i}@example.com",
+            "username": f"u{i}",
+            "major": "Finance",
+            "minor": None,
+            "graduation_year": 2027,
+            "interests": ["Chess"],
+            "personality_traits": ["Curious"],
+            "schedule": {"text": f"Mon {i}am"},
+            "bio": "hi",
+        }
+        for i in range(n)
+    ]
+
+
+class TestBulkInsertUsers:
+    def test_links_schedules(self, engine):
+        with DBSession(engine) as session:
+            assert bulk_insert_users(session, _gen_users(5), chunk_size=2) == 5
+            users = session.exec(select(User).order_by(User.id)).all()
+            assert [u.schedule.text for u in users] == [f"Mon {i}am" for i in range(5)]
+
+    def test_python_defaults(self, engine):
+        """uuid and created_at come from the model's default factories."""
+        with DBSession(engine) as session:
+            bulk_insert_users(session, _gen_users(2))
+            users = session.exec(select(User)).all()
+            assert len({u.uuid for u in users}) == 2
+            assert all(u.created_at and u.waiting_for_match is False for u in users)
+            assert users[0].interests == ["Chess"]
+
+    # Edge
+
+    def test_empty(self, engine):
+        with DBSession(engine) as session:
+            assert bulk_insert_users(session, []) == 0
@@ -0,0 +1,142 @@
+import asyncio
+import io
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from src.blobs import LocalBlobStore, blob_hash, sniff_mime
+from src.images import (
+    ThumbnailCache,
+    UploadSizeLimit,
+    read_upload,
+    render_thumbnail,
+    validate_image_bytes,
+)
+
+
+def _png(size=(640, 480), mode="RGB") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestRenderThumbnail:
+    def test_avatar_sizes_are_square(self):
+        """Avatar sizes are center-cropped to exactly the requested box."""
+        for size, px in [("48", 48), ("80", 80), ("192", 192)]:
+            thumb = Image.open(io.BytesIO(render_thumbnail(_png(), size)))
+            assert thumb.size == (px, px)
+
+    def test_schedule_keeps_aspect_ratio(self):
+        thumb = Image.open(io.BytesIO(render_thumbnail(_png((1536, 1024)), "schedule")))
+        assert thumb.size == (768, 512)
+
+    # Edge
+
+    def test_small_schedule_is_not_upscaled(self):
+        thumb = Image.open(io.BytesIO(render_thumbnail(_png((100, 50)), "schedule")))
+        assert thumb.size == (100, 50)
+
+    def test_svg_passthrough(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+        assert render_thumbnail(svg, "48") == svg
+
+    def test_palette_image(self):
+        thumb = render_thumbnail(_png(mode="P"), "80")
+        assert sniff_mime(thumb) == "image/webp"
+
+
+class TestThumbnailCache:
+    def test_renders_once(self, tmp_path):
+        """The second read is served from disk without touching the blob store."""
+        store = LocalBlobStore(tmp_path / "blobs")
+        key = store.put(_png())
+        cache = ThumbnailCache(store, tmp_path / "thumbs")
+        first = cache.get(key, "48")
+        store.delete(key)
+        assert cache.get(key, "48") == first
+
+    # Invalid
+
+    def test_unknown_size(self, tmp_path):
+        store = LocalBlobStore(tmp_path / "blobs")
+        cache = ThumbnailCache(store, tmp_path / "thumbs")
+        assert cache.get(store.put(_png()), "1000") is None
+
+    def test_missing_blob(self, tmp_path):
+        cache = ThumbnailCache(LocalBlobStore(tmp_path / "blobs"), tmp_path / "thumbs")
+        assert cache.get(blob_hash(b"missing"), "48") is None
+
+
+class TestReadUpload:
+    def test_reads_whole_file(self):
+        data = _png()
+        upload = UploadFile(io.BytesIO(data), filename="a.png")
+        assert asyncio.run(read_upload(upload)) == data
+
+    # Invalid
+
+    def test_aborts_past_cap(self):
+        """Nothing past the cap is read."""
+        src = io.BytesIO(b"\0" * 1024 * 1024)
+        upload = UploadFile(src, filename="big.png")
+        assert asyncio.run(read_upload(upload, max_bytes=100 * 1024)) is None
+        assert src.tell() == 100 * 1024 + 1
+
+
+class TestValidateImageBytes:
+    def test_valid_png(self):
+        data = _png()
+        assert validate_image_bytes(data) == {"success": data}
+
+    # Invalid
+
+    def test_not_an_image(self):
+        assert "error" in validate_image_bytes(b"<html>hi</html>")
+
+    def test_oversized_dimensions(self):
+        """Dimensions are rejected from the header alone."""
+        assert "dimensions" in validate_image_bytes(_png((5000, 10)))["error"]
+
+    def test_disallowed_format(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(buf, format="WEBP")
+        assert "error" in validate_image_bytes(buf.getvalue())
+
+
+class TestUploadSizeLimit:
+    def _call(self, headers, chunks, max_bytes=10):
+        sent = []
+
+        async def app(scope, receive, send):
+            while (await receive()).get("more_body"):
+                pass
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        messages = [
+            {"type": "http.request", "body": c, "more_body": i < len(chunks) - 1}
+            for i, c in enumerate(chunks)
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": headers}
+        asyncio.run(UploadSizeLimit(app, max_bytes=max_bytes)(scope, receive, send))
+        return sent[0]["status"]
+
+    def test_small_body_passes(self):
+        assert self._call([(b"content-length", b"4")], [b"1234"]) == 200
+
+    # Invalid
+
+    def test_declared_length_rejected(self):
+        assert self._call([(b"content-length", b"11")], [b"x" * 11]) == 413
+
+    def test_chunked_body_cut_off(self):
+        """Without a content-length the running total is enforced."""
+        assert self._call([], [b"x" * 6, b"x" * 6]) == 413
@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text, tuple_
+from sqlmodel import SQLModel, select
+
+from src.models import FeedMessage, Match, User
+from src.queries import has_all_tags, has_any_tag
+
+# needs a real Postgres; tables are created in a throwaway schema and rolled back
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL (Postgres) not set"
+)
+
+HOT_QUERIES = {
+    "ix_user_uuid": select(User).where(User.uuid == "u"),
+    "ix_user_email": select(User).where(User.email == "a@b.c"),
+    "ix_user_username": select(User).where(User.username == "a"),
+    "ix_user_reset_token": select(User).where(User.reset_token == "t"),
+    "ix_match_user_id_2": select(Match).where(Match.user_id_2 == 1),
+    "ix_feedmessage_created_at_id": select(FeedMessage)
+    .where(tuple_(FeedMessage.created_at, FeedMessage.id) < (datetime(2026, 1, 1), 100))
+    .order_by(FeedMessage.created_at.desc(), FeedMessage.id.desc())
+    .limit(50),
+    "ix_feedmessage_user_id": select(FeedMessage).where(FeedMessage.user_id == 1),
+    "ix_user_interests": select(User).where(has_any_tag(User.interests, ["Chess"])),
+    "ix_user_personality_traits": select(User).where(
+        has_all_tags(User.personality_traits, ["Curious", "Kind"])
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        conn.execute(text("CREATE SCHEMA test_indexes"))
+        conn.execute(text("SET LOCAL search_path TO test_indexes"))
+        SQLModel.metadata.create_all(conn)
+        # tables are empty, so only forbid seq scans instead of loading rows
+        conn.execute(text("SET LOCAL enable_seqscan TO off"))
+        yield conn
+        trans.rollback()
+
+
+def _index_scans(plan: dict) -> set[str]:
+    found = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        found |= _index_scans(child)
+    return found
+
+
+class TestHotQueryIndexes:
+    @pytest.mark.parametrize("index", HOT_QUERIES)
+    def test_uses_index(self, conn, index):
+        query = HOT_QUERIES[index].compile(conn, compile_kwargs={"literal_binds": True})
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        assert index in _index_scans(plan[0]["Plan"])
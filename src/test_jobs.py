@@ -0,0 +1,167 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, update
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, func, select
+
+from src.blobs import LocalBlobStore
+from src.db import create_db_engine
+from src.jobs import collect_garbage, purge_deleted_users
+from src.models import FeedMessage, Match, Schedule, User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # create_db_engine turns on SQLite's FK enforcement, so cascades apply
+    engine = create_db_engine("test_jobs", f"sqlite:///{tmp_path}/db.sqlite")
+    SQLModel.metadata.create_all(engine)
+    with DBSession(engine) as session:
+        users = [
+            User(uuid=f"u{i}", schedule=Schedule(text=f"Mon {i}am")) for i in range(3)
+        ]
+        session.add_all(users)
+        session.flush()
+        for user in users:
+            session.add_all(FeedMessage(message="hi", user=user) for _ in range(5))
+        session.add(Match(user_id_1=users[0].id, user_id_2=users[1].id))
+        session.add(Match(user_id_1=users[1].id, user_id_2=users[2].id))
+        session.commit()
+    return engine
+
+
+def _count(session, model) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def _soft_delete(session, *uuids):
+    for user in session.exec(select(User).where(User.uuid.in_(uuids))):
+        user.deleted_at = datetime.now(timezone.utc)
+    session.commit()
+
+
+class TestPurgeDeletedUsers:
+    def test_purges_rows_and_children(self, engine):
+        with DBSession(engine) as session:
+            _soft_delete(session, "u0")
+            assert purge_deleted_users(session, batch_size=2) == 1
+            assert session.exec(select(User.uuid)).all() == ["u1", "u2"]
+            assert _count(session, FeedMessage) == 10
+            assert _count(session, Match) == 1  # via ON DELETE CASCADE
+            assert _count(session, Schedule) == 2
+
+    def test_batches(self, engine):
+        with DBSession(engine) as session:
+            _soft_delete(session, "u0", "u1", "u2")
+            assert purge_deleted_users(session, batch_size=2) == 3
+            assert [_count(session, m) for m in (User, FeedMessage, Match)] == [
+                0,
+                0,
+                0,
+            ]
+
+    # Edge
+
+    def test_nothing_to_purge(self, engine):
+        with DBSession(engine) as session:
+            assert purge_deleted_users(session) == 0
+            assert _count(session, User) == 3
+
+
+class TestCollectGarbage:
+    @pytest.fixture
+    def garbage(self, engine):
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        with DBSession(engine) as session:
+            session.add_all(
+                [
+                    Schedule(text="abandoned", img_hash="0" * 64, created_at=old),
+                    Schedule(text="replaced", created_at=old),
+                    Schedule(text="still signing up"),
+                ]
+            )
+            user = session.exec(select(User).where(User.uuid == "u0")).one()
+            user.reset_token, user.reset_token_expiry = "t0", old
+            user = session.exec(select(User).where(User.uuid == "u1")).one()
+            user.reset_token = "t1"
+            user.reset_token_expiry = datetime.now(timezone.utc) + timedelta(hours=1)
+            session.commit()
+        return engine
+
+    def test_reclaims_orphans_and_expired_tokens(self, garbage):
+        with DBSession(garbage) as session:
+            stats = collect_garbage(session, batch_size=1, pause=0)
+            assert stats == {
+                "schedules": 2,
+                "schedule_bytes": len("abandoned") + 64 + len("replaced"),
+                "blobs": 0,
+                "blob_bytes": 0,
+                "reset_tokens": 1,
+            }
+            texts = session.exec(select(Schedule.text)).all()
+            assert "still signing up" in texts and len(texts) == 4
+            tokens = session.exec(select(User.reset_token).order_by(User.uuid)).all()
+            assert tokens == [None, "t1", None]
+
+    def test_reclaims_unreferenced_blobs(self, garbage, tmp_path):
+        """Old blobs nothing points at go, including those of schedules deleted in the same run."""
+        store = LocalBlobStore(tmp_path / "blobs")
+        abandoned, profile, orphan, fresh = (
+            store.put(data) for data in (b"abandoned", b"profile", b"orphan", b"fresh")
+        )
+        written_at = time.time() - timedelta(days=30).total_seconds()
+        for key in (abandoned, profile, orphan):
+            os.utime(store._path(key), (written_at, written_at))
+        with DBSession(garbage) as session:
+            session.exec(
+                update(Schedule)
+                .where(Schedule.text == "abandoned")
+                .values(img_hash=abandoned)
+            )
+            session.exec(
+                update(User).where(User.uuid == "u1").values(profile_img_hash=profile)
+            )
+            session.commit()
+            stats = collect_garbage(session, store, batch_size=2, pause=0)
+        assert stats["blobs"] == 2
+        assert stats["blob_bytes"] == len(b"abandoned") + len(b"orphan")
+        assert {key for key, _, _ in store.scan()} == {profile, fresh}
+
+    # Edge
+
+    def test_counts_only_what_was_deleted(self, garbage):
+        """A schedule attached between the scan and the delete is neither deleted nor counted."""
+        with DBSession(garbage) as session:
+            abandoned = session.exec(
+                select(Schedule.id).where(Schedule.text == "abandoned")
+            ).one()
+            attached = []
+
+            @event.listens_for(session, "do_orm_execute")
+            def late_signup(state):
+                if state.is_delete and not attached:
+                    attached.append(abandoned)
+                    session.exec(
+                        update(User)
+                        .where(User.uuid == "u2")
+                        .values(schedule_id=abandoned)
+                    )
+
+            stats = collect_garbage(session, pause=0)
+            assert stats["schedules"] == 1
+            assert stats["schedule_bytes"] == len("replaced")
+            assert session.get(Schedule, abandoned) is not None
+
+    def test_attached_schedules_are_kept(self, engine):
+        """Schedules users point at survive however old they are."""
+        with DBSession(engine) as session:
+            assert collect_garbage(session, grace=timedelta(0), pause=0) == {
+                "schedules": 0,
+                "schedule_bytes": 0,
+                "blobs": 0,
+                "blob_bytes": 0,
+                "reset_tokens": 0,
+            }
+            assert _count(session, Schedule) == 3
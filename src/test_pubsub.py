@@ -0,0 +1,206 @@
+import asyncio
+import gc
+import os
+import warnings
+
+import pytest
+
+from src.pubsub import MemoryPubSub, PostgresPubSub
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+async def _settle():
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+
+class TestMemoryPubSub:
+    def test_delivers_in_publish_order(self):
+        async def scenario():
+            pubsub, received = MemoryPubSub(), []
+
+            async def slow(payload):
+                await asyncio.sleep(0.01 if payload == "1" else 0)
+                received.append(("slow", payload))
+
+            async def fast(payload):
+                received.append(("fast", payload))
+
+            await pubsub.subscribe("feed", slow)
+            await pubsub.subscribe("feed", fast)
+            await pubsub.subscribe("other", fast)
+            for payload in ("1", "2"):
+                await pubsub.publish("feed", payload)
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == [
+            ("slow", "1"),
+            ("fast", "1"),
+            ("slow", "2"),
+            ("fast", "2"),
+        ]
+
+    def test_publish_soon_from_sync_code(self):
+        async def scenario():
+            pubsub, received = MemoryPubSub(), []
+
+            async def callback(payload):
+                received.append(payload)
+
+            await pubsub.subscribe("user_cache", callback)
+            (lambda: pubsub.publish_soon("user_cache", "u1"))()
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == ["u1"]
+
+    # Edge
+
+    def test_publish_soon_off_the_loop_leaks_nothing(self):
+        """Sync commits outside the loop (jobs, scripts) must not leave an unawaited coroutine."""
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with pytest.raises(RuntimeError):
+                MemoryPubSub().publish_soon("user_cache", "u1")
+            gc.collect()
+        assert [w for w in caught if "never awaited" in str(w.message)] == []
+
+    def test_subscribe_is_idempotent(self):
+        async def scenario():
+            pubsub, received = MemoryPubSub(), []
+
+            async def callback(payload):
+                received.append(payload)
+
+            await pubsub.subscribe("feed", callback)
+            await pubsub.subscribe("feed", callback)
+            await pubsub.publish("feed", "1")
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == ["1"]
+
+    def test_failing_callback_does_not_stop_delivery(self):
+        async def scenario():
+            pubsub, received = MemoryPubSub(), []
+
+            async def broken(payload):
+                raise RuntimeError("boom")
+
+            async def callback(payload):
+                received.append(payload)
+
+            await pubsub.subscribe("feed", broken)
+            await pubsub.subscribe("feed", callback)
+            await pubsub.publish("feed", "1")
+            await pubsub.publish("feed", "2")
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == ["1", "2"]
+
+    def test_survives_a_new_event_loop(self):
+        pubsub, received = MemoryPubSub(), []
+
+        async def callback(payload):
+            received.append(payload)
+
+        async def publish(payload):
+            await pubsub.subscribe("feed", callback)
+            await pubsub.publish("feed", payload)
+            await _settle()
+
+        asyncio.run(publish("1"))
+        asyncio.run(publish("2"))
+        assert received == ["1", "2"]
+
+
+@pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL (Postgres) not set"
+)
+class TestPostgresPubSub:
+    def test_reaches_every_container(self):
+        async def scenario():
+            containers = [PostgresPubSub(TEST_DATABASE_URL) for _ in range(2)]
+            received = {0: [], 1: []}
+            for i, pubsub in enumerate(containers):
+
+                async def callback(payload, i=i):
+                    received[i].append(payload)
+
+                await pubsub.subscribe("test_feed", callback)
+            await containers[0].publish("test_feed", "1")
+            await containers[1].publish("test_feed", "2")
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == {0: ["1", "2"], 1: ["1", "2"]}
+
+    # Edge
+
+    def test_payload_limit(self):
+        async def scenario():
+            await PostgresPubSub(TEST_DATABASE_URL).publish("test_feed", "x" * 8000)
+
+        with pytest.raises(ValueError):
+            asyncio.run(scenario())
+
+    def test_reconnects_after_losing_the_connection(self):
+        async def wait_for(condition):
+            for _ in range(200):
+                if condition():
+                    return
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            pubsub, received = (
+                PostgresPubSub(TEST_DATABASE_URL, reconnect_delay=0.2),
+                [],
+            )
+
+            async def callback(payload):
+                received.append(payload)
+
+            await pubsub.subscribe("test_feed", callback)
+            killer = PostgresPubSub(TEST_DATABASE_URL)
+            await killer._start()
+            await killer._conn.execute(
+                "SELECT pg_terminate_backend($1)", pubsub._conn.get_server_pid()
+            )
+            await wait_for(lambda: pubsub._conn is None)
+            reconnecting = len(pubsub._pending)  # held, so it can't be collected
+            await wait_for(lambda: not pubsub._pending)  # listening again
+            await killer.publish("test_feed", "after")
+            await _settle()
+            return reconnecting, received
+
+        assert asyncio.run(scenario()) == (1, ["after"])
+
+    def test_subscribe_while_reconnecting(self):
+        """A socket connecting mid-reconnect waits for the connection instead of failing."""
+
+        async def scenario():
+            pubsub, received = (
+                PostgresPubSub(TEST_DATABASE_URL, reconnect_delay=0.2),
+                [],
+            )
+
+            async def callback(payload):
+                received.append(payload)
+
+            await pubsub.subscribe("test_feed", callback)
+            killer = PostgresPubSub(TEST_DATABASE_URL)
+            await killer._start()
+            await killer._conn.execute(
+                "SELECT pg_terminate_backend($1)", pubsub._conn.get_server_pid()
+            )
+            while pubsub._conn is not None:
+                await asyncio.sleep(0.01)
+            await asyncio.wait_for(pubsub.subscribe("test_other", callback), 5)
+            await killer.publish("test_other", "other")
+            await _settle()
+            return received
+
+        assert asyncio.run(scenario()) == ["other"]
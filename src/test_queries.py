@@ -0,0 +1,249 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, inspect
+from sqlmodel import Session as DBSession
+from sqlmodel import SQLModel, create_engine, select
+
+from src.models import FeedMessage, Match, Schedule, User
+from src.queries import (
+    MATCH_CARD,
+    RANK_CANDIDATE,
+    USER_AUTH,
+    feed_cursor,
+    feed_page,
+    has_all_tags,
+    has_any_tag,
+    matches_of,
+    tag_counts,
+    upsert_matches,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/db.sqlite")
+    SQLModel.metadata.create_all(engine)
+    with DBSession(engine) as session:
+        for i in range(3):
+            session.add(
+                User(
+                    login_type="email",
+                    email=f"u{i}@example.com",
+                    username=f"u{i}",
+                    hashed_password="hash",
+                    bio="bio " * 100,
+                    interests=["Chess"],
+                    schedule=Schedule(img_hash="0" * 64, text="Mon 9am"),
+                )
+            )
+        session.commit()
+    return engine
+
+
+def _statements(engine) -> list[str]:
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    return statements
+
+
+class TestDeferredColumns:
+    def test_heavy_columns_skipped_by_default(self, engine):
+        with DBSession(engine) as session:
+            user = session.exec(select(User)).first()
+            assert {"bio", "interests", "personality_traits"} <= inspect(user).unloaded
+            schedule = session.exec(select(Schedule)).first()
+            assert "text" in inspect(schedule).unloaded
+
+    def test_profile_group_loads_together(self, engine):
+        """Touching one profile column loads the rest in the same query."""
+        statements = _statements(engine)
+        with DBSession(engine) as session:
+            user = session.exec(select(User)).first()
+            statements.clear()
+            assert user.bio.startswith("bio")
+            assert user.interests == ["Chess"]
+        assert len(statements) == 1
+
+
+class TestLoadProfiles:
+    def test_user_auth(self, engine):
+        with DBSession(engine) as session:
+            user = session.exec(select(User).options(*USER_AUTH)).first()
+            assert "hashed_password" not in inspect(user).unloaded
+            assert "bio" in inspect(user).unloaded
+
+    def test_rank_candidates_render_without_lazy_loads(self, engine):
+        """`str()` on every candidate reads only what the ranking query loaded."""
+        statements = _statements(engine)
+        with DBSession(engine) as session:
+            users = session.exec(select(User).options(*RANK_CANDIDATE)).all()
+            statements.clear()
+            assert all("Mon 9am" in str(u) for u in users)
+            assert "email" in inspect(users[0]).unloaded
+        assert statements == []
+
+    def test_match_card_leaves_credentials(self, engine):
+        with DBSession(engine) as session:
+            user = session.exec(select(User).options(*MATCH_CARD)).first()
+            unloaded = inspect(user).unloaded
+            assert {"hashed_password", "reset_token"} <= unloaded
+            assert "bio" not in unloaded
+
+
+class TestTagQueries:
+    @pytest.fixture
+    def tagged(self, engine):
+        with DBSession(engine) as session:
+            users = session.exec(select(User).order_by(User.id)).all()
+            users[1].interests = ["Chess", "Hiking"]
+            users[2].interests = None
+            users[0].personality_traits = ["Curious", "Kind"]
+            session.commit()
+        return engine
+
+    def _usernames(self, engine, condition) -> list[str]:
+        with DBSession(engine) as session:
+            query = select(User.username).where(condition).order_by(User.id)
+            return session.exec(query).all()
+
+    def test_has_any_tag(self, tagged):
+        assert self._usernames(tagged, has_any_tag(User.interests, ["Hiking"])) == [
+            "u1"
+        ]
+        condition = has_any_tag(User.interests, ["Chess", "Go"])
+        assert self._usernames(tagged, condition) == ["u0", "u1"]
+
+    def test_has_all_tags(self, tagged):
+        condition = has_all_tags(User.interests, ["Chess", "Hiking"])
+        assert self._usernames(tagged, condition) == ["u1"]
+        condition = has_all_tags(User.personality_traits, ["Kind", "Kind"])
+        assert self._usernames(tagged, condition) == ["u0"]
+
+    def test_tag_counts(self, tagged):
+        with DBSession(tagged) as session:
+            assert tag_counts(session, User.interests) == {"Chess": 2, "Hiking": 1}
+            assert list(tag_counts(session, User.personality_traits)) == [
+                "Curious",
+                "Kind",
+            ]
+
+    # Edge
+    def test_no_values_matches_nothing(self, tagged):
+        assert self._usernames(tagged, has_any_tag(User.interests, [])) == []
+
+
+class TestMatches:
+    def _matches(self, session, user_id):
+        return session.exec(matches_of(user_id)).all()
+
+    def test_pair_stored_once(self, engine):
+        """Either side ranking the other lands in the same row, lower id first."""
+        with DBSession(engine) as session:
+            upsert_matches(session, 3, {1: 0.5, 2: 1.0})
+            upsert_matches(session, 1, {3: 0.9})
+            session.commit()
+            assert len(session.exec(select(Match)).all()) == 2
+            match = session.get(Match, (1, 3))
+            assert (match.score_1, match.score_2) == (0.9, 0.5)
+            assert match.score_of(3) == 0.5
+            assert match.partner_id(3) == 1
+
+    def test_rerank_updates_score(self, engine):
+        with DBSession(engine) as session:
+            upsert_matches(session, 2, {1: 0.5})
+            upsert_matches(session, 2, {1: 1.0})
+            session.commit()
+            assert [m.score_of(2) for m in self._matches(session, 2)] == [1.0]
+            assert [m.partner_id(1) for m in self._matches(session, 1)] == [2]
+
+    # Edge
+
+    def test_no_scores(self, engine):
+        with DBSession(engine) as session:
+            upsert_matches(session, 1, {})
+            assert self._matches(session, 1) == []
+
+
+class TestFeedPage:
+    @pytest.fixture
+    def feed(self, engine):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        with DBSession(engine) as session:
+            users = session.exec(select(User).order_by(User.id)).all()
+            session.add_all(
+                FeedMessage(
+                    message=f"m{i}",
+                    user=users[i % 2],
+                    # pairs share a timestamp, so id breaks the tie
+                    created_at=start + timedelta(seconds=i // 2),
+                )
+                for i in range(7)
+            )
+            session.commit()
+        return engine
+
+    def _texts(self, messages) -> list[str]:
+        return [m.message for m in messages]
+
+    def test_latest_page_oldest_first(self, feed):
+        with DBSession(feed) as session:
+            assert self._texts(feed_page(session, 3)) == ["m4", "m5", "m6"]
+
+    def test_walks_back_and_forth(self, feed):
+        with DBSession(feed) as session:
+            page = feed_page(session, 3)
+            seen = []
+            while page:
+                seen = self._texts(page) + seen
+                page = feed_page(session, 3, before=feed_cursor(page[0]))
+            assert seen == [f"m{i}" for i in range(7)]
+
+            first = feed_page(session, 2, before=feed_cursor(feed_page(session, 5)[0]))
+            newer = feed_page(session, 10, after=feed_cursor(first[-1]))
+            assert self._texts(newer) == ["m2", "m3", "m4", "m5", "m6"]
+
+    def test_renders_authors_without_lazy_loads(self, feed):
+        statements = _statements(feed)
+        with DBSession(feed) as session:
+            page = feed_page(session, 10)
+            statements.clear()
+            assert [m.user.username for m in page][:2] == ["u0", "u1"]
+            assert statements == []
+            assert {"bio", "hashed_password"} <= inspect(page[0].user).unloaded
+
+    @pytest.mark.parametrize("size", [1, 7])
+    def test_one_query_whatever_the_page_size(self, feed, size):
+        """Guards against N+1: messages and their authors come back together."""
+        statements = _statements(feed)
+        with DBSession(feed) as session:
+            rendered = [
+                f"{m.user.username}: {m.message}" for m in feed_page(session, size)
+            ]
+            assert len(rendered) == size
+            assert len(statements) == 1
+
+    # Edge
+
+    def test_fresh_message_cursor(self, feed):
+        """A just-committed message still has its aware created_at."""
+        with DBSession(feed, expire_on_commit=False) as session:
+            user = session.exec(select(User)).first()
+            message = FeedMessage(message="new", user=user)
+            session.add(message)
+            session.commit()
+            assert feed_page(session, 10, after=feed_cursor(message)) == []
+            before = feed_page(session, 1, before=feed_cursor(message))
+            assert self._texts(before) == ["m6"]
+
+    def test_skips_deleted_authors(self, feed):
+        with DBSession(feed) as session:
+            session.exec(
+                select(User).where(User.username == "u1")
+            ).one().deleted_at = datetime.now(timezone.utc)
+            session.commit()
+            assert self._texts(feed_page(session, 10)) == ["m0", "m2", "m4", "m6"]
+
+    def test_bad_cursor(self, feed):
+        with DBSession(feed) as session, pytest.raises(ValueError):
+            feed_page(session, 10, before="nope")